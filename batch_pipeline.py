@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from typing import List, Any, Callable, Iterable
+
+# Сколько пачек может ждать записи по умолчанию
+DEFAULT_PIPELINE_DEPTH = 2
+
+# Маркер конца очереди для потока записи
+_STOP = object()
+
+
+class BatchPipeline:
+    """Генерация и запись пачек внахлест.
+
+    Вызывающий поток генерирует пачки и кладет их в ограниченную очередь,
+    а поток записи в это время отправляет предыдущие пачки (в базу или в
+    файлы). Если запись медленнее генерации, генератор ждет свободного места
+    в очереди, поэтому в памяти не больше depth + 2 пачек.
+
+    Ошибка записи останавливает генерацию, ошибка генерации - запись
+    (пачки из очереди отбрасываются); исключение поднимается в вызывающем
+    потоке после остановки потока записи.
+    """
+
+    def __init__(self, write: Callable[[List[tuple]], Any], depth: int = DEFAULT_PIPELINE_DEPTH,
+                 name: str = 'batch-writer'):
+        self.write = write
+        self.name = name
+        self.batches = 0
+        # Время, которое генератор ждал места в очереди, и простой записи в ожидании пачек
+        self.producer_wait_seconds = 0.0
+        self.writer_wait_seconds = 0.0
+        self._queue = queue.Queue(maxsize=max(1, int(depth)))
+        self._cancelled = threading.Event()
+        self._error = None
+
+    def _run_writer(self):
+        while True:
+            started = time.perf_counter()
+            rows = self._queue.get()
+            self.writer_wait_seconds += time.perf_counter() - started
+            if rows is _STOP:
+                return
+            if self._cancelled.is_set():
+                continue
+            try:
+                self.write(rows)
+                self.batches += 1
+            except BaseException as e:
+                self._error = e
+                self._cancelled.set()
+
+    def cancel(self):
+        """Останавливает генерацию; пачки, которые еще не записаны, отбрасываются"""
+        self._cancelled.set()
+
+    def run(self, batches: Iterable[List[tuple]]) -> int:
+        """Записывает все пачки и возвращает их количество"""
+        thread = threading.Thread(target=self._run_writer, daemon=True, name=self.name)
+        thread.start()
+        try:
+            for rows in batches:
+                if self._cancelled.is_set():
+                    break
+                if rows:
+                    started = time.perf_counter()
+                    self._queue.put(rows)
+                    self.producer_wait_seconds += time.perf_counter() - started
+        except BaseException:
+            self._cancelled.set()
+            raise
+        finally:
+            # Поток записи вычитывает очередь до маркера, поэтому put не зависнет
+            self._queue.put(_STOP)
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return self.batches
+
+
+def run_batches(batches: Iterable[List[tuple]], write: Callable[[List[tuple]], Any], pipelined: bool = True,
+                depth: int = DEFAULT_PIPELINE_DEPTH, name: str = 'batch-writer') -> BatchPipeline:
+    """Передает пачки в write: в отдельном потоке записи или, с pipelined=False, по очереди"""
+    pipeline = BatchPipeline(write, depth, name)
+    if pipelined:
+        pipeline.run(batches)
+        return pipeline
+    for rows in batches:
+        if rows:
+            write(rows)
+            pipeline.batches += 1
+    return pipeline
@@ -0,0 +1,114 @@
+import itertools
+import string
+from typing import List, Dict, Any, Callable, Optional
+
+import rule_primitives
+
+
+def random_bytes(rng, count: int) -> bytes:
+    """count случайных байт одним вызовом генератора"""
+    return rng.getrandbits(count * 8).to_bytes(count, 'little') if count else b''
+
+
+class UniformBytes:
+    """Равновероятные значения из небольшого алфавита, полученные из случайных байт.
+
+    Байт переводится в значение таблицей bytes.translate; байты из
+    неполного последнего круга (256 не делится на размер алфавита)
+    удаляются тем же вызовом, поэтому смещения нет.
+    """
+
+    def __init__(self, values: bytes):
+        size = len(values)
+        if not 0 < size <= 256:
+            raise ValueError(f"алфавит из {size} значений не помещается в байт")
+        limit = 256 - 256 % size
+        self.table = bytes(values[byte % size] if byte < limit else 0 for byte in range(256))
+        self.delete = bytes(range(limit, 256))
+        self.ratio = 256 / limit
+
+    def draw(self, rng, count: int) -> bytes:
+        """count значений алфавита (в среднем около count * ratio случайных байт)"""
+        chunks = []
+        drawn = 0
+        while drawn < count:
+            missing = count - drawn
+            chunk = random_bytes(rng, int(missing * self.ratio) + 16).translate(self.table, self.delete)
+            chunks.append(chunk)
+            drawn += len(chunk)
+        return b''.join(chunks)[:count]
+
+
+def _split(text: str, width: int, count: int) -> List[str]:
+    """Делит строку на count частей по width символов"""
+    if width == 1:
+        return list(text)
+    return [text[start:start + width] for start in range(0, count * width, width)]
+
+
+def compile_batch_pattern(pattern: str, rng) -> Callable[[int], List[str]]:
+    """Пакетный генератор правила pattern.
+
+    Шаблон один раз разбирается на сегменты: подряд идущие слоты одного
+    пула и литералы. Для каждого сегмента символы всей пачки получаются
+    из одной строки случайных байт, а строки собираются одним format.
+    """
+    segments = []
+    template = []
+    previous_pool = None
+    for slot in rule_primitives.pattern_slots(pattern):
+        if len(slot) == 1:
+            template.append(slot.replace('{', '{{').replace('}', '}}'))
+            previous_pool = None
+        elif slot == previous_pool:
+            segments[-1][1] += 1
+        else:
+            segments.append([UniformBytes(slot.encode('ascii')), 1])
+            template.append('{}')
+            previous_pool = slot
+    build = ''.join(template).format
+
+    def generate_batch(count: int) -> List[str]:
+        if not segments:
+            return [build()] * count
+        columns = [_split(sampler.draw(rng, count * width).decode('ascii'), width, count)
+                   for sampler, width in segments]
+        return list(map(build, *columns))
+
+    return generate_batch
+
+
+def compile_batch_email(domains: List[str], rng) -> Callable[[int], List[str]]:
+    """Пакетный генератор правила email: имя из строчных букв, число и домен, как у compile_rule"""
+    min_length, max_length = rule_primitives.EMAIL_NAME_LENGTH
+    letters = UniformBytes(string.ascii_lowercase.encode('ascii'))
+    extra_lengths = UniformBytes(bytes(range(max_length - min_length + 1)))
+    first_number, last_number = rule_primitives.EMAIL_NUMBER_RANGE
+    number_span = last_number - first_number + 1
+    choices = rng.choices
+    rnd = rng.random
+
+    def generate_batch(count: int) -> List[str]:
+        lengths = [min_length + extra for extra in extra_lengths.draw(rng, count)]
+        text = letters.draw(rng, sum(lengths)).decode('ascii')
+        offsets = list(itertools.accumulate(lengths, initial=0))
+        names = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        numbers = [first_number + int(rnd() * number_span) for _ in range(count)]
+        return list(map('{}{}@{}'.format, names, numbers, choices(domains, k=count)))
+
+    return generate_batch
+
+
+def compile_batch_rule(rules: Dict[str, Any], rng) -> Optional[Callable[[int], List[str]]]:
+    """Пакетный генератор для строковых правил pattern и email; для остальных None"""
+    value_type = rules.get('type', 'text')
+    if rules.get('common_values'):
+        return None
+    if value_type == 'pattern':
+        return compile_batch_pattern(rules.get('pattern', '#####'), rng)
+    if value_type == 'email':
+        domains = list(rules.get('domains', rule_primitives.DEFAULT_EMAIL_DOMAINS))
+        if not domains:
+            raise ValueError("Пустой список domains")
+        return compile_batch_email(domains, rng)
+    return None
@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+
+# Добавляем путь к проекту
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database_config import DatabaseConfig
+from postgres_utils import PostgresUtils
+from copy_stream import CopyTextStream, format_copy_value, format_csv_row
+from copy_binary import BinaryCopyEncoder
+from file_sink import FileSink, write_rows_to_files
+from generation_plan import compile_column
+import numpy_engine
+
+# Правила, которые измеряются по отдельности (типы _generate_value_by_rules)
+RULES = {
+    'int': {'type': 'int', 'min_value': 1, 'max_value': 1000000},
+    'decimal': {'type': 'decimal', 'min_value': 0, 'max_value': 10000, 'precision': 2},
+    'timestamp': {'type': 'timestamp', 'start_date': '2020-01-01 00:00:00', 'end_date': '2024-12-31 23:59:59'},
+    'date': {'type': 'date', 'start_date': '2020-01-01', 'end_date': '2024-12-31'},
+    'email': {'type': 'email', 'domains': ['gmail.com', 'mail.ru', 'yandex.ru']},
+    'pattern': {'type': 'pattern', 'pattern': 'AA-####-aa'},
+    'enum': {'type': 'enum', 'values': ['new', 'paid', 'shipped', 'delivered', 'cancelled']},
+    'text': {'type': 'text', 'min_words': 3, 'max_words': 10},
+    'boolean': {'type': 'boolean', 'true_probability': 0.7},
+}
+
+# Резервный генератор _generate_column_value: (имя колонки, тип, длина)
+FALLBACK_COLUMNS = [
+    ('quantity', 'integer', None),
+    ('first_name', 'character varying', 50),
+    ('code', 'character varying', 20),
+    ('birth_date', 'date', None),
+    ('updated_at', 'timestamp without time zone', None),
+    ('is_active', 'boolean', None),
+    ('price', 'numeric', None),
+]
+
+# Доли заполнения пространства уникальных значений
+FILL_RATIOS = (0.1, 0.5, 0.9, 1.0)
+
+# Таблица для измерения способов вставки и записи в файлы
+BENCH_SCHEMA = 'synthetic_bench'
+BENCH_TABLE = 'bench_rows'
+BENCH_COLUMNS = [
+    ('id', 'bigint', {'type': 'int', 'min_value': 1, 'max_value': 10 ** 12}),
+    ('name', 'character varying', {'type': 'pattern', 'pattern': 'Aaaaaaaa Aaaaaaaaa'}),
+    ('email', 'character varying', RULES['email']),
+    ('amount', 'numeric', RULES['decimal']),
+    ('created_at', 'timestamp without time zone', RULES['timestamp']),
+    ('birth_date', 'date', RULES['date']),
+    ('is_active', 'boolean', RULES['boolean']),
+    ('status', 'text', RULES['enum']),
+]
+
+INSERT_METHODS = ('copy', 'copy_binary', 'executemany')
+
+# executemany на порядки медленнее, поэтому ему достается меньше строк
+EXECUTEMANY_ROWS_DIVISOR = 20
+
+
+def copy_bytes(values: List[Any]) -> int:
+    """Объем значений в текстовом формате COPY (с разделителями)"""
+    return sum(len(format_copy_value(value).encode('utf-8')) + 1 for value in values)
+
+
+def measure(run: Callable[..., Any], repeat: int, setup: Callable[[], Any] = None) -> float:
+    """Лучшее время из repeat запусков; результат setup передается в run, и его время не измеряется"""
+    best = None
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        started = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(rows: int, data_bytes: int, seconds: float, **extra) -> Dict[str, Any]:
+    seconds = max(seconds, 1e-9)
+    return dict({
+        'rows': rows,
+        'bytes': data_bytes,
+        'seconds': round(seconds, 6),
+        'rows_per_second': round(rows / seconds, 1),
+        'bytes_per_second': round(data_bytes / seconds, 1),
+    }, **extra)
+
+
+def column_info(name: str, data_type: str = 'text', max_length: int = None, nullable: bool = False) -> Dict[str, Any]:
+    return {'name': name, 'data_type': data_type, 'max_length': max_length, 'nullable': nullable}
+
+
+def make_column_plan(rules: Dict[str, Any], engine: str, unique: bool = False, seed: int = 1):
+    """Скомпилированный генератор колонки с правилом rules"""
+    rng = random.Random(seed)
+    np_rng = numpy_engine.create_generator(rng) if engine == 'numpy' else None
+    table_config = {'column_rules': {'value': rules}, 'unique_columns': ['value'] if unique else []}
+    global_settings = {'max_retry_unique': 1000}
+    return compile_column(column_info('value'), table_config, global_settings, rng=rng, np_rng=np_rng)
+
+
+def bench_rules(pg_utils: PostgresUtils, rows: int, engines: List[str], repeat: int) -> Dict[str, Any]:
+    """Скорость генерации по каждому типу правила: план колонки и _generate_value_by_rules"""
+    results = {}
+    for rule_name, rules in RULES.items():
+        for engine in engines:
+            plan = make_column_plan(rules, engine)
+            data_bytes = copy_bytes(plan.generate_many(rows))
+            seconds = measure(lambda: plan.generate_many(rows), repeat)
+            results[f"rule.{rule_name}.{engine}"] = result(rows, data_bytes, seconds)
+
+        # Старый путь: правило компилируется заново для каждого значения
+        per_value_rows = max(1, rows // 10)
+        values = [pg_utils._generate_value_by_rules('value', rules) for _ in range(per_value_rows)]
+        seconds = measure(lambda: [pg_utils._generate_value_by_rules('value', rules) for _ in range(per_value_rows)],
+                          repeat)
+        results[f"rule.{rule_name}.per_value"] = result(per_value_rows, copy_bytes(values), seconds)
+    return results
+
+
+def bench_fallback(pg_utils: PostgresUtils, rows: int, repeat: int) -> Dict[str, Any]:
+    """Скорость резервного генератора _generate_column_value (колонки без правил)"""
+    results = {}
+    for column_name, data_type, max_length in FALLBACK_COLUMNS:
+        generate = lambda: [pg_utils._generate_column_value(column_name, data_type, max_length) for _ in range(rows)]
+        data_bytes = copy_bytes(generate())
+        seconds = measure(generate, repeat)
+        results[f"fallback.{column_name}"] = result(rows, data_bytes, seconds, data_type=data_type)
+    return results
+
+
+def bench_unique(rows: int, engines: List[str], repeat: int) -> Dict[str, Any]:
+    """Уникальные и обычные колонки при разной доле заполнения пространства значений.
+
+    int использует перестановку номеров строк, decimal - повторные попытки
+    с трекером уникальности, поэтому доля заполнения влияет на них по-разному.
+    """
+    results = {}
+    spaces = {
+        'int': lambda size: {'type': 'int', 'min_value': 1, 'max_value': size},
+        'decimal': lambda size: {'type': 'decimal', 'min_value': 0, 'max_value': (size - 1) / 100, 'precision': 2},
+    }
+    for rule_name, make_rules in spaces.items():
+        for fill in FILL_RATIOS:
+            size = int(rows / fill)
+            rules = make_rules(size)
+            for unique in (False, True):
+                for engine in engines:
+                    kind = 'unique' if unique else 'plain'
+                    # Уникальный генератор помнит выданные значения, поэтому для каждого запуска
+                    # новый план; он компилируется вне замера, как в bench_rules
+                    make_plan = lambda: make_column_plan(rules, engine, unique)
+                    data_bytes = copy_bytes(make_plan().generate_many(rows))
+                    seconds = measure(lambda plan: plan.generate_many(rows), repeat, setup=make_plan)
+                    results[f"unique.{rule_name}.fill_{fill}.{kind}.{engine}"] = result(rows, data_bytes, seconds,
+                                                                                        space=size)
+    return results
+
+
+def generate_bench_rows(rows: int, engine: str) -> List[tuple]:
+    """Строки тестовой таблицы, сгенерированные один раз для всех способов записи"""
+    plans = [make_column_plan(rules, engine, seed=position) for position, (_, _, rules) in enumerate(BENCH_COLUMNS)]
+    return list(zip(*[plan.generate_many(rows) for plan in plans]))
+
+
+def batches_of(rows: List[tuple], batch_size: int) -> List[List[tuple]]:
+    return [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+
+
+def bench_sinks(rows: List[tuple], batch_size: int, repeat: int) -> Dict[str, Any]:
+    """Нулевой приемник (только сериализация) и запись в файлы во всех форматах"""
+    results = {}
+    batches = batches_of(rows, batch_size)
+    column_names = [name for name, _, _ in BENCH_COLUMNS]
+    types = [data_type for _, data_type, _ in BENCH_COLUMNS]
+
+    def serialize_text():
+        return sum(len(CopyTextStream(batch).read().encode('utf-8')) for batch in batches)
+
+    def serialize_csv():
+        return sum(len(''.join(map(format_csv_row, batch)).encode('utf-8')) for batch in batches)
+
+    encoder = BinaryCopyEncoder(types, column_names)
+
+    def serialize_binary():
+        return sum(len(encoder.encode_rows(batch)) for batch in batches)
+
+    for name, serialize in (('text', serialize_text), ('csv', serialize_csv), ('binary', serialize_binary)):
+        data_bytes = serialize()
+        results[f"sink.null.{name}"] = result(len(rows), data_bytes, measure(serialize, repeat))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in ('text', 'csv', 'binary'):
+            for compress in (False, True):
+                def write() -> FileSink:
+                    sink = FileSink(directory, f"{BENCH_TABLE}_{file_format}", file_format, compress,
+                                    encoder=BinaryCopyEncoder(types, column_names) if file_format == 'binary' else None)
+                    write_rows_to_files(batches, sink)
+                    return sink
+                seconds = measure(write, repeat)
+                file_bytes = write().bytes_written()
+                name = f"sink.file.{file_format}" + ('.gzip' if compress else '')
+                results[name] = result(len(rows), file_bytes, seconds)
+    return results
+
+
+def bench_database(config: DatabaseConfig, rows: List[tuple], batch_size: int, repeat: int) -> Dict[str, Any]:
+    """Способы вставки в одноразовую таблицу схемы synthetic_bench (удаляется в конце)"""
+    results = {}
+    config.schema = BENCH_SCHEMA
+    column_names = [name for name, _, _ in BENCH_COLUMNS]
+    columns_sql = ', '.join(f"{name} {data_type}" for name, data_type, _ in BENCH_COLUMNS)
+
+    with PostgresUtils(config, {'global_settings': {}}) as pg_utils:
+        with pg_utils.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+                cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+                cursor.execute(f"CREATE UNLOGGED TABLE {BENCH_SCHEMA}.{BENCH_TABLE} ({columns_sql})")
+        try:
+            for insert_method in INSERT_METHODS:
+                method_rows = rows if insert_method != 'executemany' else rows[:max(1, len(rows) // EXECUTEMANY_ROWS_DIVISOR)]
+                batches = batches_of(method_rows, batch_size)
+
+                def load():
+                    with pg_utils.connection() as conn:
+                        with conn.cursor() as cursor:
+                            cursor.execute(f"TRUNCATE {BENCH_SCHEMA}.{BENCH_TABLE}")
+                            for batch in batches:
+                                pg_utils.write_rows(cursor, BENCH_TABLE, column_names, batch, insert_method)
+
+                seconds = measure(load, repeat)
+                with pg_utils.connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_relation_size(%s)", (f"{BENCH_SCHEMA}.{BENCH_TABLE}",))
+                        table_bytes = cursor.fetchone()[0]
+                results[f"insert.{insert_method}"] = result(len(method_rows), table_bytes, seconds)
+        finally:
+            with pg_utils.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    return results
+
+
+def compare_with_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Сравнивает rows_per_second с базовым прогоном; регрессия - падение больше tolerance"""
+    comparison = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('rows_per_second'):
+            continue
+        ratio = current['rows_per_second'] / previous['rows_per_second']
+        comparison.append({
+            'name': name,
+            'baseline_rows_per_second': previous['rows_per_second'],
+            'rows_per_second': current['rows_per_second'],
+            'ratio': round(ratio, 3),
+            'regression': ratio < 1 - tolerance
+        })
+    return comparison
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"{'Замер':<45} {'строк/с':>14} {'МБ/с':>10}")
+    print("-" * 71)
+    for name, item in sorted(results.items()):
+        print(f"{name:<45} {item['rows_per_second']:>14,.0f} {item['bytes_per_second'] / 2 ** 20:>10.2f}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Замеры скорости генераторов и способов вставки")
+    parser.add_argument('--rows', type=int, default=100000, help="строк на замер (100000)")
+    parser.add_argument('--repeat', type=int, default=3, help="запусков на замер, берется лучший (3)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="размер пачки для записи (1000)")
+    parser.add_argument('--engine', choices=('python', 'numpy', 'all'), default='all',
+                        help="движок генерации (all - оба, если установлен NumPy)")
+    parser.add_argument('--groups', default='rules,fallback,unique,sinks,database',
+                        help="группы замеров через запятую")
+    parser.add_argument('--database', metavar='CONFIG',
+                        help="config.json с секцией database: способы вставки замеряются в этой базе")
+    parser.add_argument('--output', default='bench_results.json', help="файл результатов (JSON)")
+    parser.add_argument('--baseline', help="результаты прошлого прогона для сравнения")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="допустимое падение rows_per_second относительно baseline (0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    groups = set(args.groups.split(','))
+    engines = ['python', 'numpy'] if args.engine == 'all' else [args.engine]
+    if not numpy_engine.is_available():
+        if 'numpy' in engines:
+            print("⚠️  NumPy не установлен, замеры движка 'numpy' пропускаются")
+        engines = ['python']
+
+    print("⏱️  Замеры генератора синтетических данных")
+    print("=" * 50)
+    pg_utils = PostgresUtils(DatabaseConfig(), {'global_settings': {'max_retry_unique': 1000}})
+    results = {}
+
+    if 'rules' in groups:
+        print("🔄 Правила column_rules...")
+        results.update(bench_rules(pg_utils, args.rows, engines, args.repeat))
+    if 'fallback' in groups:
+        print("🔄 Резервный генератор _generate_column_value...")
+        results.update(bench_fallback(pg_utils, args.rows, args.repeat))
+    if 'unique' in groups:
+        print("🔄 Уникальные колонки...")
+        results.update(bench_unique(args.rows, engines, args.repeat))
+
+    bench_rows = None
+    if groups & {'sinks', 'database'}:
+        bench_rows = generate_bench_rows(args.rows, engines[-1])
+    if 'sinks' in groups:
+        print("🔄 Сериализация и запись в файлы...")
+        results.update(bench_sinks(bench_rows, args.batch_size, args.repeat))
+    if 'database' in groups and args.database:
+        config = DatabaseConfig.from_json(args.database)
+        if config:
+            print(f"🔄 Способы вставки (база '{config.database}', схема {BENCH_SCHEMA})...")
+            try:
+                results.update(bench_database(config, bench_rows, args.batch_size, args.repeat))
+            except Exception as e:
+                print(f"❌ Ошибка замера вставки: {e}")
+
+    report = {
+        'meta': {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': numpy_engine.np.__version__ if numpy_engine.is_available() else None,
+            'rows': args.rows,
+            'repeat': args.repeat,
+            'batch_size': args.batch_size,
+        },
+        'results': results,
+    }
+
+    print()
+    print_results(results)
+
+    exit_code = 0
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ Ошибка чтения baseline: {e}")
+            return 2
+        baseline_meta = baseline.get('meta', {})
+        if (baseline_meta.get('rows'), baseline_meta.get('batch_size')) != (args.rows, args.batch_size):
+            print(f"⚠️  baseline снят с другими параметрами (rows={baseline_meta.get('rows')}, "
+                  f"batch_size={baseline_meta.get('batch_size')}): сравнение неточно")
+        comparison = compare_with_baseline(results, baseline, args.tolerance)
+        report['comparison'] = comparison
+        regressions = [item for item in comparison if item['regression']]
+        for item in regressions:
+            print(f"❌ Регрессия {item['name']}: {item['rows_per_second']:,.0f} строк/с "
+                  f"против {item['baseline_rows_per_second']:,.0f} ({item['ratio']:.2f}x)")
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"✅ Регрессий относительно baseline нет ({len(comparison)} замеров)")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📊 Результаты сохранены в {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
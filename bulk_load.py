@@ -0,0 +1,399 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+
+import psycopg2
+from psycopg2 import sql
+
+# Файл с DDL снятых индексов и ограничений, пока они не восстановлены
+DEFAULT_STATE_PATH = 'bulk_load_state.json'
+
+# Настройки сессии на время массовой загрузки (дополняются global_settings.bulk_load_settings)
+DEFAULT_SESSION_SETTINGS = {
+    'synchronous_commit': 'off',
+    'maintenance_work_mem': '1GB',
+}
+
+# Сколько соединений одновременно пересоздают индексы и проверяют ограничения
+DEFAULT_REBUILD_CONNECTIONS = 4
+
+
+def _quote(name: str) -> str:
+    """Имя в кавычках для DDL, который выводится пользователю"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class BulkLoad:
+    """Массовая загрузка: индексы и ограничения снимаются до загрузки и восстанавливаются после.
+
+    До удаления DDL всех объектов записывается в файл состояния (через
+    временный файл и os.replace), и каждый восстановленный объект
+    вычеркивается из него. Если запуск прервался, следующий запуск сначала
+    восстанавливает то, что осталось в файле (или откладывает файл по
+    abandon). Первичные ключи не снимаются, а таблицы, в которых уже есть
+    строки, загружаются без снятия индексов и ограничений.
+    """
+
+    # Вторичные индексы, не принадлежащие ограничениям и не являющиеся секциями индекса родителя
+    INDEXES_QUERY = """
+    SELECT n.nspname, c.relname, ic.relname, pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class ic ON ic.oid = i.indexrelid
+    WHERE n.nspname = %s
+    AND c.relname = ANY(%s)
+    AND NOT i.indisprimary
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_constraint con
+        WHERE con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x')
+    )
+    AND NOT EXISTS (SELECT 1 FROM pg_inherits inh WHERE inh.inhrelid = i.indexrelid)
+    ORDER BY c.relname, ic.relname;
+    """
+
+    # Уникальные ограничения, исключения и внешние ключи загружаемых таблиц, а также
+    # внешние ключи других таблиц, ссылающиеся на снимаемые уникальные ограничения
+    CONSTRAINTS_QUERY = """
+    SELECT n.nspname, c.relname, con.conname, con.contype,
+           pg_get_constraintdef(con.oid), con.convalidated
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_class fc ON fc.oid = con.confrelid
+    LEFT JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+    WHERE con.conparentid = 0
+    AND (
+        (n.nspname = %s AND c.relname = ANY(%s) AND con.contype IN ('u', 'x', 'f'))
+        OR (con.contype = 'f' AND fn.nspname = %s AND fc.relname = ANY(%s)
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_index pi
+                WHERE pi.indexrelid = con.conindid AND pi.indisprimary
+            ))
+    )
+    ORDER BY con.contype = 'f' DESC, n.nspname, c.relname, con.conname;
+    """
+
+    def __init__(self, pg_utils, table_names: List[str], state_path: str = DEFAULT_STATE_PATH,
+                 unlogged: bool = False, connections: int = DEFAULT_REBUILD_CONNECTIONS):
+        self.pg_utils = pg_utils
+        self.schema = pg_utils.config.schema
+        self.table_names = list(table_names)
+        self.state_path = state_path
+        self.unlogged = unlogged
+        self.connections = max(1, min(connections, pg_utils.config.pool_max_size))
+        self.state = {'schema': self.schema, 'objects': [], 'unlogged': []}
+        self._state_lock = threading.Lock()
+
+    def _save_state(self):
+        """Атомарно записывает файл состояния на диск (или удаляет его, если восстанавливать нечего)"""
+        if not self.state['objects'] and not self.state['unlogged']:
+            if os.path.exists(self.state_path):
+                os.remove(self.state_path)
+            return
+        temporary_path = self.state_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.state_path)
+
+    def _load_state(self) -> bool:
+        """Читает файл состояния прерванного запуска; False, если его нет"""
+        if not os.path.exists(self.state_path):
+            return False
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            self.state = json.load(f)
+        return True
+
+    def _collect_objects(self) -> List[Dict[str, Any]]:
+        """DDL вторичных индексов и ограничений загружаемых таблиц"""
+        objects = []
+        with self.pg_utils.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(self.CONSTRAINTS_QUERY, (self.schema, self.table_names, self.schema, self.table_names))
+                for schema, table_name, name, contype, definition, validated in cursor.fetchall():
+                    objects.append({
+                        'kind': 'foreign_key' if contype == 'f' else 'constraint',
+                        'schema': schema,
+                        'table_name': table_name,
+                        'name': name,
+                        'definition': definition,
+                        'validated': validated
+                    })
+                cursor.execute(self.INDEXES_QUERY, (self.schema, self.table_names))
+                for schema, table_name, name, definition in cursor.fetchall():
+                    objects.append({
+                        'kind': 'index',
+                        'schema': schema,
+                        'table_name': table_name,
+                        'name': name,
+                        'definition': definition
+                    })
+        return objects
+
+    @staticmethod
+    def _table(item: Dict[str, Any]) -> sql.Composed:
+        return sql.SQL("{}.{}").format(sql.Identifier(item['schema']), sql.Identifier(item['table_name']))
+
+    @staticmethod
+    def _ddl_text(item: Dict[str, Any]) -> str:
+        """DDL восстановления объекта текстом (для вывода пользователю)"""
+        if item['kind'] == 'index':
+            return item['definition']
+        return (f"ALTER TABLE {_quote(item['schema'])}.{_quote(item['table_name'])} "
+                f"ADD CONSTRAINT {_quote(item['name'])} {item['definition']}")
+
+    def _drop_statement(self, item: Dict[str, Any]) -> sql.Composed:
+        if item['kind'] == 'index':
+            return sql.SQL("DROP INDEX IF EXISTS {}.{}").format(sql.Identifier(item['schema']),
+                                                                 sql.Identifier(item['name']))
+        return sql.SQL("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}").format(self._table(item),
+                                                                             sql.Identifier(item['name']))
+
+    def prepare(self) -> bool:
+        """Восстанавливает остатки прерванного запуска, затем снимает индексы и ограничения"""
+        if self._load_state():
+            print(f"⚠️  Найден файл состояния массовой загрузки '{self.state_path}': "
+                  f"восстанавливаются объекты прерванного запуска")
+            if not self.restore():
+                print("❌ Не удалось восстановить индексы и ограничения прерванного запуска. Устраните причину "
+                      "(например, дубликаты в уникальных колонках) и повторите запуск или запустите "
+                      "main.py --abandon-bulk-load и выполните оставшийся DDL вручную")
+                return False
+
+        # Генератор не сверяет уникальные значения с уже существующими строками
+        loaded = [table_name for table_name in self.table_names if self.pg_utils.has_rows(table_name)]
+        if loaded:
+            print(f"⚠️  В таблицах {', '.join(loaded)} уже есть строки: их индексы и ограничения "
+                  f"при массовой загрузке не снимаются")
+            self.table_names = [table_name for table_name in self.table_names if table_name not in loaded]
+        if not self.table_names:
+            return True
+
+        try:
+            objects = self._collect_objects()
+            # Файл состояния записывается до удаления: после сбоя DDL не потеряется
+            self.state = {'schema': self.schema, 'objects': objects, 'unlogged': []}
+            self._save_state()
+            with self.pg_utils.connection() as conn:
+                with conn.cursor() as cursor:
+                    for item in objects:
+                        cursor.execute(self._drop_statement(item))
+        except (psycopg2.Error, OSError) as e:
+            print(f"❌ Ошибка подготовки массовой загрузки: {e}")
+            self.restore()
+            return False
+
+        counts = {kind: sum(1 for item in objects if item['kind'] == kind)
+                  for kind in ('index', 'constraint', 'foreign_key')}
+        print(f"🧱 Массовая загрузка: сняты {counts['index']} индексов, {counts['constraint']} ограничений "
+              f"и {counts['foreign_key']} внешних ключей (DDL сохранен в '{self.state_path}')")
+
+        if self.unlogged:
+            self._set_unlogged()
+        return True
+
+    def _set_unlogged(self):
+        """Переводит таблицы в UNLOGGED; таблицы, на которые ссылаются обычные таблицы, остаются как есть"""
+        for table_name in self.table_names:
+            item = {'schema': self.schema, 'table_name': table_name}
+            # Таблица попадает в файл до изменения, чтобы ее точно вернули в LOGGED
+            with self._state_lock:
+                self.state['unlogged'].append(table_name)
+                self._save_state()
+            try:
+                with self.pg_utils.connection() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(sql.SQL("ALTER TABLE {} SET UNLOGGED").format(self._table(item)))
+            except psycopg2.Error as e:
+                print(f"⚠️  Таблица '{table_name}' остается LOGGED: {e}")
+                with self._state_lock:
+                    self.state['unlogged'].remove(table_name)
+                    self._save_state()
+
+    def _exists(self, cursor, item: Dict[str, Any]) -> bool:
+        if item['kind'] == 'index':
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL",
+                           (self._table({'schema': item['schema'], 'table_name': item['name']}).as_string(cursor),))
+        else:
+            cursor.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_constraint con
+                    JOIN pg_class c ON c.oid = con.conrelid
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = %s AND c.relname = %s AND con.conname = %s
+                )""", (item['schema'], item['table_name'], item['name']))
+        return cursor.fetchone()[0]
+
+    def _forget(self, item: Dict[str, Any]):
+        """Вычеркивает восстановленный объект из файла состояния"""
+        with self._state_lock:
+            self.state['objects'].remove(item)
+            self._save_state()
+
+    def _run_statement(self, item: Dict[str, Any], build: Callable[[Any], Optional[sql.Composable]],
+                       forget: bool = True) -> bool:
+        """Выполняет DDL объекта в отдельном соединении; False при ошибке (DDL выводится)"""
+        text = None
+        try:
+            with self.pg_utils.connection() as conn:
+                with conn.cursor() as cursor:
+                    statement = build(cursor)
+                    if statement is not None:
+                        text = statement.as_string(cursor)
+                        cursor.execute(statement)
+            if forget:
+                self._forget(item)
+            return True
+        except psycopg2.Error as e:
+            print(f"❌ Ошибка восстановления {item['name']} ({item['table_name']}): {e}")
+            if text:
+                print(f"   {text};")
+            return False
+
+    def _recreate(self, item: Dict[str, Any]) -> bool:
+        """Создает индекс или ограничение заново; внешние ключи - без проверки (NOT VALID)"""
+        def build(cursor):
+            if self._exists(cursor, item):
+                return None
+            if item['kind'] == 'index':
+                return sql.SQL(item['definition'])
+            definition = item['definition']
+            if item['kind'] == 'foreign_key' and not definition.endswith('NOT VALID'):
+                definition += ' NOT VALID'
+            return sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                self._table(item), sql.Identifier(item['name']), sql.SQL(definition))
+        # Внешний ключ вычеркивается только после проверки
+        return self._run_statement(item, build, forget=item['kind'] != 'foreign_key')
+
+    def _validate(self, item: Dict[str, Any]) -> bool:
+        def build(cursor):
+            if not item.get('validated', True):
+                return None
+            return sql.SQL("ALTER TABLE {} VALIDATE CONSTRAINT {}").format(self._table(item),
+                                                                           sql.Identifier(item['name']))
+        return self._run_statement(item, build)
+
+    def _parallel(self, function: Callable[[Any], bool], items: List[Any]) -> bool:
+        if not items:
+            return True
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(items))) as executor:
+            return all(list(executor.map(function, items)))
+
+    def restore(self) -> bool:
+        """Возвращает LOGGED, пересоздает индексы и ограничения и проверяет внешние ключи.
+
+        Индексы и ограничения строятся параллельно в connections соединениях;
+        внешние ключи добавляются по одному как NOT VALID (без проверки
+        строк) и затем проверяются параллельно. Не восстановленные объекты
+        остаются в файле состояния.
+        """
+        started = time.perf_counter()
+        success = True
+
+        for table_name in list(self.state['unlogged']):
+            item = {'schema': self.state['schema'], 'table_name': table_name, 'name': 'LOGGED'}
+            if self._run_statement(item, lambda cursor: sql.SQL("ALTER TABLE {} SET LOGGED").format(self._table(item)),
+                                   forget=False):
+                with self._state_lock:
+                    self.state['unlogged'].remove(table_name)
+                    self._save_state()
+            else:
+                success = False
+
+        objects = list(self.state['objects'])
+        indexes = [item for item in objects if item['kind'] != 'foreign_key']
+        foreign_keys = [item for item in objects if item['kind'] == 'foreign_key']
+
+        success = self._parallel(self._recreate, indexes) and success
+        # ADD CONSTRAINT берет блокировки обеих таблиц, поэтому по одному (без проверки это быстро)
+        added = [item for item in foreign_keys if self._recreate(item)]
+        success = len(added) == len(foreign_keys) and success
+        success = self._parallel(self._validate, added) and success
+
+        if objects:
+            print(f"🧱 Восстановлено {len(objects) - len(self.state['objects'])} из {len(objects)} "
+                  f"индексов и ограничений за {time.perf_counter() - started:.2f} с "
+                  f"({self.connections} соединений)")
+        return success
+
+    def abandon(self) -> bool:
+        """Отказывается от восстановления прерванного запуска.
+
+        Печатает DDL, который не был выполнен, и переименовывает файл
+        состояния в *.abandoned, чтобы он больше не останавливал запуски.
+        False, если файла состояния нет.
+        """
+        if not self._load_state():
+            return False
+        print("⚠️  Восстановление после прерванной массовой загрузки отменено, выполните DDL вручную:")
+        for table_name in self.state['unlogged']:
+            print(f"   ALTER TABLE {_quote(self.state['schema'])}.{_quote(table_name)} SET LOGGED;")
+        for item in self.state['objects']:
+            print(f"   {self._ddl_text(item)};")
+            if item['kind'] == 'foreign_key' and item.get('validated', True):
+                print(f"   -- затем ALTER TABLE ... VALIDATE CONSTRAINT {item['name']}")
+        abandoned_path = self.state_path + '.abandoned'
+        os.replace(self.state_path, abandoned_path)
+        print(f"   Файл состояния перенесен в '{abandoned_path}'")
+        self.state = {'schema': self.schema, 'objects': [], 'unlogged': []}
+        return True
+
+    def analyze(self):
+        """Обновляет статистику планировщика для загруженных таблиц"""
+        def analyze_table(table_name: str) -> bool:
+            item = {'schema': self.schema, 'table_name': table_name, 'name': 'ANALYZE'}
+            return self._run_statement(item, lambda cursor: sql.SQL("ANALYZE {}").format(self._table(item)),
+                                       forget=False)
+
+        started = time.perf_counter()
+        if self._parallel(analyze_table, self.table_names):
+            print(f"📈 ANALYZE {len(self.table_names)} таблиц за {time.perf_counter() - started:.2f} с")
+
+    def finish(self) -> bool:
+        """Восстанавливает все снятое и выполняет ANALYZE"""
+        success = self.restore()
+        if not success:
+            print(f"⚠️  Часть индексов и ограничений не восстановлена; их DDL остается в '{self.state_path}', "
+                  f"восстановление будет повторено при следующем запуске (отказаться: main.py --abandon-bulk-load)")
+        if self.table_names:
+            self.analyze()
+        return success
+
+
+def get_session_settings(global_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Настройки сессии массовой загрузки (пустые, если bulk_load выключен)"""
+    if not global_settings.get('bulk_load', False):
+        return {}
+    settings = dict(DEFAULT_SESSION_SETTINGS)
+    settings.update(global_settings.get('bulk_load_settings', {}))
+    return settings
+
+
+def create_bulk_load(pg_utils, table_names: List[str], abandon: bool = False) -> Optional[BulkLoad]:
+    """Создает BulkLoad по global_settings.
+
+    Возвращает None, если bulk_load выключен и нет файла состояния
+    прерванного запуска, или если данные пишутся в файлы. С abandon файл
+    состояния прерванного запуска откладывается без восстановления.
+    """
+    global_settings = pg_utils.generation_config.get('global_settings', {})
+    enabled = bool(global_settings.get('bulk_load', False))
+    state_path = global_settings.get('bulk_load_state', DEFAULT_STATE_PATH)
+
+    if pg_utils.is_offline():
+        if enabled:
+            print("⚠️  bulk_load не действует при output_mode 'file'")
+        return None
+    if abandon:
+        BulkLoad(pg_utils, [], state_path).abandon()
+    if not enabled and not os.path.exists(state_path):
+        return None
+
+    return BulkLoad(pg_utils, table_names if enabled else [], state_path,
+                    bool(global_settings.get('bulk_load_unlogged', False)),
+                    int(global_settings.get('bulk_load_connections', DEFAULT_REBUILD_CONNECTIONS)))
@@ -0,0 +1,73 @@
+import threading
+import time
+import psycopg2
+from psycopg2 import extensions, pool
+
+
+class ManagedConnectionPool(pool.ThreadedConnectionPool):
+    """Потокобезопасный пул долгоживущих соединений PostgreSQL.
+
+    В отличие от ThreadedConnectionPool:
+    - ждет освобождения соединения, а не падает с PoolError;
+    - держит открытыми до maxconn простаивающих соединений;
+    - заменяет оборванные соединения новыми при выдаче (соединения,
+      простаивавшие дольше ping_interval секунд, проверяются запросом SELECT 1);
+    - считает, сколько соединений было реально открыто.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, ping_interval: float = 5.0, **kwargs):
+        self.connections_opened = 0
+        self.ping_interval = ping_interval
+        self._released_at = {}
+        self._available = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        # Базовый пул закрывает возвращенные соединения сверх minconn,
+        # нам же нужно переиспользовать их в течение всего запуска
+        self.minconn = maxconn
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        self.connections_opened += 1
+        return conn
+
+    def _is_broken(self, conn) -> bool:
+        """Проверяет, что соединение закрыто или потеряно на стороне сервера"""
+        return bool(conn.closed) or conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN
+
+    def _is_alive(self, conn) -> bool:
+        """Проверяет соединение; долго простаивавшие соединения пингуются"""
+        if self._is_broken(conn):
+            return False
+        released_at = self._released_at.pop(id(conn), None)
+        if released_at is None or time.monotonic() - released_at < self.ping_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, key=None):
+        """Выдает соединение, при необходимости дожидаясь свободного"""
+        self._available.acquire()
+        try:
+            conn = super().getconn(key)
+            if not self._is_alive(conn):
+                super().putconn(conn, close=True)
+                conn = super().getconn(key)
+            return conn
+        except Exception:
+            self._available.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        """Возвращает соединение в пул; оборванные соединения закрываются"""
+        try:
+            close = close or self._is_broken(conn)
+            if not close:
+                self._released_at[id(conn)] = time.monotonic()
+            super().putconn(conn, key, close)
+        finally:
+            self._available.release()
@@ -0,0 +1,97 @@
+import time
+from typing import Any, Iterable, Sequence
+
+# Символы, которые обязательно экранируются в текстовом формате COPY
+COPY_TEXT_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+# Представление NULL в текстовом формате COPY
+COPY_NULL = '\\N'
+
+
+def format_copy_value(value: Any) -> str:
+    """Преобразует значение Python в поле текстового формата COPY"""
+    if value is None:
+        return COPY_NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    return str(value).translate(COPY_TEXT_ESCAPES)
+
+
+def format_copy_row(values: Sequence[Any]) -> str:
+    """Формирует одну строку COPY: поля через табуляцию, в конце перевод строки"""
+    return '\t'.join(map(format_copy_value, values)) + '\n'
+
+
+def format_csv_value(value: Any) -> str:
+    """Преобразует значение Python в поле формата COPY csv (NULL - пустое поле без кавычек)"""
+    if value is None:
+        return ''
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    text = str(value)
+    # Пустая строка в кавычках отличается от NULL; \. в начале строки - конец данных
+    if not text or ',' in text or '"' in text or '\n' in text or '\r' in text or text == '\\.':
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def format_csv_row(values: Sequence[Any]) -> str:
+    """Формирует одну строку формата COPY csv"""
+    return ','.join(map(format_csv_value, values)) + '\n'
+
+
+class CopyTextStream:
+    """Файлоподобный источник для cursor.copy_expert.
+
+    Строки сериализуются лениво, по мере чтения сервером, поэтому
+    в памяти одновременно находится только один блок данных.
+    serialize_seconds - время форматирования строк без ожидания сервера.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._rows = iter(rows)
+        self._pending = ''
+        self.rows_written = 0
+        self.serialize_seconds = 0.0
+
+    def read(self, size: int = -1) -> str:
+        """Возвращает очередной блок данных длиной не более size символов"""
+        started = time.perf_counter()
+        chunks = [self._pending] if self._pending else []
+        length = len(self._pending)
+
+        if size is None or size < 0 or length < size:
+            for row in self._rows:
+                line = format_copy_row(row)
+                chunks.append(line)
+                length += len(line)
+                self.rows_written += 1
+                if size is not None and 0 <= size <= length:
+                    break
+
+        data = ''.join(chunks)
+        if size is not None and 0 <= size < len(data):
+            self._pending, data = data[size:], data[:size]
+        else:
+            self._pending = ''
+        self.serialize_seconds += time.perf_counter() - started
+        return data
+
+    def readline(self, size: int = -1) -> str:
+        """Возвращает одну строку COPY (нужно для совместимости с file API)"""
+        if self._pending:
+            line, self._pending = self._pending, ''
+            return line
+        for row in self._rows:
+            self.rows_written += 1
+            return format_copy_row(row)
+        return ''
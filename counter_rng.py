@@ -0,0 +1,125 @@
+import hashlib
+import random
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для векторного варианта
+    np = None
+
+MASK64 = 2 ** 64 - 1
+
+# Шаг последовательности Вейля splitmix64
+GOLDEN = 0x9E3779B97F4A7C15
+
+
+def mix64(value: int) -> int:
+    """Перемешивание 64-битного числа (финализатор splitmix64)"""
+    value = (value + GOLDEN) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+def derive_key(seed: int, *parts: str) -> int:
+    """Стабильный 64-битный ключ из зерна и имен (одинаковый в любом процессе)"""
+    data = '/'.join([str(seed), *parts]).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _stream_start(key: int, row: int) -> int:
+    return mix64(key ^ ((row * GOLDEN) & MASK64))
+
+
+class CounterRandom(random.Random):
+    """random.Random, в котором каждое число - чистая функция (ключ, строка, номер вызова).
+
+    seek(row) переключает генератор на поток строки row; все методы
+    random.Random (randint, choice, choices, shuffle) работают поверх
+    random() и getrandbits(), поэтому значения ячейки не зависят от
+    других строк и от порядка, в котором строки генерируются.
+    """
+
+    def __init__(self, key: int):
+        self.key = key
+        super().__init__()
+        self.seek(0)
+
+    def seed(self, *args, **kwargs):
+        # Состояние задается ключом и номером строки, а не зерном Mersenne Twister
+        pass
+
+    def seek(self, row: int):
+        self.row = row
+        self._stream = _stream_start(self.key, row)
+        self._counter = 0
+
+    def _next64(self) -> int:
+        self._counter += 1
+        return mix64((self._stream + self._counter * GOLDEN) & MASK64)
+
+    def random(self) -> float:
+        return (self._next64() >> 11) * (1.0 / 9007199254740992.0)
+
+    def getrandbits(self, k: int) -> int:
+        if k <= 64:
+            return self._next64() >> (64 - k) if k else 0
+        value = 0
+        for _ in range((k + 63) // 64):
+            value = (value << 64) | self._next64()
+        return value >> (-k % 64)
+
+    def getstate(self):
+        return self.key, self.row, self._counter
+
+    def setstate(self, state):
+        key, row, counter = state
+        self.key = key
+        self.seek(row)
+        self._counter = counter
+
+
+def _mix64_array(values):
+    """Векторный mix64 для массива uint64 (переполнение в NumPy циклическое)"""
+    values = values + np.uint64(GOLDEN)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class CounterArrayRandom:
+    """Векторный аналог CounterRandom для движка numpy.
+
+    Реализует методы random и integers генератора NumPy, которые нужны
+    numpy_engine; seek(start, count) выбирает диапазон строк, и i-й вызов
+    после него возвращает для каждой строки то же, что i-й вызов
+    CounterRandom.random() для этой строки. integers - это floor(random * span),
+    а не CounterRandom.randint (он берет биты через getrandbits), и правила
+    движков расходуют случайные числа в разном порядке, поэтому с одним
+    seed движки python и numpy дают разные наборы данных.
+    """
+
+    def __init__(self, key: int):
+        self.key = key
+        self._streams = None
+        self._draws = 0
+
+    def seek(self, start: int, count: int):
+        rows = np.arange(start, start + count, dtype=np.uint64)
+        self._streams = _mix64_array(np.uint64(self.key) ^ (rows * np.uint64(GOLDEN)))
+        self._draws = 0
+
+    def _next64(self, size: int):
+        if size != len(self._streams):
+            raise ValueError(f"запрошено {size} значений для диапазона из {len(self._streams)} строк")
+        self._draws += 1
+        return _mix64_array(self._streams + np.uint64((self._draws * GOLDEN) & MASK64))
+
+    def random(self, size: int):
+        return (self._next64(size) >> np.uint64(11)).astype(np.float64) * (1.0 / 9007199254740992.0)
+
+    def integers(self, low: int, high: int, size: int, dtype=None):
+        """Целые из [low, high) для каждой строки диапазона"""
+        span = high - low
+        offsets = np.minimum((self.random(size) * span).astype(np.int64), span - 1)
+        values = low + offsets
+        return values.astype(dtype) if dtype is not None else values
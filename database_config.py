@@ -1,4 +1,19 @@
 import json
+from typing import Dict, Any, Optional
+
+
+def load_config_file(config_file: str = 'config.json') -> Optional[Dict[str, Any]]:
+    """Читает JSON файл конфигурации целиком (подключение и настройки генерации)"""
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Файл конфигурации {config_file} не найден")
+        return None
+    except json.JSONDecodeError as e:
+        print(f"❌ Ошибка чтения JSON: {e}")
+        return None
+
 
 class DatabaseConfig:
     """Конфигурация подключения к PostgreSQL"""
@@ -10,6 +25,11 @@ class DatabaseConfig:
         self.user = kwargs.get('user', 'postgres')
         self.password = kwargs.get('password', '')
         self.schema = kwargs.get('schema', 'public')
+        # Размер пула соединений, которые PostgresUtils держит открытыми
+        self.pool_min_size = int(kwargs.get('pool_min_size', 1))
+        self.pool_max_size = max(1, self.pool_min_size, int(kwargs.get('pool_max_size', 10)))
+        # Простаивавшие дольше этого числа секунд соединения проверяются перед выдачей
+        self.pool_ping_interval = float(kwargs.get('pool_ping_interval', 5))
     
     def get_connection_params(self) -> dict:
         """Возвращает параметры подключения в виде словаря"""
@@ -24,19 +44,10 @@ class DatabaseConfig:
     @classmethod
     def from_json(cls, config_file: str = 'config.json'):
         """Создает конфигурацию из JSON файла"""
-        try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            db_config = config_data.get('database', {})
-            return cls(**db_config)
-            
-        except FileNotFoundError:
-            print(f"❌ Файл конфигурации {config_file} не найден")
-            return None
-        except json.JSONDecodeError as e:
-            print(f"❌ Ошибка чтения JSON: {e}")
+        config_data = load_config_file(config_file)
+        if config_data is None:
             return None
+        return cls(**config_data.get('database', {}))
     
     def str(self) -> str:
         """Строковое представление конфига (без пароля)"""
@@ -0,0 +1,84 @@
+from typing import List, Dict, Any, Tuple
+
+from parallel_generation import split_rows
+from unique_values import SEEDED_TYPES
+
+# Сколько секунд шард по умолчанию ждет строк родительских таблиц от других шардов
+DEFAULT_SHARD_WAIT_TIMEOUT = 3600.0
+
+# Пауза между проверками строк других шардов
+SHARD_POLL_INTERVAL = 2.0
+
+
+class DatasetShard:
+    """Срез набора данных для одной из нескольких машин загрузки (main.py --shard K --shards N).
+
+    Каждая таблица делится на N непрерывных диапазонов строк, шард K
+    генерирует и загружает только свой. С seed значение каждой ячейки
+    зависит от номера строки, поэтому объединение всех шардов совпадает с
+    обычным запуском в пустые таблицы: уникальные значения по построению не
+    пересекаются, а ключи родительских таблиц всех шардов вычисляются без
+    чтения базы, и внешние ключи выбираются из того же списка, что и при
+    обычном запуске.
+    """
+
+    def __init__(self, index: int, count: int):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"шард {index + 1} вне диапазона 1..{count}")
+        self.index = index
+        self.count = count
+
+    @property
+    def label(self) -> str:
+        return f"{self.index + 1}/{self.count}"
+
+    def slices(self, num_rows: int) -> List[Tuple[int, int]]:
+        """(первая строка, число строк) каждого шарда таблицы из num_rows строк"""
+        slices = []
+        start = 0
+        for rows in split_rows(num_rows, self.count):
+            slices.append((start, rows))
+            start += rows
+        return slices
+
+    def row_range(self, num_rows: int) -> Tuple[int, int]:
+        """(первая строка, число строк) этого шарда"""
+        return self.slices(num_rows)[self.index]
+
+
+def batch_ranges(start: int, rows: int, batch_size: int, workers: int = 1) -> List[Tuple[int, int]]:
+    """Диапазоны пачек, которыми загружается срез [start, start + rows).
+
+    При workers > 1 срез делится между процессами, и каждый режет свою
+    часть на пачки с ее начала - так же, как insert_data_parallel. Если
+    insert_data_parallel переходит на один процесс (check_parallel_plan),
+    вызывающий передает workers = 1, и пачки идут подряд от start.
+    """
+    ranges = []
+    for part in split_rows(rows, workers) if workers > 1 else [rows]:
+        for offset in range(0, part, batch_size):
+            ranges.append((start + offset, min(batch_size, part - offset)))
+        start += part
+    return ranges
+
+
+def check_shardable(table_name: str, table_config: Dict[str, Any], columns: List[str],
+                    key_columns: List[str]) -> List[str]:
+    """Почему таблицу нельзя разделить между машинами (пустой список - можно).
+
+    columns - колонки, которые пишет генератор; key_columns - колонки,
+    на которые ссылаются внешние ключи других таблиц.
+    """
+    errors = []
+    column_rules = table_config.get('column_rules', {})
+    for column_name in table_config.get('unique_columns', []):
+        rules = column_rules.get(column_name)
+        if not rules or rules.get('type', 'text') not in SEEDED_TYPES:
+            # Уникальность с повторными попытками зависит от уже выданных значений
+            errors.append(f"уникальная колонка '{table_name}.{column_name}' должна иметь правило одного из типов "
+                          f"{', '.join(SEEDED_TYPES)}")
+    for column_name in key_columns:
+        if column_name not in columns:
+            errors.append(f"значения ключа '{table_name}.{column_name}' заполняет база, "
+                          f"шарды не могут вычислить их заранее")
+    return errors
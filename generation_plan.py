@@ -0,0 +1,611 @@
+import itertools
+import random
+import string
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Callable, Optional
+
+import numpy_engine
+import unique_values
+import uniqueness_trackers
+import counter_rng
+import text_vocabulary
+import batch_strings
+from rule_primitives import (
+    DEFAULT_EMAIL_DOMAINS, PATTERN_SLOTS, EMAIL_NUMBER_RANGE, EMAIL_NAME_LENGTH, days_in_month, parse_date,
+    validate_date_range, partition_range, pattern_slots, pattern_space_size, compile_pattern_decoder
+)
+
+# Справочники для генерации значений по имени колонки (если правил нет)
+FIRST_NAMES = ['Ivan', 'Petr', 'Maria', 'Anna', 'Sergey', 'Olga', 'Alexey', 'Elena']
+LAST_NAMES = ['Ivanov', 'Petrov', 'Sidorov', 'Smirnov', 'Kuznetsov', 'Popov']
+CITIES = ['Moscow', 'Saint Petersburg', 'Novosibirsk', 'Yekaterinburg', 'Kazan']
+
+# Диапазон, в котором random() * span дает равномерные целые без смещения
+MAX_FAST_INT_SPAN = 2 ** 53
+
+# Типы правил, пространство значений которых можно разбить между шардами
+PARTITIONABLE_TYPES = ('int', 'date', 'timestamp', 'pattern', 'email')
+
+def _compile_int(min_val: int, max_val: int, rng=random) -> Callable[[], int]:
+    if min_val > max_val:
+        raise ValueError(f"min_value {min_val} больше max_value {max_val}")
+    span = max_val - min_val + 1
+    if span > MAX_FAST_INT_SPAN:
+        randint = rng.randint
+        return lambda: randint(min_val, max_val)
+    rnd = rng.random
+    return lambda: min_val + int(rnd() * span)
+
+
+def _compile_histogram(bounds: List[float], rng=random, discrete: bool = False) -> Callable[[], float]:
+    """Значение по гистограмме равной наполненности (как histogram_bounds в pg_stats).
+
+    Корзина выбирается равновероятно, значение внутри нее - равномерно;
+    с discrete=True значения целые и включают верхнюю границу корзины.
+    """
+    if len(bounds) < 2:
+        raise ValueError("histogram должна содержать не меньше двух границ")
+    if any(low > high for low, high in zip(bounds, bounds[1:])):
+        raise ValueError("границы histogram должны идти по возрастанию")
+    buckets = len(bounds) - 1
+    rnd = rng.random
+
+    if discrete:
+        def generate_discrete() -> int:
+            bucket = int(rnd() * buckets)
+            low, high = bounds[bucket], bounds[bucket + 1]
+            return min(low + int(rnd() * (high - low + 1)), high)
+        return generate_discrete
+
+    def generate() -> float:
+        bucket = int(rnd() * buckets)
+        low = bounds[bucket]
+        return low + (bounds[bucket + 1] - low) * rnd()
+    return generate
+
+
+def _compile_ranges(ranges: List[tuple], rng=random) -> Callable[[], int]:
+    """Целое из полуинтервалов [low, high): интервал выбирается равновероятно, значение - равномерно"""
+    if not ranges:
+        raise ValueError("ranges не должен быть пустым")
+    if any(low >= high for low, high in ranges):
+        raise ValueError("каждый интервал ranges должен быть непустым: [from, to) с from < to")
+    count = len(ranges)
+    rnd = rng.random
+
+    def generate() -> int:
+        low, high = ranges[int(rnd() * count)]
+        return low + int(rnd() * (high - low))
+    return generate
+
+
+def _compile_weighted_choice(values: List[Any], weights: List[float], rng=random) -> Callable[[], Any]:
+    """Выбор из values с весами weights (накопленные веса считаются один раз)"""
+    if len(weights) != len(values):
+        raise ValueError(f"weights содержит {len(weights)} весов для {len(values)} значений")
+    cum_weights = list(itertools.accumulate(weights))
+    total = cum_weights[-1]
+    if total <= 0:
+        raise ValueError("сумма weights должна быть больше нуля")
+    last = len(values) - 1
+    rnd = rng.random
+    return lambda: values[bisect_right(cum_weights, rnd() * total, 0, last)]
+
+
+def _with_common_values(generate: Callable[[], Any], values: List[Any], weights: List[float],
+                        rng=random) -> Callable[[], Any]:
+    """Частые значения (most_common_vals из pg_stats) с долями weights, остальное - по правилу"""
+    if not weights or len(weights) != len(values):
+        raise ValueError("common_weights должен содержать по одной доле на каждое из common_values")
+    cum_weights = list(itertools.accumulate(weights))
+    share = cum_weights[-1]
+    if share > 1 + 1e-9:
+        raise ValueError(f"сумма common_weights {share:.4f} больше 1")
+    last = len(values) - 1
+    rnd = rng.random
+
+    def generate_common():
+        # Одно случайное число выбирает и ветку, и частое значение
+        draw = rnd()
+        if draw < share:
+            return values[bisect_right(cum_weights, draw, 0, last)]
+        return generate()
+
+    return generate_common
+
+
+def compile_rule(rules: Dict[str, Any], rng=random, partition: tuple = None,
+                 max_length: int = None) -> Callable[[], Any]:
+    """Компилирует правило column_rules в функцию без аргументов, возвращающую значение.
+
+    Все параметры правила читаются и проверяются один раз; ошибки в
+    правилах (например, неверный формат даты) приводят к ValueError.
+    rng - модуль random или экземпляр random.Random.
+    partition = (номер шарда, всего шардов) ограничивает генератор
+    непересекающейся частью пространства значений (см. PARTITIONABLE_TYPES).
+    max_length - длина колонки, до которой обрезается текст правила text.
+    common_values/common_weights добавляют к любому правилу частые значения,
+    histogram (int, decimal, date, timestamp) задает форму распределения,
+    ranges (int, date, timestamp) - равновероятные полуинтервалы [from, to).
+    """
+    if rules.get('common_values') and partition is None:
+        base_rules = {key: value for key, value in rules.items() if key not in ('common_values', 'common_weights')}
+        return _with_common_values(compile_rule(base_rules, rng, None, max_length), list(rules['common_values']),
+                                   rules.get('common_weights'), rng)
+
+    value_type = rules.get('type', 'text')
+    rnd = rng.random
+    randint = rng.randint
+    choice = rng.choice
+
+    if partition is not None and value_type not in PARTITIONABLE_TYPES:
+        raise ValueError(f"тип '{value_type}' не поддерживает разбиение уникальных значений между шардами")
+
+    histogram = rules.get('histogram') if partition is None else None
+    ranges = rules.get('ranges') if partition is None else None
+
+    if value_type == 'int':
+        if ranges:
+            return _compile_ranges([(int(low), int(high)) for low, high in ranges], rng)
+        if histogram:
+            return _compile_histogram([int(bound) for bound in histogram], rng, discrete=True)
+        return _compile_int(*partition_range(rules.get('min_value', 1), rules.get('max_value', 100), partition), rng)
+
+    if value_type == 'decimal':
+        min_val = rules.get('min_value', 1.0)
+        width = rules.get('max_value', 1000.0) - min_val
+        precision = rules.get('precision', 2)
+        if histogram:
+            generate_decimal = _compile_histogram([float(bound) for bound in histogram], rng)
+            return lambda: round(generate_decimal(), precision)
+        return lambda: round(min_val + width * rnd(), precision)
+
+    if value_type == 'timestamp':
+        start_date, end_date = validate_date_range(rules.get('start_date', '2020-01-01 00:00:00'),
+                                                   rules.get('end_date', '2024-12-31 23:59:59'))
+        # Значения - объекты datetime и date: COPY binary пишет их без разбора строк
+        start_date = start_date.replace(microsecond=0)
+        if ranges:
+            seconds = [(int((parse_date(low) - start_date).total_seconds()),
+                        int((parse_date(high) - start_date).total_seconds())) for low, high in ranges]
+            generate_seconds = _compile_ranges(seconds, rng)
+            return lambda: start_date + timedelta(seconds=generate_seconds())
+        if histogram:
+            seconds = [int((parse_date(bound) - start_date).total_seconds()) for bound in histogram]
+            generate_seconds = _compile_histogram(seconds, rng, discrete=True)
+            return lambda: start_date + timedelta(seconds=generate_seconds())
+        first_second, last_second = partition_range(0, int((end_date - start_date).total_seconds()), partition)
+        return lambda: start_date + timedelta(seconds=randint(first_second, last_second))
+
+    if value_type == 'date':
+        start_date, end_date = validate_date_range(rules.get('start_date', '2020-01-01'),
+                                                   rules.get('end_date', '2024-12-31'))
+        start_day = start_date.date()
+        if ranges:
+            days = [((parse_date(low).date() - start_day).days, (parse_date(high).date() - start_day).days)
+                    for low, high in ranges]
+            generate_days = _compile_ranges(days, rng)
+            return lambda: start_day + timedelta(days=generate_days())
+        if histogram:
+            days = [(parse_date(bound).date() - start_day).days for bound in histogram]
+            generate_days = _compile_histogram(days, rng, discrete=True)
+            return lambda: start_day + timedelta(days=generate_days())
+        first_day, last_day = partition_range(0, (end_date - start_date).days, partition)
+        return lambda: start_day + timedelta(days=randint(first_day, last_day))
+
+    if value_type == 'boolean':
+        true_probability = rules.get('true_probability', 0.5)
+        return lambda: rnd() < true_probability
+
+    if value_type == 'email':
+        domains = list(rules.get('domains', DEFAULT_EMAIL_DOMAINS))
+        if not domains:
+            raise ValueError("Пустой список domains")
+        choices = rng.choices
+        letters = string.ascii_lowercase
+        min_length, max_length = EMAIL_NAME_LENGTH
+        # Имя состоит только из букв, поэтому разные числа гарантируют разные адреса
+        first_number, last_number = partition_range(*EMAIL_NUMBER_RANGE, partition)
+        return lambda: (f"{''.join(choices(letters, k=randint(min_length, max_length)))}"
+                        f"{randint(first_number, last_number)}@{choice(domains)}")
+
+    if value_type == 'pattern':
+        slots = pattern_slots(rules.get('pattern', '#####'))
+        if partition is not None:
+            decode = compile_pattern_decoder(slots)
+            generate_index = _compile_int(*partition_range(0, pattern_space_size(slots) - 1, partition), rng)
+            return lambda: decode(generate_index())
+        # Литералы остаются строками длины 1, choice по ним возвращает сам символ
+        return lambda: ''.join([choice(slot) for slot in slots])
+
+    if value_type == 'enum':
+        values = list(rules.get('values', ['value1', 'value2']))
+        if not values:
+            raise ValueError("Пустой список values")
+        if rules.get('weights') is not None:
+            return _compile_weighted_choice(values, list(rules['weights']), rng)
+        return lambda: choice(values)
+
+    # text или другие типы: слова словаря с частотами по закону Ципфа
+    return text_vocabulary.compile_text(rules, rng, max_length)
+
+
+def compile_default(column_name: str, data_type: str, max_length: int = None, rng=random) -> Callable[[], Any]:
+    """Компилирует резервный генератор по типу и имени колонки (если правил нет)"""
+    data_type = data_type.lower()
+    lower_name = column_name.lower()
+    randint = rng.randint
+    choice = rng.choice
+
+    if 'int' in data_type:
+        return _compile_int(1, 1000, rng)
+
+    if 'varchar' in data_type or 'text' in data_type:
+        max_len = max_length or 50
+
+        # Определяем тип данных по имени колонки
+        if 'name' in lower_name and 'last' not in lower_name:
+            generate = lambda: choice(FIRST_NAMES)
+        elif 'last' in lower_name or 'surname' in lower_name:
+            generate = lambda: choice(LAST_NAMES)
+        elif 'email' in lower_name:
+            generate = lambda: f"{choice(FIRST_NAMES).lower()}{randint(1, 999)}@{choice(DEFAULT_EMAIL_DOMAINS)}"
+        elif 'city' in lower_name or 'address' in lower_name:
+            generate = lambda: choice(CITIES)
+        else:
+            # Случайная строка
+            choices = rng.choices
+            alphabet = string.ascii_letters + string.digits
+            max_random_len = min(20, max_len)
+            generate = lambda: ''.join(choices(alphabet, k=randint(5, max_random_len)))
+
+        # Обрезаем, если значение превышает длину колонки
+        return lambda: generate()[:max_len]
+
+    if 'bool' in data_type:
+        rnd = rng.random
+        return lambda: rnd() < 0.5
+
+    if 'date' in data_type:
+        def generate_date() -> date:
+            year = randint(2020, 2024)
+            month = randint(1, 12)
+            day = randint(1, days_in_month(year, month))
+            return date(year, month, day)
+        return generate_date
+
+    if 'timestamp' in data_type:
+        def generate_timestamp() -> datetime:
+            year = randint(2020, 2024)
+            month = randint(1, 12)
+            day = randint(1, days_in_month(year, month))
+            return datetime(year, month, day, randint(0, 23), randint(0, 59))
+        return generate_timestamp
+
+    if 'decimal' in data_type or 'numeric' in data_type:
+        rnd = rng.random
+        return lambda: round(1 + 999 * rnd(), 2)
+
+    return lambda: f"data_{randint(1, 1000)}"
+
+
+def fallback_rule_value(value_type: str, rules: Dict[str, Any], existing_values, rng=random) -> Any:
+    """Запасное значение, когда по правилу не удалось получить уникальное"""
+    if value_type == 'int':
+        min_val = rules.get('min_value', 1)
+        # Ищем первое свободное число
+        for i in range(min_val, min_val + 10000):
+            if i not in existing_values:
+                return i
+    # Для остальных типов добавляем уникальный суффикс
+    return f"fallback_{len(existing_values) + 1}_{rng.randint(1000, 9999)}"
+
+
+def fallback_default_value(generate_shorter: Callable[[], Any], rng=random) -> Any:
+    """Запасное значение для колонки без правил: случайный суффикс к базовому значению"""
+    base_value = generate_shorter()
+    suffix = rng.randint(1000, 9999)
+    return base_value * 1000 + suffix if isinstance(base_value, (int, float)) else f"{base_value}_{suffix}"
+
+
+def draw_unique(generate: Callable[[], Any], existing_values: set, max_attempts: int,
+                fallback: Callable[[], Any]) -> Any:
+    """Генерирует значение, которого нет в existing_values (множество не изменяется)"""
+    for _ in range(max_attempts):
+        value = generate()
+        if value not in existing_values:
+            return value
+    return fallback()
+
+
+def make_unique(generate: Callable[[], Any], max_attempts: int,
+                fallback: Callable[[Any], Any], tracker=None, stats: Dict[str, int] = None) -> Callable[[], Any]:
+    """Оборачивает генератор так, чтобы он не повторял уже выданные значения.
+
+    tracker - трекер уникальности (см. uniqueness_trackers), по умолчанию
+    обычное множество; он же передается в fallback. В stats копятся
+    повторные попытки (retries) и запасные значения (fallbacks).
+    """
+    seen = tracker if tracker is not None else uniqueness_trackers.SetTracker()
+    add_new = seen.add_new
+    stats = stats if stats is not None else {}
+    stats.setdefault('retries', 0)
+    stats.setdefault('fallbacks', 0)
+
+    def generate_unique():
+        for attempt in range(max_attempts):
+            value = generate()
+            if add_new(value):
+                if attempt:
+                    stats['retries'] += attempt
+                return value
+        stats['retries'] += max_attempts
+        stats['fallbacks'] += 1
+        value = fallback(seen)
+        seen.add(value)
+        return value
+
+    return generate_unique
+
+
+class ColumnPlan:
+    """Скомпилированный генератор одной колонки.
+
+    generate возвращает одно значение; generate_array (движок numpy)
+    возвращает сразу массив значений и используется, если задан;
+    generate_batch (строковые правила) возвращает список значений пачки.
+    Если rng - counter_rng.CounterRandom, значение каждой ячейки зависит
+    только от ключа колонки и номера строки.
+    """
+
+    def __init__(self, name: str, generate: Callable[[], Any], null_probability: float = 0.0,
+                 generate_array: Callable[[int], Any] = None, rng=random, np_rng=None, tracker=None,
+                 unique_stats: Dict[str, int] = None, generate_batch: Callable[[int], List[Any]] = None):
+        self.name = name
+        self.generate = generate
+        self.null_probability = null_probability
+        self.generate_array = generate_array
+        self.generate_batch = generate_batch
+        self.rng = rng
+        self.np_rng = np_rng
+        self.tracker = tracker
+        self.unique_stats = unique_stats
+        self.counter_based = isinstance(rng, counter_rng.CounterRandom)
+        # Время генерации колонки за все пачки (для метрик запуска)
+        self.seconds = 0.0
+
+    def generate_many(self, count: int, start: int = 0) -> List[Any]:
+        """Генерирует count значений колонки с учетом вероятности NULL.
+
+        start - номер первой строки; влияет на значения только в режиме с seed.
+        """
+        if self.counter_based:
+            return self._generate_rows(start, count)
+
+        generate = self.generate
+        null_probability = self.null_probability
+
+        if self.np_rng is not None:
+            if self.generate_array is not None:
+                values = self.generate_array(count).tolist()
+            elif self.generate_batch is not None:
+                values = self.generate_batch(count)
+            else:
+                values = [generate() for _ in range(count)]
+            if null_probability > 0:
+                for position in numpy_engine.null_positions(self.np_rng, count, null_probability):
+                    values[position] = None
+            return values
+
+        if self.generate_batch is not None:
+            values = self.generate_batch(count)
+            if null_probability <= 0:
+                return values
+            rnd = self.rng.random
+            return [None if rnd() < null_probability else value for value in values]
+
+        if null_probability <= 0:
+            return [generate() for _ in range(count)]
+        rnd = self.rng.random
+        return [None if rnd() < null_probability else generate() for _ in range(count)]
+
+    def _generate_rows(self, start: int, count: int) -> List[Any]:
+        """Значения строк [start, start + count), каждое из потока своей строки"""
+        generate = self.generate
+        null_probability = self.null_probability
+
+        if self.np_rng is not None and self.generate_array is not None:
+            self.np_rng.seek(start, count)
+            values = self.generate_array(count).tolist()
+            if null_probability > 0:
+                for position in numpy_engine.null_positions(self.np_rng, count, null_probability):
+                    values[position] = None
+            return values
+
+        seek = self.rng.seek
+        rnd = self.rng.random
+        values = []
+        for row in range(start, start + count):
+            seek(row)
+            values.append(None if null_probability > 0 and rnd() < null_probability else generate())
+        return values
+
+
+class TablePlan:
+    """План генерации таблицы: список скомпилированных генераторов колонок"""
+
+    def __init__(self, table_name: str, columns: List[ColumnPlan], engine: str = 'python'):
+        self.table_name = table_name
+        self.columns = columns
+        self.column_names = [column.name for column in columns]
+        self.engine = engine
+        self.next_row = 0
+        # Время сборки строк из значений колонок
+        self.assemble_seconds = 0.0
+
+    def generate_rows(self, count: int, start: int = None) -> List[tuple]:
+        """Генерирует count строк в виде кортежей в порядке column_names.
+
+        Строки нумеруются подряд с next_row; start задает номер первой строки
+        явно (в режиме с seed любой диапазон строк можно сгенерировать отдельно).
+        """
+        if start is None:
+            start = self.next_row
+        self.next_row = start + count
+        if not self.columns:
+            return [()] * count
+        perf_counter = time.perf_counter
+        values = []
+        for column in self.columns:
+            started = perf_counter()
+            values.append(column.generate_many(count, start))
+            column.seconds += perf_counter() - started
+        started = perf_counter()
+        rows = list(zip(*values))
+        self.assemble_seconds += perf_counter() - started
+        return rows
+
+    def column_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Время генерации каждой колонки и повторы ее уникальных значений"""
+        stats = {}
+        for column in self.columns:
+            stats[column.name] = {'seconds': column.seconds}
+            if column.unique_stats is not None:
+                stats[column.name].update(column.unique_stats)
+        return stats
+
+    def tracker_stats(self) -> Dict[str, int]:
+        """Сколько значений хранят трекеры уникальности колонок и сколько памяти они занимают"""
+        trackers = [column.tracker for column in self.columns if column.tracker is not None]
+        return {
+            'columns': len(trackers),
+            'values': sum(len(tracker) for tracker in trackers),
+            'memory_bytes': sum(tracker.memory_bytes() for tracker in trackers)
+        }
+
+
+def create_unique_tracker(global_settings: Dict[str, Any], integers: bool = False, min_value: int = 0):
+    """Трекер уникальности по настройкам unique_tracker и unique_bloom_filter"""
+    return uniqueness_trackers.create_tracker(global_settings.get('unique_tracker', 'auto'), integers,
+                                              bool(global_settings.get('unique_bloom_filter', False)), min_value)
+
+
+def compile_column(column: Dict[str, Any], table_config: Dict[str, Any], global_settings: Dict[str, Any],
+                   fk_values: Optional[List[Any]] = None, rng=random, np_rng=None,
+                   partition: tuple = None) -> ColumnPlan:
+    """Компилирует генератор колонки по ее структуре, правилам и внешнему ключу.
+
+    Если передан np_rng, неуникальные колонки поддерживаемых типов
+    генерируются векторно через NumPy. partition ограничивает уникальные
+    колонки частью пространства значений, принадлежащей шарду.
+    """
+    column_name = column['name']
+    column_rules = table_config.get('column_rules', {})
+    unique = column_name in table_config.get('unique_columns', [])
+
+    null_probability = 0.0
+    if column['nullable']:
+        null_probability = table_config.get('null_probability',
+                                            global_settings.get('default_null_probability', 0.1))
+        # Доля NULL может быть задана и в правиле колонки
+        null_probability = column_rules.get(column_name, {}).get('null_probability', null_probability)
+
+    # Внешний ключ: берем одно из существующих значений родительской таблицы
+    if fk_values:
+        values = list(fk_values)
+        choice = rng.choice
+        generate_array = numpy_engine.compile_vector_choice(values, np_rng) if np_rng is not None else None
+        return ColumnPlan(column_name, lambda: choice(values), null_probability, generate_array, rng, np_rng)
+
+    generate_array = None
+    generate_batch = None
+    tracker = None
+    unique_stats = None
+    # Со счетчиковым rng значение ячейки не должно зависеть от других строк
+    counter_based = isinstance(rng, counter_rng.CounterRandom)
+    if column_name in column_rules:
+        rules = column_rules[column_name]
+        constructive = None
+        try:
+            # Перечислимые типы дают уникальные значения перестановкой номеров строк
+            if unique:
+                constructive = unique_values.compile_unique_rule(rules, rng, partition)
+                if constructive is None and counter_based:
+                    raise ValueError(f"с seed уникальные значения строятся только по правилам "
+                                     f"{', '.join(unique_values.SEEDED_TYPES)}, а не '{rules.get('type', 'text')}'")
+            if unique and partition is None and rules.get('type', 'text') == 'text' and 'vocabulary' not in rules:
+                # Встроенный словарь быстро исчерпывает уникальные тексты из нескольких слов
+                generate = text_vocabulary.compile_random_text(rules, rng, column.get('max_length'))
+            else:
+                generate = constructive or compile_rule(rules, rng, partition if unique else None,
+                                                        column.get('max_length'))
+            if np_rng is not None and not unique:
+                generate_array = numpy_engine.compile_vector_rule(rules, np_rng)
+            # В режиме с seed значения считаются по строкам, пакетные генераторы не нужны
+            if not unique and not counter_based:
+                generate_batch = batch_strings.compile_batch_rule(rules, rng)
+        except (ValueError, TypeError) as e:
+            # TypeError - параметр правила неверного типа, например "min_value": "a"
+            raise ValueError(f"колонка '{column_name}': {e}")
+        if unique and constructive is None:
+            value_type = rules.get('type', 'text')
+            tracker = create_unique_tracker(global_settings, value_type == 'int', int(rules.get('min_value', 1)))
+            unique_stats = {}
+            generate = make_unique(generate, global_settings.get('max_retry_unique', 100),
+                                   lambda seen: fallback_rule_value(value_type, rules, seen, rng), tracker,
+                                   unique_stats)
+    else:
+        if unique and counter_based:
+            raise ValueError(f"колонка '{column_name}': с seed уникальной колонке нужно правило одного из типов "
+                             f"{', '.join(unique_values.SEEDED_TYPES)}")
+        if unique and partition is not None:
+            raise ValueError(f"колонка '{column_name}': уникальные значения без column_rules нельзя разбить между шардами")
+        max_length = column['max_length']
+        generate = compile_default(column_name, column['data_type'], max_length, rng)
+        if unique:
+            generate_shorter = compile_default(column_name, column['data_type'],
+                                               max_length - 5 if max_length else None, rng)
+            # Резервный генератор целых начинает с 1 (см. compile_default)
+            tracker = create_unique_tracker(global_settings, 'int' in column['data_type'].lower(), 1)
+            unique_stats = {}
+            generate = make_unique(generate, 1000, lambda seen: fallback_default_value(generate_shorter, rng),
+                                   tracker, unique_stats)
+
+    return ColumnPlan(column_name, generate, null_probability, generate_array, rng, np_rng, tracker, unique_stats,
+                      generate_batch)
+
+
+def compile_table_plan(table_name: str, columns: List[Dict[str, Any]], table_config: Dict[str, Any],
+                       global_settings: Dict[str, Any], foreign_keys: List[Dict[str, Any]] = None,
+                       existing_fk_values: Dict[str, List[Any]] = None, engine: str = 'python',
+                       rng: random.Random = None, partition: tuple = None, seed: int = None) -> TablePlan:
+    """Компилирует план генерации для уже отфильтрованных колонок таблицы.
+
+    engine - 'python' или 'numpy'; rng - источник случайности плана
+    (по умолчанию новый random.Random со случайным зерном);
+    partition = (номер шарда, всего шардов) для параллельной генерации.
+    С seed каждая колонка получает счетчиковый генератор с ключом
+    (seed, таблица, колонка), и значение ячейки определяется номером строки.
+    """
+    existing_fk_values = existing_fk_values or {}
+    fk_by_column = {fk['column_name']: fk for fk in foreign_keys or []}
+    rng = rng or random.Random()
+    np_rng = numpy_engine.create_generator(rng) if engine == 'numpy' and seed is None else None
+
+    column_plans = []
+    for column in columns:
+        fk_values = None
+        fk_info = fk_by_column.get(column['name'])
+        if fk_info:
+            fk_values = existing_fk_values.get(f"{fk_info['foreign_table_name']}.{fk_info['foreign_column_name']}")
+        column_rng, column_np_rng = rng, np_rng
+        if seed is not None:
+            key = counter_rng.derive_key(seed, table_name, column['name'])
+            column_rng = counter_rng.CounterRandom(key)
+            column_np_rng = counter_rng.CounterArrayRandom(key) if engine == 'numpy' else None
+        column_plans.append(compile_column(column, table_config, global_settings, fk_values,
+                                           column_rng, column_np_rng, partition))
+
+    return TablePlan(table_name, column_plans, engine)
@@ -1,13 +1,14 @@
 import os
 import json
 import sys
+import argparse
 
 # Добавляем путь к проекту
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 class ConfigSelector:
     def __init__(self):
-        self.examples_dir = "generator_config_json\examples"
+        self.examples_dir = os.path.join("generator_config_json", "examples")
         
     def get_available_configs(self):
         """Получает список доступных конфигов"""
@@ -41,13 +42,102 @@ class ConfigSelector:
         
         return configs
     
-    def generate_from_config(self, config_file):
-        """Генерирует полный конфиг из выбранного"""
+    def _default_column_rule(self, column, unique_rows=0):
+        """Базовое правило по типу данных колонки (для уникальной - на unique_rows значений)"""
+        data_type = column['data_type'].lower()
+        if 'int' in data_type:
+            return {"type": "int", "min_value": 1, "max_value": max(1000, unique_rows)}
+        elif any(num_type in data_type for num_type in ['decimal', 'numeric']):
+            return {"type": "decimal", "min_value": 1.0, "max_value": 1000.0, "precision": 2}
+        elif 'bool' in data_type:
+            return {"type": "boolean", "true_probability": 0.5}
+        elif 'date' in data_type:
+            return {"type": "date", "start_date": "2023-01-01", "end_date": "2024-12-31"}
+        elif 'timestamp' in data_type:
+            return {"type": "timestamp", "start_date": "2023-01-01 00:00:00", "end_date": "2024-12-31 23:59:59"}
+        else:
+            return {"type": "text", "min_words": 2, "max_words": 5}
+
+    def _load_statistics(self, pg_utils, schema, tables):
+        """Статистика pg_stats эталонной схемы (ANALYZE должен быть выполнен)"""
+        import psycopg2
+        from stats_inference import load_statistics
+
+        try:
+            with pg_utils.connection() as conn:
+                with conn.cursor() as cursor:
+                    return load_statistics(cursor, schema, tables)
+        except psycopg2.Error as e:
+            print(f"❌ Ошибка чтения статистики схемы '{schema}': {e}")
+            return None
+
+    def _build_table_config(self, pg_utils, table, structure, table_stats=None, scale=1.0):
+        """Конфигурация таблицы: правила из статистики или базовые правила по типу"""
+        from stats_inference import infer_column_rule
+        from unique_values import check_unique_capacity
+
+        foreign_key_columns = {fk['column_name'] for fk in pg_utils.get_foreign_keys(table)}
+        catalog = pg_utils.get_catalog()
+        key_columns = [catalog.get_primary_key(table)] + catalog.get_unique_constraints(table)
+        unique_columns = [columns[0] for columns in key_columns if len(columns) == 1]
+
+        rows = 100
+        if table_stats and table_stats['rows']:
+            rows = max(1, round(table_stats['rows'] * scale))
+        elif table_stats is not None:
+            print(f"⚠️  Для таблицы {table} нет статистики, выполните ANALYZE; используются базовые правила")
+
+        column_rules = {}
+        inferred_unique = []
+        for column in structure:
+            col_name = column['name']
+
+            # Пропускаем системные колонки
+            if (pg_utils._is_generated_column(column) or
+                pg_utils._is_auto_increment_column(column)):
+                continue
+
+            rule = None
+            if table_stats is not None:
+                # Значения внешних ключей берутся из родительских таблиц
+                if col_name in foreign_key_columns:
+                    continue
+                column_stats = table_stats['columns'].get(col_name)
+                if column_stats:
+                    rule = infer_column_rule(column, column_stats, col_name in unique_columns, rows)
+                if col_name in unique_columns:
+                    inferred_unique.append(col_name)
+                    if rule is None:
+                        print(f"⚠️  Для уникальной колонки {table}.{col_name} нет статистики, "
+                              f"используется базовое правило")
+
+            unique_rows = rows if col_name in inferred_unique else 0
+            column_rules[col_name] = rule or self._default_column_rule(column, unique_rows)
+
+        table_config = {
+            "table_name": table,
+            "rows_to_generate": rows,
+            "null_probability": 0.05,
+            "unique_columns": inferred_unique,
+            "column_rules": column_rules
+        }
+        for error in check_unique_capacity(table_config, rows):
+            print(f"⚠️  Таблица {table}, {error}: расширьте правило в конфиге")
+        return table_config
+
+    def generate_from_config(self, config_file, output_path=None, from_stats=False, reference_schema=None,
+                             scale=1.0):
+        """Генерирует полный конфиг из выбранного.
+
+        С from_stats правила колонок и число строк выводятся из pg_stats
+        таблиц reference_schema (по умолчанию - схемы из конфига).
+        Возвращает путь сохраненного конфига или None.
+        """
         try:
             from database_config import DatabaseConfig
             from postgres_utils import PostgresUtils
             
-            config_path = os.path.join(self.examples_dir, config_file)
+            config_path = config_file if os.path.exists(config_file) else os.path.join(self.examples_dir, config_file)
             
             print(f"\n Генерация из: {config_file}")
             
@@ -57,69 +147,44 @@ class ConfigSelector:
             
             # Создаем конфиг БД
             db_config = DatabaseConfig(**minimal_config['database'])
-            pg_utils = PostgresUtils(db_config)
-            
-            if not pg_utils.test_connection():
-                print("❌ Нет соединения с БД")
-                return
-            
-            # Получаем таблицы
-            all_tables = pg_utils.get_all_tables()
-            if not all_tables:
-                print("❌ В схеме нет таблиц")
-                return
-            
-            # Определяем какие таблицы обрабатывать
-            if 'tables' in minimal_config and minimal_config['tables']:
-                tables_to_process = [t for t in minimal_config['tables'] if t in all_tables]
-                print(f" Обработка указанных таблиц: {len(tables_to_process)}")
-            else:
-                tables_to_process = all_tables
-                print(f" Обработка всех таблиц схемы: {len(tables_to_process)}")
-            
-            # Генерируем конфигурации для таблиц
-            table_configs = []
-            for table in tables_to_process:
-                print(f"  Обработка: {table}")
+            with PostgresUtils(db_config, {}) as pg_utils:
+                if not pg_utils.test_connection():
+                    print("❌ Нет соединения с БД")
+                    return None
                 
-                structure = pg_utils.get_table_structure(table)
-                if not structure:
-                    continue
+                # Получаем таблицы
+                all_tables = pg_utils.get_all_tables()
+                if not all_tables:
+                    print("❌ В схеме нет таблиц")
+                    return None
+                
+                # Определяем какие таблицы обрабатывать
+                if 'tables' in minimal_config and minimal_config['tables']:
+                    tables_to_process = [t for t in minimal_config['tables'] if t in all_tables]
+                    print(f" Обработка указанных таблиц: {len(tables_to_process)}")
+                else:
+                    tables_to_process = all_tables
+                    print(f" Обработка всех таблиц схемы: {len(tables_to_process)}")
+                
+                statistics = None
+                if from_stats:
+                    reference_schema = reference_schema or db_config.schema
+                    print(f"📊 Правила выводятся из статистики схемы '{reference_schema}'")
+                    statistics = self._load_statistics(pg_utils, reference_schema, tables_to_process)
+                    if statistics is None:
+                        return None
                 
-                # Простые правила для колонок
-                column_rules = {}
-                for column in structure:
-                    col_name = column['name']
+                # Генерируем конфигурации для таблиц
+                table_configs = []
+                for table in tables_to_process:
+                    print(f"  Обработка: {table}")
                     
-                    # Пропускаем системные колонки
-                    if (pg_utils._is_generated_column(column) or 
-                        pg_utils._is_auto_increment_column(column)):
+                    structure = pg_utils.get_table_structure(table)
+                    if not structure:
                         continue
                     
-                    # Базовые правила по типу данных
-                    data_type = column['data_type'].lower()
-                    if 'int' in data_type:
-                        column_rules[col_name] = {"type": "int", "min_value": 1, "max_value": 1000}
-
-                    elif any(num_type in data_type for num_type in ['decimal', 'numeric']):
-                        column_rules[col_name] = {"type": "decimal", "min_value": 1.0, "max_value": 1000.0, "precision": 2}
-                    elif 'bool' in data_type:
-                        column_rules[col_name] = {"type": "boolean", "true_probability": 0.5}
-                    elif 'date' in data_type:
-                        column_rules[col_name] = {"type": "date", "start_date": "2023-01-01", "end_date": "2024-12-31"}
-                    elif 'timestamp' in data_type:
-                        column_rules[col_name] = {"type": "timestamp", "start_date": "2023-01-01 00:00:00", "end_date": "2024-12-31 23:59:59"}
-                    else:
-                        column_rules[col_name] = {"type": "text", "min_words": 2, "max_words": 5}
-                
-                table_config = {
-                    "table_name": table,
-                    "rows_to_generate": 100,
-                    "null_probability": 0.05,
-                    "unique_columns": [],
-                    "column_rules": column_rules
-                }
-                table_configs.append(table_config)
+                    table_stats = statistics[table] if statistics is not None else None
+                    table_configs.append(self._build_table_config(pg_utils, table, structure, table_stats, scale))
             
             # Формируем полный конфиг
             full_config = {
@@ -135,17 +200,20 @@ class ConfigSelector:
             }
             
             # Сохраняем полный конфиг
-            output_file = config_file.replace('.json', '_full.json')
-            output_path = os.path.join(self.examples_dir, output_file)
+            if output_path is None:
+                output_file = os.path.basename(config_path).replace('.json', '_full.json')
+                output_path = os.path.join(self.examples_dir, output_file)
             
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(full_config, f, ensure_ascii=False, indent=2)
             
-            print(f"✅ Полный конфиг сохранен: {output_file}")
+            print(f"✅ Полный конфиг сохранен: {output_path}")
             print(f"    Сгенерировано для {len(table_configs)} таблиц")
+            return output_path
             
         except Exception as e:
             print(f"❌ Ошибка: {e}")
+            return None
     
     def run(self):
         """Запускает селектор"""
@@ -177,6 +245,24 @@ class ConfigSelector:
             
             input("\nНажмите Enter чтобы продолжить...")
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация полного конфига по схеме базы данных")
+    parser.add_argument('--config', help="минимальный конфиг (путь или имя файла из examples)")
+    parser.add_argument('--output', help="куда сохранить полный конфиг (по умолчанию examples/<имя>_full.json)")
+    parser.add_argument('--from-stats', action='store_true',
+                        help="выводить правила и число строк из pg_stats (без чтения таблиц)")
+    parser.add_argument('--reference-schema', help="схема, чья статистика воспроизводится (по умолчанию схема конфига)")
+    parser.add_argument('--scale', type=float, default=1.0, help="множитель числа строк относительно reltuples")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
     selector = ConfigSelector()
-    selector.run()
\ No newline at end of file
+    if args.config:
+        # Неинтерактивный режим для скриптов и CI
+        result = selector.generate_from_config(args.config, args.output, args.from_stats,
+                                               args.reference_schema, args.scale)
+        sys.exit(0 if result else 1)
+    selector.run()
@@ -0,0 +1,69 @@
+import threading
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+
+class KeyRegistry:
+    """Реестр значений ключевых колонок, на которые ссылаются внешние ключи.
+
+    Для каждой пары "таблица.колонка" хранит ключи строк, существовавших до
+    запуска (читаются из базы один раз), и ключи, вставленные за запуск.
+    Дочерние таблицы берут значения внешних ключей отсюда, не перечитывая
+    родительскую таблицу после каждой вставки.
+    """
+
+    def __init__(self):
+        self._existing = {}
+        self._inserted = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(table_name: str, column_name: str) -> str:
+        return f"{table_name}.{column_name}"
+
+    def has_existing(self, table_name: str, column_name: str) -> bool:
+        """Прочитаны ли уже ключи, существовавшие до запуска"""
+        with self._lock:
+            return self.key(table_name, column_name) in self._existing
+
+    def set_existing(self, table_name: str, column_name: str, values: List[Any]):
+        with self._lock:
+            self._existing[self.key(table_name, column_name)] = list(values)
+
+    def add_inserted(self, table_name: str, column_name: str, values: List[Any]):
+        """Добавляет ключи строк, вставленных и зафиксированных за запуск"""
+        with self._lock:
+            self._inserted.setdefault(self.key(table_name, column_name), []).extend(values)
+
+    def forget(self, table_name: str, column_name: str):
+        """Забывает колонку: следующий запрос снова прочитает ее значения из базы"""
+        key = self.key(table_name, column_name)
+        with self._lock:
+            self._existing.pop(key, None)
+            self._inserted.pop(key, None)
+
+    def get_values(self, table_name: str, column_name: str) -> Optional[List[Any]]:
+        """Все известные ключи колонки или None, если существующие ключи еще не прочитаны"""
+        key = self.key(table_name, column_name)
+        with self._lock:
+            if key not in self._existing:
+                return None
+            return self._existing[key] + self._inserted.get(key, [])
+
+    def count(self, table_name: str, column_name: str) -> Dict[str, int]:
+        """Сколько ключей колонки существовало до запуска и сколько вставлено"""
+        key = self.key(table_name, column_name)
+        with self._lock:
+            return {
+                'existing': len(self._existing.get(key, [])),
+                'inserted': len(self._inserted.get(key, []))
+            }
+
+
+def collect_keys(batches: Iterable[List[tuple]], column_names: List[str],
+                 collected: Dict[str, List[Any]]) -> Iterator[List[tuple]]:
+    """Пропускает пачки строк дальше, попутно собирая значения колонок collected"""
+    positions = [(column_names.index(column), values) for column, values in collected.items()]
+    for rows in batches:
+        for position, values in positions:
+            values.extend(row[position] for row in rows if row[position] is not None)
+        yield rows
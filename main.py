@@ -1,25 +1,62 @@
 from postgres_utils import PostgresUtils
-from database_config import DatabaseConfig
+from database_config import DatabaseConfig, load_config_file
+from table_scheduler import run_schedule
+from bulk_load import create_bulk_load
+from dataset_shard import DatasetShard, check_shardable
+from typing import List, Dict, Any
+import argparse
 import json
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Генератор синтетических данных для PostgreSQL")
+    parser.add_argument('--shard', type=int, help="номер среза набора данных этой машины (1..N)")
+    parser.add_argument('--shards', type=int, help="на сколько машин делится набор данных")
+    parser.add_argument('--abandon-bulk-load', action='store_true',
+                        help="не восстанавливать индексы и ограничения прерванной массовой загрузки, "
+                             "а вывести их DDL и отложить файл состояния")
+    args = parser.parse_args(argv)
+    if (args.shard is None) != (args.shards is None):
+        parser.error("--shard и --shards задаются вместе")
+    if args.shards is not None and not 1 <= args.shard <= args.shards:
+        parser.error(f"--shard должен быть от 1 до {args.shards}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
     print("🚀 Генератор синтетических данных для PostgreSQL")
     print("=" * 50)
 
-    # Загрузка конфигурации из JSON
-    config = DatabaseConfig.from_json('config.json')
-    if not config:
+    # Загрузка конфигурации из JSON: файл читается один раз для подключения и генерации
+    config_data = load_config_file('config.json')
+    if config_data is None:
         print("❌ Не удалось загрузить конфигурацию")
         return
+    config = DatabaseConfig(**config_data.get('database', {}))
+
+    with PostgresUtils(config, config_data) as pg_utils:
+        if args.shards is not None:
+            pg_utils.set_dataset_shard(DatasetShard(args.shard - 1, args.shards))
+        process_tables(pg_utils, config, args.abandon_bulk_load)
+        # План запуска (снимок схемы, порядок таблиц, проверки) для следующих запусков
+        pg_utils.save_plan_cache()
+        print(f"🔌 Открыто соединений с БД за запуск: {pg_utils.connections_opened}")
+        # Сводка по стадиям и таблицам, отчет metrics_report
+        pg_utils.metrics.finish()
 
-    pg_utils = PostgresUtils(config)
-    
-    # Проверка соединения 
-    if not pg_utils.test_connection():
-        print("❌ Нет соединения с базой данных!")
-        return
+    print("\n👋 Завершение работы")
 
-    print(f"✅ Успешное подключение к базе данных '{config.database}'")
+def process_tables(pg_utils: PostgresUtils, config: DatabaseConfig, abandon_bulk_load: bool = False):
+    """Обрабатывает таблицы из конфигурации через одно управляемое подключение"""
+    # В режиме записи в файлы база не нужна, если есть снимок схемы
+    if pg_utils.is_offline():
+        print(f"📁 Данные записываются в файлы каталога '{pg_utils.get_output_dir()}'")
+    else:
+        # Проверка соединения 
+        if not pg_utils.test_connection():
+            print("❌ Нет соединения с базой данных!")
+            return
+
+        print(f"✅ Успешное подключение к базе данных '{config.database}'")
 
     # Получение списка таблиц
     tables = pg_utils.get_all_tables()
@@ -38,78 +75,109 @@ def main():
         print("❌ В конфигурации не найдены таблицы для обработки")
         return
 
-    # Собираем существующие значения внешних ключей для всех таблиц
-    existing_fk_values = {}
-    
-    # Сначала обрабатываем родительские таблицы (без внешних ключей)
-    parent_tables = []
-    child_tables = []
-    
+    table_configs = {}
     for table_config in generation_config['tables']:
         table_name = table_config.get('table_name')
-        if table_name not in tables:
+        # Секции не входят в список таблиц, но их можно загружать и напрямую
+        if table_name not in tables and not pg_utils.get_catalog().get_partition_parent(table_name):
             print(f"❌ Таблица '{table_name}' не найдена в схеме '{config.schema}'")
             continue
-            
-        # Проверяем, есть ли у таблицы внешние ключи
-        foreign_keys = pg_utils.get_foreign_keys(table_name)
-        if foreign_keys:
-            child_tables.append(table_config)
-        else:
-            parent_tables.append(table_config)
-
-    # Обрабатываем сначала родительские таблицы
-    for table_config in parent_tables:
-        table_name = table_config.get('table_name')
-        rows_to_generate = table_config.get('rows_to_generate', 100)
-        
-        print(f"\n🔍 Обработка родительской таблицы: {table_name}")
-        print(f"📊 Будет сгенерировано строк: {rows_to_generate}")
-        
-        # Получение структуры таблицы
-        structure = pg_utils.get_table_structure(table_name)
-        if not structure:
-            print(f"❌ Не удалось получить структуру таблицы '{table_name}'")
-            continue
-
-        # Показ структуры таблицы
-        pg_utils.display_table_structure(table_name, structure)
-
-        # Генерация и вставка данных
-        print(f"\n Генерация {rows_to_generate} строк для таблицы '{table_name}'...")
-        success = pg_utils.insert_data_with_fk_handling(table_name, rows_to_generate)
-        
-        if success:
-            # Сохраняем сгенерированные значения для использования в дочерних таблицах
-            pg_utils._collect_generated_fk_values(table_name, existing_fk_values)
-        else:
-            print(f"❌ Ошибка при обработке таблицы '{table_name}'")
-
-    # Затем обрабатываем дочерние таблицы
-    for table_config in child_tables:
-        table_name = table_config.get('table_name')
-        rows_to_generate = table_config.get('rows_to_generate', 100)
-        
-        print(f"\n🔍 Обработка дочерней таблицы: {table_name}")
-        print(f"📊 Будет сгенерировано строк: {rows_to_generate}")
-        
-        # Получение структуры таблицы
-        structure = pg_utils.get_table_structure(table_name)
-        if not structure:
-            print(f"❌ Не удалось получить структуру таблицы '{table_name}'")
-            continue
+        table_configs[table_name] = table_config
 
-        # Показ структуры таблицы
-        pg_utils.display_table_structure(table_name, structure)
+    # Строим порядок обработки по графу внешних ключей: родители раньше потомков
+    schedule = pg_utils.get_schedule(list(table_configs))
+    schedule.display()
 
-        # Генерация и вставка данных с использованием существующих FK значений
-        print(f"\n Генерация {rows_to_generate} строк для таблицы '{table_name}'...")
-        success = pg_utils.insert_data_with_fk_handling(table_name, rows_to_generate)
-        
-        if not success:
-            print(f"❌ Ошибка при обработке таблицы '{table_name}'")
+    shard = pg_utils.dataset_shard
+    if shard is not None and not check_dataset_shard(pg_utils, table_configs):
+        return
 
-    print("\n👋 Завершение работы")
+    # Каждая одновременно обрабатываемая таблица держит свои соединения из пула
+    parallelism = pg_utils.get_table_parallelism()
+    connections_per_table = max([pg_utils.get_load_connections(name) for name in table_configs] or [1])
+    max_parallelism = max(1, config.pool_max_size // connections_per_table)
+    if parallelism > max_parallelism:
+        print(f"⚠️  table_parallelism={parallelism} не помещается в pool_max_size={config.pool_max_size}, "
+              f"используется {max_parallelism}")
+        parallelism = max_parallelism
+
+    def process_table(table_name: str) -> bool:
+        return process_table_config(pg_utils, table_configs[table_name], schedule.deferred_columns(table_name))
+
+    # Массовая загрузка: индексы и ограничения снимаются на время загрузки
+    bulk_load = None
+    if shard is None:
+        bulk_load = create_bulk_load(pg_utils, list(table_configs), abandon_bulk_load)
+    elif pg_utils.generation_config.get('global_settings', {}).get('bulk_load'):
+        print("⚠️  bulk_load не действует при загрузке шардами: другие машины загружают те же таблицы")
+    if bulk_load is not None:
+        with pg_utils.metrics.timer('bulk_load'):
+            prepared = bulk_load.prepare()
+        if not prepared:
+            return
+
+    try:
+        run_schedule(schedule, process_table, parallelism)
+
+        # Отложенные внешние ключи заполняем, когда загружены обе таблицы
+        for fk in schedule.deferred:
+            if shard is not None:
+                print(f"⚠️  Отложенный внешний ключ {fk} при загрузке шардами остается пустым: "
+                      f"строки других машин могут быть еще не загружены")
+                continue
+            pg_utils.fill_deferred_foreign_key(fk.table_name, fk.columns, fk.foreign_table_name, fk.foreign_columns)
+    finally:
+        if bulk_load is not None:
+            with pg_utils.metrics.timer('bulk_load'):
+                bulk_load.finish()
+
+    # Файлы загружаются в том же порядке, в котором обрабатывались таблицы
+    if pg_utils.is_offline():
+        pg_utils.write_load_script([table_name for level in schedule.levels for table_name in level])
+
+def check_dataset_shard(pg_utils: PostgresUtils, table_configs: Dict[str, Dict[str, Any]]) -> bool:
+    """Проверяет, что набор данных можно разделить между машинами (--shard/--shards)"""
+    print(f"🧩 Загрузка среза {pg_utils.dataset_shard.label} набора данных")
+    errors = []
+    # Без seed значения зависят от случайного зерна процесса, а не от номера строки
+    if pg_utils.get_seed() is None:
+        errors.append("для --shards нужен global_settings.seed: все машины генерируют строки одного набора")
+    for table_name, table_config in table_configs.items():
+        columns = [column['name'] for column in pg_utils.get_table_structure(table_name)
+                   if not pg_utils._is_generated_column(column) and not pg_utils._is_auto_increment_column(column)]
+        errors.extend(check_shardable(table_name, table_config, columns, pg_utils.get_key_columns(table_name)))
+    for error in errors:
+        print(f"❌ {error}")
+    return not errors
+
+def process_table_config(pg_utils: PostgresUtils, table_config: Dict[str, Any], deferred_columns: List[str]) -> bool:
+    """Генерирует и вставляет данные одной таблицы из конфигурации"""
+    table_name = table_config.get('table_name')
+    rows_to_generate = table_config.get('rows_to_generate', 100)
+    is_parent = not pg_utils.get_foreign_keys(table_name)
+    
+    if is_parent:
+        print(f"\n🔍 Обработка родительской таблицы: {table_name}")
+    else:
+        print(f"\n🔍 Обработка дочерней таблицы: {table_name}")
+    print(f"📊 Будет сгенерировано строк: {rows_to_generate}")
+    
+    # Получение структуры таблицы
+    structure = pg_utils.get_table_structure(table_name)
+    if not structure:
+        print(f"❌ Не удалось получить структуру таблицы '{table_name}'")
+        return False
+
+    # Показ структуры таблицы
+    pg_utils.display_table_structure(table_name, structure)
+
+    # Генерация и вставка данных; ключи родительских таблиц берутся из реестра ключей
+    print(f"\n Генерация {rows_to_generate} строк для таблицы '{table_name}'...")
+    success = pg_utils.insert_data_with_fk_handling(table_name, rows_to_generate, deferred_columns)
+    
+    if not success:
+        print(f"❌ Ошибка при обработке таблицы '{table_name}'")
+    return success
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
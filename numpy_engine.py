@@ -0,0 +1,99 @@
+import random
+from typing import List, Dict, Any, Callable, Optional
+
+import rule_primitives
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него используется чисто Python-движок
+    np = None
+
+INT64_MAX = 2 ** 63 - 1
+
+
+def is_available() -> bool:
+    """Установлен ли NumPy"""
+    return np is not None
+
+
+def create_generator(rng: random.Random):
+    """Создает генератор NumPy, засеянный из Python-генератора плана"""
+    return np.random.default_rng(rng.getrandbits(64))
+
+
+def compile_vector_rule(rules: Dict[str, Any], np_rng) -> Optional[Callable[[int], Any]]:
+    """Компилирует правило в функцию, генерирующую сразу массив из count значений.
+
+    Распределения совпадают с Python-движком. Для типов, которые не
+    векторизуются (text, email, pattern), возвращает None.
+    """
+    value_type = rules.get('type', 'text')
+    # Частые значения, гистограммы и интервалы генерируются Python-движком
+    if rules.get('common_values') or rules.get('histogram') or rules.get('ranges'):
+        return None
+
+    if value_type == 'int':
+        min_val = rules.get('min_value', 1)
+        max_val = rules.get('max_value', 100)
+        if min_val > max_val:
+            raise ValueError(f"min_value {min_val} больше max_value {max_val}")
+        if min_val < -INT64_MAX or max_val >= INT64_MAX:
+            return None
+        return lambda count: np_rng.integers(min_val, max_val + 1, size=count, dtype=np.int64)
+
+    if value_type == 'decimal':
+        min_val = rules.get('min_value', 1.0)
+        width = rules.get('max_value', 1000.0) - min_val
+        precision = rules.get('precision', 2)
+        return lambda count: np.round(min_val + width * np_rng.random(count), precision)
+
+    if value_type == 'timestamp':
+        start_date, end_date = rule_primitives.validate_date_range(
+            rules.get('start_date', '2020-01-01 00:00:00'), rules.get('end_date', '2024-12-31 23:59:59'))
+        start = np.datetime64(start_date.replace(microsecond=0), 's')
+        total_seconds = int((end_date - start_date).total_seconds())
+        return lambda count: start + np_rng.integers(0, total_seconds + 1, size=count)
+
+    if value_type == 'date':
+        start_date, end_date = rule_primitives.validate_date_range(
+            rules.get('start_date', '2020-01-01'), rules.get('end_date', '2024-12-31'))
+        start = np.datetime64(start_date.date(), 'D')
+        total_days = (end_date - start_date).days
+        return lambda count: start + np_rng.integers(0, total_days + 1, size=count)
+
+    if value_type == 'boolean':
+        true_probability = rules.get('true_probability', 0.5)
+        return lambda count: np_rng.random(count) < true_probability
+
+    if value_type == 'enum':
+        values = list(rules.get('values', ['value1', 'value2']))
+        if not values:
+            raise ValueError("Пустой список values")
+        if rules.get('weights') is not None:
+            return compile_vector_weighted_choice(values, list(rules['weights']), np_rng)
+        return compile_vector_choice(values, np_rng)
+
+    return None
+
+
+def compile_vector_choice(values: List[Any], np_rng) -> Callable[[int], Any]:
+    """Случайный выбор из списка значений (enum, внешние ключи) целым массивом"""
+    pool = np.empty(len(values), dtype=object)
+    pool[:] = values
+    size = len(values)
+    return lambda count: pool[np_rng.integers(0, size, size=count)]
+
+
+def compile_vector_weighted_choice(values: List[Any], weights: List[float], np_rng) -> Callable[[int], Any]:
+    """Выбор из списка значений с весами целым массивом"""
+    pool = np.empty(len(values), dtype=object)
+    pool[:] = values
+    cum_weights = np.cumsum(np.asarray(weights, dtype=np.float64))
+    total = cum_weights[-1]
+    last = len(values) - 1
+    return lambda count: pool[np.minimum(np.searchsorted(cum_weights, np_rng.random(count) * total, side='right'), last)]
+
+
+def null_positions(np_rng, count: int, null_probability: float) -> List[int]:
+    """Позиции, в которых значение должно стать NULL"""
+    return np.flatnonzero(np_rng.random(count) < null_probability).tolist()
@@ -0,0 +1,91 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+
+from database_config import DatabaseConfig
+from generation_plan import compile_table_plan
+from key_registry import collect_keys
+from schema_catalog import SchemaCatalog
+
+
+def split_rows(num_rows: int, shards: int) -> List[int]:
+    """Делит num_rows строк на shards почти равных частей"""
+    return [num_rows * (shard + 1) // shards - num_rows * shard // shards for shard in range(shards)]
+
+
+def shard_rng(seed: int, table_name: str, shard: int) -> random.Random:
+    """Независимый генератор случайных чисел для шарда таблицы"""
+    return random.Random(f"{seed}/{table_name}/{shard}")
+
+
+def run_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Генерирует и вставляет один шард таблицы (выполняется в дочернем процессе).
+
+    Шард компилирует свой план с собственным генератором случайных чисел
+    и своей частью пространства уникальных значений, поэтому шарды не
+    обмениваются уже выданными значениями. Снимок каталога приходит из
+    основного процесса: шард не читает pg_catalog и не пишет schema_cache
+    и plan_cache, которые в это время могут писать другие шарды.
+    """
+    # Импорт внутри функции: при запуске процессов через spawn модуль
+    # postgres_utils сам импортирует parallel_generation
+    import postgres_utils
+
+    started = time.perf_counter()
+    table_name = task['table_name']
+    config = DatabaseConfig(**task['db_params'])
+    keys = {}
+    files = []
+    metrics = {}
+    global_settings = {key: value for key, value in task['generation_config'].get('global_settings', {}).items()
+                       if key not in ('schema_cache', 'plan_cache')}
+    shard_config = {**task['generation_config'], 'global_settings': global_settings}
+
+    try:
+        with postgres_utils.PostgresUtils(config, shard_config) as pg_utils:
+            if task['catalog'] is not None:
+                pg_utils._catalog = SchemaCatalog.from_dict(task['catalog'])
+            plan = compile_table_plan(
+                table_name,
+                task['columns'],
+                pg_utils.get_plan_config(table_name),
+                task['generation_config'].get('global_settings', {}),
+                task['foreign_keys'],
+                task['existing_fk_values'],
+                task['engine'],
+                shard_rng(task['seed'], table_name, task['shard']),
+                (task['shard'], task['shards']),
+                task['seed'] if task['seeded'] else None
+            )
+            # С seed значения ячеек зависят от номера строки: шард продолжает нумерацию
+            plan.next_row = task['row_start']
+            # Ключи, на которые ссылаются дочерние таблицы, возвращаются в основной процесс
+            keys = {column: [] for column in task['key_columns'] if column in plan.column_names}
+            label = f"'{table_name}' шард {task['shard'] + 1}/{task['shards']}"
+            batches = pg_utils.generate_row_batches(plan, task['rows'], task['batch_size'], label)
+            success = pg_utils.load_row_batches(table_name, plan.column_names,
+                                                collect_keys(batches, plan.column_names, keys), task['shard'])
+            batches.close()
+            files = pg_utils.output_files.get(table_name, {}).get('files', [])
+            # Время стадий и повторы уникальных значений шарда суммируются в основном процессе
+            metrics = pg_utils.metrics.table_report(table_name)
+    except Exception as e:
+        print(f"❌ Шард {task['shard'] + 1}/{task['shards']} таблицы '{table_name}': {e}")
+        success = False
+
+    return {
+        'shard': task['shard'],
+        'rows': task['rows'],
+        'success': success,
+        'seconds': time.perf_counter() - started,
+        'keys': keys if success else {},
+        'files': files if success else [],
+        'metrics': metrics
+    }
+
+
+def run_parallel(tasks: List[Dict[str, Any]], workers: int) -> List[Dict[str, Any]]:
+    """Выполняет шарды в пуле процессов и возвращает их результаты по порядку шардов"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_shard, tasks))
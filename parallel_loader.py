@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+from typing import List, Dict, Any, Iterable
+
+# Политики обработки ошибок при параллельной загрузке
+FAILURE_POLICIES = ('abort', 'keep')
+
+# Маркер конца очереди для потоков-писателей
+_STOP = object()
+
+
+class LoaderWorkerStats:
+    """Статистика одного потока-писателя"""
+
+    def __init__(self, worker: int):
+        self.worker = worker
+        self.rows = 0
+        self.batches = 0
+        self.committed_rows = 0
+        self.busy_seconds = 0.0
+        self.error = None
+        self.stopped = False
+        self.written = threading.Event()
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'worker': self.worker,
+            'rows': self.rows,
+            'batches': self.batches,
+            'committed_rows': self.committed_rows,
+            'seconds': round(self.busy_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'error': str(self.error) if self.error else None
+        }
+
+
+class ParallelLoader:
+    """Загружает одну таблицу через несколько соединений одновременно.
+
+    Пачки строк из генератора попадают в ограниченную очередь, откуда их
+    разбирают потоки-писатели: у каждого свое соединение из пула и своя
+    транзакция, каждая пачка уходит ровно в одно соединение.
+
+    Политика ошибок:
+    - 'abort' - писатели держат транзакции открытыми до конца загрузки и
+      фиксируют их, только если все писатели записали свои пачки без ошибок,
+      иначе все транзакции откатываются;
+    - 'keep' - каждая пачка фиксируется сразу; при ошибке загрузка
+      останавливается, а уже зафиксированные пачки остаются в таблице.
+    """
+
+    def __init__(self, pg_utils, table_name: str, columns: List[str], connections: int,
+                 failure_policy: str = 'abort', depth: int = 2):
+        if failure_policy not in FAILURE_POLICIES:
+            raise ValueError(f"Неизвестная политика ошибок '{failure_policy}', ожидается одна из {FAILURE_POLICIES}")
+        self.pg_utils = pg_utils
+        self.table_name = table_name
+        self.columns = columns
+        self.connections = connections
+        self.failure_policy = failure_policy
+        self.stats = [LoaderWorkerStats(worker) for worker in range(connections)]
+        self._queue = queue.Queue(maxsize=connections * max(1, depth))
+        self._failed = threading.Event()
+        self._decided = threading.Event()
+        self._commit = False
+
+    def _consume(self, conn, stats: LoaderWorkerStats):
+        """Забирает пачки из очереди до маркера конца и отправляет их на сервер.
+
+        После ошибки (своей или другого писателя) пачки только вычитываются,
+        чтобы генератор не заблокировался на полной очереди.
+        """
+        with conn.cursor() as cursor:
+            while True:
+                rows = self._queue.get()
+                if rows is _STOP:
+                    stats.stopped = True
+                    return
+                if self._failed.is_set():
+                    continue
+
+                started = time.perf_counter()
+                try:
+                    written = self.pg_utils.write_rows(cursor, self.table_name, self.columns, rows)
+                    if self.failure_policy == 'keep':
+                        with self.pg_utils.metrics.timer('commit', self.table_name):
+                            conn.commit()
+                        stats.committed_rows += written
+                except Exception as e:
+                    stats.error = e
+                    self._failed.set()
+                    conn.rollback()
+                    continue
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+                stats.rows += written
+                stats.batches += 1
+
+    def _run_worker(self, stats: LoaderWorkerStats):
+        try:
+            with self.pg_utils.connection() as conn:
+                self._consume(conn, stats)
+                stats.written.set()
+
+                if self.failure_policy == 'abort':
+                    # Фиксация только после того, как все писатели закончили запись
+                    self._decided.wait()
+                    if self._commit and stats.error is None:
+                        with self.pg_utils.metrics.timer('commit', self.table_name):
+                            conn.commit()
+                        stats.committed_rows = stats.rows
+                    else:
+                        conn.rollback()
+        except Exception as e:
+            stats.error = stats.error or e
+            self._failed.set()
+        finally:
+            if not stats.stopped:
+                while self._queue.get() is not _STOP:
+                    pass
+                stats.stopped = True
+            stats.written.set()
+
+    def load(self, batches: Iterable[List[tuple]]) -> bool:
+        """Загружает все пачки; возвращает True, если все строки зафиксированы"""
+        threads = [
+            threading.Thread(target=self._run_worker, args=(stats,), daemon=True,
+                             name=f"loader-{self.table_name}-{stats.worker}")
+            for stats in self.stats
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        producer_error = None
+        try:
+            for rows in batches:
+                if self._failed.is_set():
+                    break
+                if rows:
+                    # Очередь ограничена: генератор ждет, пока писатели освободятся
+                    self._queue.put(rows)
+        except Exception as e:
+            producer_error = e
+            self._failed.set()
+        finally:
+            for _ in threads:
+                self._queue.put(_STOP)
+
+        for stats in self.stats:
+            stats.written.wait()
+        self._commit = not self._failed.is_set()
+        self._decided.set()
+        for thread in threads:
+            thread.join()
+
+        self._report(time.perf_counter() - started)
+
+        if producer_error is not None:
+            raise producer_error
+        return self._commit
+
+    def _report(self, elapsed: float):
+        """Печатает статистику каждого писателя и загрузки в целом"""
+        for stats in self.stats:
+            status = f"❌ {str(stats.error).splitlines()[0]}" if stats.error else "✅"
+            print(f"   🔌 Соединение {stats.worker + 1}: {stats.rows} строк, {stats.batches} пачек, "
+                  f"{stats.busy_seconds:.2f} с, {stats.rows_per_second:.0f} строк/с {status}")
+
+        summary = self.summary()
+        print(f"📊 Загрузка '{self.table_name}' через {self.connections} соединений: "
+              f"зафиксировано {summary['committed_rows']} из {summary['rows']} строк за {elapsed:.2f} с "
+              f"({summary['committed_rows'] / max(elapsed, 1e-9):.0f} строк/с)")
+
+    def summary(self) -> Dict[str, Any]:
+        """Итог загрузки: записанные и зафиксированные строки по всем писателям"""
+        return {
+            'rows': sum(stats.rows for stats in self.stats),
+            'committed_rows': sum(stats.committed_rows for stats in self.stats),
+            'workers': [stats.to_dict() for stats in self.stats]
+        }
@@ -0,0 +1,401 @@
+import re
+import time
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from rule_primitives import parse_date
+
+# Сколько пачек строк могут ждать в буферах секций; сверх этого самый
+# большой буфер отправляется, не дожидаясь полной пачки
+PARTITION_BUFFER_BATCHES = 8
+
+# Границы секций в выводе pg_get_expr: литералы в кавычках, скобки, запятые и слова
+_BOUND_TOKEN = re.compile(r"\s*(?:'((?:[^']|'')*)'|([(),])|([^\s(),']+))")
+
+
+class _Infinity:
+    """MINVALUE или MAXVALUE в границе диапазонной секции"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+MINVALUE = _Infinity('MINVALUE')
+MAXVALUE = _Infinity('MAXVALUE')
+
+
+def _tokenize_bound(bound: str) -> List[Tuple[str, Any]]:
+    tokens = []
+    position = 0
+    while position < len(bound):
+        match = _BOUND_TOKEN.match(bound, position)
+        if match is None or match.end() == position:
+            if bound[position:].strip():
+                raise ValueError(f"не удалось разобрать границу секции: {bound}")
+            break
+        literal, punct, word = match.groups()
+        if literal is not None:
+            tokens.append(('value', literal.replace("''", "'")))
+        elif punct is not None:
+            tokens.append((punct, punct))
+        elif word.upper() == 'NULL':
+            tokens.append(('value', None))
+        elif word.upper() == 'MINVALUE':
+            tokens.append(('value', MINVALUE))
+        elif word.upper() == 'MAXVALUE':
+            tokens.append(('value', MAXVALUE))
+        else:
+            tokens.append(('word', word))
+        position = match.end()
+    return tokens
+
+
+def _take_list(tokens: List[Tuple[str, Any]], position: int) -> Tuple[List[Any], int]:
+    """Значения в скобках, начиная с '(' в позиции position"""
+    if position >= len(tokens) or tokens[position][0] != '(':
+        raise ValueError("ожидается список значений в скобках")
+    values = []
+    position += 1
+    while position < len(tokens) and tokens[position][0] != ')':
+        kind, value = tokens[position]
+        if kind in ('value', 'word'):
+            values.append(value)
+        position += 1
+    if position >= len(tokens):
+        raise ValueError("список значений не закрыт")
+    return values, position + 1
+
+
+def parse_partition_bound(bound: str) -> Dict[str, Any]:
+    """Разбирает границу секции из pg_get_expr(relpartbound).
+
+    Возвращает {'kind': 'default'}, {'kind': 'range', 'from': [...], 'to': [...]},
+    {'kind': 'list', 'values': [...]} или {'kind': 'hash'}; значения - текст
+    литералов, None для NULL и MINVALUE/MAXVALUE.
+    """
+    if bound.strip().upper() == 'DEFAULT':
+        return {'kind': 'default'}
+    tokens = _tokenize_bound(bound)
+    words = [str(value).upper() for kind, value in tokens[:3] if kind == 'word']
+    if words[:2] != ['FOR', 'VALUES'] or len(words) < 3:
+        raise ValueError(f"неизвестная граница секции: {bound}")
+    if words[2] == 'FROM':
+        lower, position = _take_list(tokens, 3)
+        if position >= len(tokens) or str(tokens[position][1]).upper() != 'TO':
+            raise ValueError(f"неизвестная граница секции: {bound}")
+        upper, _ = _take_list(tokens, position + 1)
+        return {'kind': 'range', 'from': lower, 'to': upper}
+    if words[2] == 'IN':
+        values, _ = _take_list(tokens, 3)
+        return {'kind': 'list', 'values': values}
+    if words[2] == 'WITH':
+        return {'kind': 'hash'}
+    raise ValueError(f"неизвестная граница секции: {bound}")
+
+
+def _to_decimal(value: Any) -> Decimal:
+    try:
+        return value if isinstance(value, Decimal) else Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"не число: {value!r}")
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return parse_date(str(value)).date()
+
+
+def _to_timestamp(value: Any) -> datetime:
+    # Смещение часового пояса отбрасывается: генератор пишет время без пояса,
+    # и сервер, как и в границах секций, трактует его в часовом поясе сессии
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return parse_date(str(value)).replace(tzinfo=None)
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('t', 'true', 'y', 'yes', 'on', '1')
+    return bool(value)
+
+
+def key_converter(data_type: str) -> Callable[[Any], Any]:
+    """Приводит значения ключа секционирования (сгенерированные и из границ) к сравнимому виду"""
+    data_type = data_type.lower()
+    if data_type in ('smallint', 'integer', 'bigint'):
+        return int
+    if data_type in ('numeric', 'real', 'double precision'):
+        return _to_decimal
+    if data_type == 'date':
+        return _to_date
+    if data_type.startswith('timestamp'):
+        return _to_timestamp
+    if data_type == 'boolean':
+        return _to_bool
+    return str
+
+
+def _range_key(values: List[Any], converters: List[Callable[[Any], Any]]) -> tuple:
+    """Ключ сравнения границы: MINVALUE меньше, а MAXVALUE больше любого значения"""
+    key = []
+    for value, convert in zip(values, converters):
+        if value is MINVALUE:
+            key.append((0, None))
+        elif value is MAXVALUE:
+            key.append((2, None))
+        else:
+            key.append((1, convert(value)))
+    return tuple(key)
+
+
+class PartitionNode:
+    """Уровень дерева секций: по ключу строки выбирает секцию этой таблицы.
+
+    Секция, которая сама секционирована, выбирает дальше своим узлом.
+    Узел, который нельзя вычислить на клиенте (hash, ключ по выражению,
+    ключ, который заполняет база), не создается: строки уходят в его
+    таблицу, и секцию выбирает сервер.
+    """
+
+    def __init__(self, table_name: str, strategy: str, positions: List[int],
+                 converters: List[Callable[[Any], Any]]):
+        self.table_name = table_name
+        self.strategy = strategy
+        self.positions = positions
+        self.converters = converters
+        self.lowers = []
+        self.uppers = []
+        self.range_targets = []
+        self.list_targets = {}
+        self.default = None
+
+    def add_range(self, lower: List[Any], upper: List[Any], target):
+        self.lowers.append(_range_key(lower, self.converters))
+        self.uppers.append(_range_key(upper, self.converters))
+        self.range_targets.append(target)
+
+    def sort_ranges(self):
+        order = sorted(range(len(self.lowers)), key=lambda index: self.lowers[index])
+        self.lowers = [self.lowers[index] for index in order]
+        self.uppers = [self.uppers[index] for index in order]
+        self.range_targets = [self.range_targets[index] for index in order]
+
+    def find(self, row: tuple):
+        """Секция (таблица-лист или узел следующего уровня) для строки"""
+        values = [row[position] for position in self.positions]
+        if self.strategy == 'list':
+            value = values[0]
+            target = self.list_targets.get(None if value is None else self.converters[0](value))
+        elif any(value is None for value in values):
+            # Строка с NULL в ключе диапазона попадает только в секцию по умолчанию
+            target = None
+        else:
+            key = tuple((1, convert(value)) for value, convert in zip(values, self.converters))
+            index = bisect_right(self.lowers, key) - 1
+            target = self.range_targets[index] if index >= 0 and key < self.uppers[index] else None
+        if target is None:
+            target = self.default
+        if target is None:
+            raise ValueError(f"нет секции таблицы '{self.table_name}' для значения ключа "
+                             f"({', '.join(map(str, values))})")
+        return target.find(row) if isinstance(target, PartitionNode) else target
+
+
+class PartitionBatch(list):
+    """Пачка строк одной секции; relation = (схема, таблица), куда она загружается"""
+
+    def __init__(self, relation: Tuple[str, str], rows: List[tuple]):
+        super().__init__(rows)
+        self.relation = relation
+
+
+class PartitionRouter:
+    """Распределение сгенерированных строк по секциям на клиенте.
+
+    Строки раскладываются по буферам секций и отправляются пачками прямо
+    в секции-листы, поэтому сервер не выбирает секцию для каждой строки, а
+    разные секции загружаются разными соединениями (load_connections).
+    """
+
+    def __init__(self, table_name: str, root: PartitionNode, relations: List[Tuple[str, str]]):
+        self.table_name = table_name
+        self.root = root
+        self.relations = relations
+        # Время распределения строк (для метрик запуска)
+        self.seconds = 0.0
+
+    def route(self, rows: List[tuple]) -> Dict[Tuple[str, str], List[tuple]]:
+        """Строки одной пачки, разложенные по секциям"""
+        find = self.root.find
+        groups = {}
+        for row in rows:
+            relation = find(row)
+            group = groups.get(relation)
+            if group is None:
+                group = groups[relation] = []
+            group.append(row)
+        return groups
+
+    def route_batches(self, batches: Iterable[List[tuple]], batch_size: int) -> Iterator[PartitionBatch]:
+        """Пачки секций по batch_size строк из потока пачек таблицы.
+
+        В буферах ждут не больше PARTITION_BUFFER_BATCHES пачек: при
+        переполнении раньше отправляется самый большой буфер.
+        """
+        buffers = {}
+        buffered = 0
+        limit = batch_size * PARTITION_BUFFER_BATCHES
+        for rows in batches:
+            started = time.perf_counter()
+            ready = []
+            for relation, group in self.route(rows).items():
+                buffer = buffers.setdefault(relation, [])
+                buffer.extend(group)
+                if len(buffer) >= batch_size:
+                    ready.append(relation)
+            buffered += len(rows)
+            ready = [PartitionBatch(relation, buffers.pop(relation)) for relation in ready]
+            buffered -= sum(len(batch) for batch in ready)
+            while buffered > limit:
+                relation = max(buffers, key=lambda name: len(buffers[name]))
+                ready.append(PartitionBatch(relation, buffers.pop(relation)))
+                buffered -= len(ready[-1])
+            self.seconds += time.perf_counter() - started
+            yield from ready
+        for relation, rows in buffers.items():
+            yield PartitionBatch(relation, rows)
+
+
+def _build_node(catalog, table_name: str, columns: List[str], relations: List[Tuple[str, str]],
+                warnings: List[str]) -> Optional[PartitionNode]:
+    """Узел дерева секций таблицы или None, если секцию нельзя выбрать на клиенте"""
+    partitioning = catalog.get_partitioning(table_name)
+    if not partitioning:
+        return None
+    if partitioning['strategy'] not in ('range', 'list'):
+        warnings.append(f"Секции '{table_name}' ({partitioning['strategy']}) выбирает сервер")
+        return None
+    key = partitioning.get('key')
+    if not key:
+        warnings.append(f"Ключ секционирования '{table_name}' - выражение, секции выбирает сервер")
+        return None
+    missing = [column for column in key if column not in columns]
+    if missing:
+        warnings.append(f"Колонки ключа секционирования '{table_name}' {missing} заполняет база, "
+                        f"секции выбирает сервер")
+        return None
+
+    types = {column['name']: column['data_type'] for column in catalog.get_columns(table_name)}
+    node = PartitionNode(table_name, partitioning['strategy'], [columns.index(column) for column in key],
+                         [key_converter(types.get(column, 'text')) for column in key])
+    try:
+        for partition in partitioning['partitions']:
+            relation = (partition['schema'], partition['name'])
+            target = None
+            if partition['schema'] == catalog.schema:
+                target = _build_node(catalog, partition['name'], columns, relations, warnings)
+            if target is None:
+                target = relation
+                relations.append(relation)
+            bound = parse_partition_bound(partition['bound'])
+            if bound['kind'] == 'default':
+                node.default = target
+            elif bound['kind'] == 'range':
+                node.add_range(bound['from'], bound['to'], target)
+            elif bound['kind'] == 'list':
+                convert = node.converters[0]
+                for value in bound['values']:
+                    node.list_targets[None if value is None else convert(value)] = target
+        node.sort_ranges()
+    except (ValueError, TypeError) as e:
+        warnings.append(f"Границы секций '{table_name}' не разобраны ({e}), секции выбирает сервер")
+        return None
+    return node
+
+
+def build_partition_router(catalog, table_name: str, columns: List[str]) -> Tuple[Optional[PartitionRouter], List[str]]:
+    """Маршрутизатор строк секционированной таблицы по снимку схемы.
+
+    columns - колонки загружаемых строк в их порядке. Возвращает
+    (маршрутизатор или None, предупреждения об уровнях, где секцию
+    выбирает сервер).
+    """
+    relations = []
+    warnings = []
+    root = _build_node(catalog, table_name, columns, relations, warnings)
+    if root is None:
+        return None, warnings
+    return PartitionRouter(table_name, root, relations), warnings
+
+
+def partition_spread_rule(catalog, table_name: str,
+                          column_rules: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+    """Правило ключа секционирования, равномерно распределяющее строки по секциям.
+
+    Для диапазонных секций по int, date или timestamp - правило с ranges
+    (полуинтервалы границ секций), для секций-списков - enum, в котором
+    каждая секция выбирается с равной вероятностью. Секции без нижней или
+    верхней границы, секции только с NULL и секция по умолчанию строк не
+    получают. Возвращает
+    (колонка, правило); если ключ так не распределить - ValueError.
+    """
+    partitioning = catalog.get_partitioning(table_name)
+    if not partitioning:
+        raise ValueError("таблица не секционирована")
+    key = partitioning.get('key')
+    if not key or len(key) != 1:
+        raise ValueError("равномерное распределение поддерживается только для ключа из одной колонки")
+    column_name = key[0]
+    data_type = next((column['data_type'] for column in catalog.get_columns(table_name)
+                      if column['name'] == column_name), 'text').lower()
+    convert = key_converter(data_type)
+    # Доля NULL из правила колонки сохраняется
+    spread = {key: value for key, value in (column_rules or {}).get(column_name, {}).items()
+              if key == 'null_probability'}
+    bounds = [parse_partition_bound(partition['bound']) for partition in partitioning['partitions']]
+
+    if partitioning['strategy'] == 'list':
+        values = []
+        weights = []
+        for bound in bounds:
+            listed = [convert(value) for value in bound.get('values', []) if value is not None]
+            if not listed:
+                continue
+            values.extend(listed)
+            weights.extend([1.0 / len(listed)] * len(listed))
+        if not values:
+            raise ValueError("нет секций со значениями")
+        spread.update({'type': 'enum', 'values': values, 'weights': weights})
+        return column_name, spread
+
+    if partitioning['strategy'] != 'range':
+        raise ValueError(f"секции {partitioning['strategy']} нельзя заполнить равномерно на клиенте")
+    if data_type in ('smallint', 'integer', 'bigint'):
+        value_type, fmt = 'int', None
+    elif data_type == 'date':
+        value_type, fmt = 'date', '%Y-%m-%d'
+    elif data_type.startswith('timestamp'):
+        value_type, fmt = 'timestamp', '%Y-%m-%d %H:%M:%S'
+    else:
+        raise ValueError(f"диапазонные секции по типу {data_type} не поддерживаются")
+    ranges = []
+    for bound in bounds:
+        if bound['kind'] != 'range' or MINVALUE in bound['from'] + bound['to'] \
+                or MAXVALUE in bound['from'] + bound['to']:
+            continue
+        low, high = convert(bound['from'][0]), convert(bound['to'][0])
+        ranges.append([low, high] if fmt is None else [low.strftime(fmt), high.strftime(fmt)])
+    if not ranges:
+        raise ValueError("нет секций с конечными границами")
+    spread.update({'type': value_type, 'ranges': ranges})
+    return column_name, spread
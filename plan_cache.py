@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from typing import Dict, Any, Optional
+
+# Версия формата файла: кэш другой версии считается устаревшим
+PLAN_CACHE_VERSION = 2
+
+# Отпечаток схемы одним запросом к pg_catalog: таблицы, колонки, значения по
+# умолчанию, ограничения, индексы, ключи и границы секций. Объекты описываются
+# именами, а не oid, поэтому пересозданные с тем же определением индексы кэш
+# не сбрасывают
+SCHEMA_FINGERPRINT_QUERY = """
+SELECT md5(coalesce(string_agg(item, E'\\n' ORDER BY item), ''))
+FROM (
+    SELECT concat_ws(':', 'column', c.relname, c.relkind, a.attnum, a.attname,
+                     format_type(a.atttypid, a.atttypmod), a.attnotnull, a.attgenerated, a.attidentity,
+                     pg_get_expr(ad.adbin, ad.adrelid)) AS item
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef ad ON ad.adrelid = a.attrelid AND ad.adnum = a.attnum
+    WHERE n.nspname = %s
+    AND c.relkind IN ('r', 'p')
+    UNION ALL
+    SELECT concat_ws(':', 'constraint', c.relname, con.conname, pg_get_constraintdef(con.oid))
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s
+    UNION ALL
+    SELECT concat_ws(':', 'index', c.relname, pg_get_indexdef(i.indexrelid))
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s
+    UNION ALL
+    SELECT concat_ws(':', 'partition', c.relname, pg_get_partkeydef(c.oid), pg_get_expr(c.relpartbound, c.oid))
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s
+    AND (c.relkind = 'p' OR c.relispartition)
+) items;
+"""
+
+
+def schema_fingerprint(cursor, schema: str) -> str:
+    """Отпечаток структуры схемы (меняется при любом изменении таблиц, колонок, ключей, индексов и секций)"""
+    cursor.execute(SCHEMA_FINGERPRINT_QUERY, (schema, schema, schema, schema))
+    return cursor.fetchone()[0]
+
+
+def plan_cache_key(generation_config: Dict[str, Any], fingerprint: str) -> str:
+    """Ключ кэша: хеш конфигурации вместе с отпечатком схемы"""
+    config = json.dumps(generation_config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{PLAN_CACHE_VERSION}\n{fingerprint}\n{config}".encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """План запуска, сохраненный на диске между запусками с одной конфигурацией.
+
+    Хранит все, что выводится только из конфигурации и структуры схемы:
+    снимок каталога, порядок таблиц по внешним ключам, а по каждой таблице -
+    правило partition_spread, выведенное из границ секций, размеры
+    пространств уникальных колонок и результаты проверок емкости и
+    разбиения на шарды. Сами генераторы колонок собираются из этих
+    параметров при каждом запуске: замыкания не сериализуются, а генераторы
+    внешних ключей зависят от ключей, вставленных в этом запуске. Кэш с
+    другим ключом считается устаревшим и перезаписывается.
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key
+        self.hit = False
+        self.dirty = False
+        self.data = {'tables': {}}
+
+    def load(self) -> bool:
+        """Читает кэш; True, если его ключ совпал с текущим"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Не удалось прочитать кэш плана '{self.path}': {e}")
+            return False
+        if cached.get('version') != PLAN_CACHE_VERSION or cached.get('key') != self.key:
+            print(f"🔄 Кэш плана '{self.path}' устарел: изменилась конфигурация или схема")
+            return False
+        self.data = cached.get('plan', {'tables': {}})
+        self.data.setdefault('tables', {})
+        self.hit = True
+        return True
+
+    def get(self, section: str) -> Optional[Any]:
+        return self.data.get(section)
+
+    def put(self, section: str, value: Any):
+        self.data[section] = value
+        self.dirty = True
+
+    def get_table(self, table_name: str, item: str) -> Optional[Any]:
+        return self.data['tables'].get(table_name, {}).get(item)
+
+    def put_table(self, table_name: str, item: str, value: Any):
+        self.data['tables'].setdefault(table_name, {})[item] = value
+        self.dirty = True
+
+    def save(self) -> bool:
+        """Записывает кэш, если в нем что-то изменилось (через временный файл)"""
+        if not self.dirty:
+            return True
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': PLAN_CACHE_VERSION, 'key': self.key, 'plan': self.data}, f,
+                          ensure_ascii=False, default=str)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Не удалось сохранить кэш плана в '{self.path}': {e}")
+            return False
+        self.dirty = False
+        return True
+
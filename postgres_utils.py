@@ -2,18 +2,127 @@
 import psycopg2
 from psycopg2 import sql
 import random
-import string
 import json
-import re
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import os
+from copy_stream import CopyTextStream
+from copy_binary import BinaryCopyEncoder, BinaryCopyStream, unsupported_types
+from file_sink import FileSink, FILE_FORMATS, write_load_script
+from connection_pool import ManagedConnectionPool
+from schema_catalog import SchemaCatalog
+from table_scheduler import TableSchedule, build_schedule
+from plan_cache import PlanCache, plan_cache_key, schema_fingerprint
+from dataset_shard import (
+    DatasetShard, DEFAULT_SHARD_WAIT_TIMEOUT, SHARD_POLL_INTERVAL, batch_ranges
+)
+from partition_routing import PartitionRouter, build_partition_router, partition_spread_rule
+from bulk_load import get_session_settings
+import numpy_engine
+from parallel_generation import split_rows, run_parallel
+from parallel_loader import ParallelLoader, FAILURE_POLICIES
+from batch_pipeline import BatchPipeline, DEFAULT_PIPELINE_DEPTH, run_batches
+from key_registry import KeyRegistry, collect_keys
+from unique_values import check_unique_capacity, unique_space_sizes
+from counter_rng import derive_key
+from run_metrics import RunMetrics
+from generation_plan import (
+    TablePlan, compile_table_plan, compile_rule, compile_default, draw_unique,
+    fallback_rule_value, fallback_default_value, days_in_month, parse_date, validate_date_range
+)
 
 class PostgresUtils:
     """Класс для работы с PostgreSQL и генерации данных"""
     
-    def __init__(self, config):
+    def __init__(self, config, generation_config: Dict[str, Any] = None):
         self.config = config
-        self.generation_config = self._load_generation_config()
+        self.generation_config = generation_config if generation_config is not None else self._load_generation_config()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._closed_pools_connections = 0
+        self._catalog = None
+        self._catalog_lock = threading.Lock()
+        self._plan_cache = None
+        # Срез набора данных этой машины (main.py --shard K --shards N)
+        self.dataset_shard = None
+        # Ключи последних строк пачек других шардов: по ним видно, что их строки загружены
+        self._shard_probes = {}
+        # Конфигурации таблиц с правилом partition_spread и уже напечатанные предупреждения о секциях
+        self._plan_configs = {}
+        self._partition_warnings = set()
+        self.key_registry = KeyRegistry()
+        # Наибольшие значения ключей, которые заполняет база, до вставки таблицы
+        self._key_marks = {}
+        self.output_files = {}
+        self._output_lock = threading.Lock()
+        # Кодировщики COPY binary держат свой буфер, поэтому у каждого потока свои
+        self._binary_encoders = threading.local()
+        self._binary_fallback_tables = set()
+        self.metrics = RunMetrics(self.generation_config.get('global_settings', {}))
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _get_pool(self) -> ManagedConnectionPool:
+        """Создает пул соединений при первом обращении"""
+        with self._pool_lock:
+            if self._pool is None:
+                connection_params = self.config.get_connection_params()
+                # Настройки сессии bulk_load действуют во всех соединениях пула
+                session_settings = get_session_settings(self.generation_config.get('global_settings', {}))
+                if session_settings:
+                    # options заменяет PGOPTIONS, поэтому настройки пользователя сохраняются
+                    options = [connection_params.get('options') or os.environ.get('PGOPTIONS', '')]
+                    options.extend(f"-c {name}={value}" for name, value in session_settings.items())
+                    connection_params['options'] = ' '.join(option for option in options if option)
+                self._pool = ManagedConnectionPool(
+                    self.config.pool_min_size,
+                    self.config.pool_max_size,
+                    ping_interval=self.config.pool_ping_interval,
+                    **connection_params
+                )
+            return self._pool
+    
+    @contextmanager
+    def connection(self):
+        """Выдает соединение из пула: commit при успехе, rollback при ошибке"""
+        pool = self._get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            pool.putconn(conn)
+    
+    @property
+    def connections_opened(self) -> int:
+        """Сколько соединений с БД было открыто за время работы"""
+        opened = self._closed_pools_connections
+        if self._pool is not None:
+            opened += self._pool.connections_opened
+        return opened
+    
+    def close(self):
+        """Закрывает все соединения пула"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._closed_pools_connections += self._pool.connections_opened
+                self._pool.closeall()
+                self._pool = None
     
     def _load_generation_config(self) -> Dict[str, Any]:
         """Загружает конфигурацию генерации из JSON файла"""
@@ -34,49 +143,60 @@ class PostgresUtils:
                 return table_config
         return {}
     
+    def get_plan_config(self, table_name: str) -> Dict[str, Any]:
+        """Конфигурация таблицы для компиляции плана генерации.
+
+        С partition_spread правило ключа секционирования заменяется правилом,
+        которое равномерно распределяет строки по секциям таблицы.
+        """
+        table_config = self.get_table_config(table_name)
+        spread = table_config.get('partition_spread',
+                                  self.generation_config.get('global_settings', {}).get('partition_spread', False))
+        if not spread:
+            return table_config
+        if table_name in self._plan_configs:
+            return self._plan_configs[table_name]
+        
+        plan_config = table_config
+        catalog = self.get_catalog()
+        column_rules = table_config.get('column_rules', {})
+        # Правило выводится из границ секций; в кэше плана оно хранится, только если переживает JSON
+        spread = self._plan_cache.get_table(table_name, 'partition_spread') if self._plan_cache is not None else None
+        if spread is None:
+            spread = {'column': None, 'rule': None, 'error': None}
+            if catalog is not None and catalog.get_partitioning(table_name):
+                try:
+                    spread['column'], spread['rule'] = partition_spread_rule(catalog, table_name, column_rules)
+                    if spread['column'] in table_config.get('unique_columns', []):
+                        raise ValueError(f"колонка '{spread['column']}' уникальна")
+                except (ValueError, TypeError) as e:
+                    spread = {'column': None, 'rule': None, 'error': str(e)}
+            if self._plan_cache is not None and json.loads(json.dumps(spread, default=str)) == spread:
+                self._plan_cache.put_table(table_name, 'partition_spread', spread)
+        if spread['error'] is not None:
+            self._warn_partitions(f"⚠️  partition_spread для '{table_name}' не применяется: {spread['error']}")
+        elif spread['column'] is not None:
+            plan_config = dict(table_config, column_rules=dict(column_rules, **{spread['column']: spread['rule']}))
+        self._plan_configs[table_name] = plan_config
+        return plan_config
+    
+    def _warn_partitions(self, message: str):
+        """Печатает предупреждение о секциях один раз за запуск"""
+        if message not in self._partition_warnings:
+            self._partition_warnings.add(message)
+            print(message)
+    
     def _get_days_in_month(self, year: int, month: int) -> int:
         """Возвращает количество дней в месяце с учетом високосных годов"""
-        if month == 2:  # Февраль
-            if (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0):
-                return 29
-            else:
-                return 28
-        elif month in [4, 6, 9, 11]:  # Апрель, Июнь, Сентябрь, Ноябрь
-            return 30
-        else:  # Январь, Март, Май, Июль, Август, Октябрь, Декабрь
-            return 31
+        return days_in_month(year, month)
     
     def _parse_date_range(self, date_str: str) -> datetime:
         """Парсит дату из строки с учетом формата"""
-        formats = [
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d',
-            '%Y-%m-%d %H:%M',
-            '%d.%m.%Y',
-            '%d.%m.%Y %H:%M:%S'
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        # Если ни один формат не подошел, пробуем угадать
-        try:
-            return datetime.fromisoformat(date_str.replace(' ', 'T'))
-        except ValueError:
-            raise ValueError(f"Неизвестный формат даты: {date_str}")
+        return parse_date(date_str)
     
     def _validate_date_range(self, start_date_str: str, end_date_str: str) -> tuple:
         """Проверяет и парсит диапазон дат"""
-        start_date = self._parse_date_range(start_date_str)
-        end_date = self._parse_date_range(end_date_str)
-        
-        if start_date > end_date:
-            raise ValueError(f"Начальная дата {start_date} не может быть больше конечной {end_date}")
-        
-        return start_date, end_date
+        return validate_date_range(start_date_str, end_date_str)
     
     def _is_generated_column(self, column_info: Dict[str, Any]) -> bool:
         """Проверяет, является ли колонка GENERATED ALWAYS"""
@@ -95,56 +215,146 @@ class PostgresUtils:
         return False
     
     def _is_auto_increment_column(self, column_info: Dict[str, Any]) -> bool:
-        """Проверяет, является ли колонка auto-increment"""
-        return column_info.get('default') and 'nextval' in str(column_info.get('default', ''))
+        """Проверяет, является ли колонка auto-increment (serial или IDENTITY)"""
+        if column_info.get('identity'):
+            return True
+        return bool(column_info.get('default')) and 'nextval' in str(column_info.get('default', ''))
     
-    def get_foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
-        """Получает информацию о внешних ключах таблицы"""
+    def get_catalog(self, refresh: bool = False) -> Optional[SchemaCatalog]:
+        """Возвращает снимок каталога схемы (загружается один раз за запуск).
+
+        При записи в файлы снимок берется из schema_cache без подключения
+        к базе; снимок, загруженный из базы, сохраняется в schema_cache.
+        """
+        with self._catalog_lock:
+            schema_cache = self.generation_config.get('global_settings', {}).get('schema_cache')
+            if (self._catalog is None or refresh) and self.is_offline() and schema_cache \
+                    and os.path.exists(schema_cache):
+                with self.metrics.timer('catalog'):
+                    self._catalog = self._load_catalog_cache(schema_cache)
+                return self._catalog
+            if self._catalog is None and self._plan_cache is None and self._open_plan_cache():
+                return self._catalog
+            if self._catalog is None or refresh:
+                try:
+                    started = time.perf_counter()
+                    with self.connection() as conn:
+                        with conn.cursor() as cursor:
+                            self._catalog = SchemaCatalog.load(cursor, self.config.schema)
+                    elapsed = time.perf_counter() - started
+                    self.metrics.add_time('catalog', elapsed)
+                    print(f"📚 Каталог схемы '{self.config.schema}' загружен: "
+                          f"{len(self._catalog.tables)} таблиц за {elapsed:.2f} с")
+                except psycopg2.Error as e:
+                    print(f"❌ Ошибка загрузки каталога схемы: {e}")
+                    return None
+                if schema_cache:
+                    self._save_catalog_cache(schema_cache)
+                if self._plan_cache is not None:
+                    self._plan_cache.put('catalog', self._catalog.to_dict())
+            return self._catalog
 
+    def _open_plan_cache(self) -> bool:
+        """Открывает кэш плана plan_cache; True, если снимок схемы взят из него.
 
+        Ключ кэша - хеш конфигурации и отпечатка схемы, поэтому вместо трех
+        запросов к каталогу выполняется один, а при изменении конфигурации
+        или схемы кэш собирается заново.
+        """
+        path = self.generation_config.get('global_settings', {}).get('plan_cache')
+        if not path:
+            return False
         try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
-                with conn.cursor() as cursor:
-                    query = """
-                    SELECT
-                        tc.constraint_name,
-                        kcu.column_name,
-                        ccu.table_name AS foreign_table_name,
-                        ccu.column_name AS foreign_column_name
-                    FROM information_schema.table_constraints AS tc
-                    JOIN information_schema.key_column_usage AS kcu
-                        ON tc.constraint_name = kcu.constraint_name
-                    JOIN information_schema.constraint_column_usage AS ccu
-                        ON ccu.constraint_name = tc.constraint_name
-                    WHERE tc.constraint_type = 'FOREIGN KEY' 
-                    AND tc.table_schema = %s
-                    AND tc.table_name = %s;
-                    """
-                    
-                    cursor.execute(query, (self.config.schema, table_name))
-                    foreign_keys = cursor.fetchall()
-                    
-                    result = []
-                    for fk in foreign_keys:
-                        fk_info = {
-                            'constraint_name': fk[0],
-                            'column_name': fk[1],
-                            'foreign_table_name': fk[2],
-                            'foreign_column_name': fk[3]
-                        }
-                        result.append(fk_info)
-                    return result
-                    
+            with self.metrics.timer('catalog'):
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        fingerprint = schema_fingerprint(cursor, self.config.schema)
         except psycopg2.Error as e:
-            print(f"❌ Ошибка получения внешних ключей: {e}")
-            return []
+            print(f"⚠️  Не удалось получить отпечаток схемы, кэш плана не используется: {e}")
+            return False
+        self._plan_cache = PlanCache(path, plan_cache_key(self.generation_config, fingerprint))
+        if not self._plan_cache.load() or self._plan_cache.get('catalog') is None:
+            return False
+        self._catalog = SchemaCatalog.from_dict(self._plan_cache.get('catalog'))
+        print(f"📦 План запуска взят из кэша '{path}': {len(self._catalog.tables)} таблиц, схема не перечитывалась")
+        return True
+
+    def save_plan_cache(self):
+        """Сохраняет кэш плана, если за запуск в него что-то добавилось"""
+        if self._plan_cache is not None and self._plan_cache.save() and not self._plan_cache.hit:
+            print(f"📦 План запуска сохранен в кэш '{self._plan_cache.path}'")
+
+    def get_schedule(self, table_names: List[str]) -> TableSchedule:
+        """Порядок обработки таблиц по внешним ключам (из кэша плана, если он совпал)"""
+        catalog = self.get_catalog()
+        cached = self._plan_cache.get('schedule') if self._plan_cache is not None else None
+        if cached is not None:
+            return TableSchedule.from_dict(cached)
+        schedule = build_schedule(catalog, table_names)
+        if self._plan_cache is not None:
+            self._plan_cache.put('schedule', schedule.to_dict())
+        return schedule
+
+    def check_unique_capacity(self, table_name: str, num_rows: int, shards: int = 1) -> List[str]:
+        """Проверка, что уникальных значений хватит на все строки (результат хранится в кэше плана)"""
+        item = f'capacity:{num_rows}:{shards}'
+        errors = self._plan_cache.get_table(table_name, item) if self._plan_cache is not None else None
+        if errors is None:
+            table_config = self.get_table_config(table_name)
+            # Размеры пространств уникальных колонок не зависят от числа строк и шардов
+            sizes = self._plan_cache.get_table(table_name, 'unique_spaces') if self._plan_cache is not None else None
+            if sizes is None:
+                sizes = unique_space_sizes(table_config)
+                if self._plan_cache is not None:
+                    self._plan_cache.put_table(table_name, 'unique_spaces', sizes)
+            errors = check_unique_capacity(table_config, num_rows, shards, sizes)
+            if self._plan_cache is not None:
+                self._plan_cache.put_table(table_name, item, errors)
+        return errors
+
+    def _load_catalog_cache(self, path: str) -> Optional[SchemaCatalog]:
+        """Читает снимок схемы, сохраненный в JSON"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                catalog = SchemaCatalog.from_dict(json.load(f))
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            print(f"❌ Ошибка чтения снимка схемы '{path}': {e}")
+            return None
+        if catalog.schema != self.config.schema:
+            print(f"⚠️  Снимок схемы '{path}' сделан для схемы '{catalog.schema}', а не '{self.config.schema}'")
+        print(f"📚 Каталог схемы '{catalog.schema}' прочитан из '{path}': {len(catalog.tables)} таблиц")
+        return catalog
+
+    def _save_catalog_cache(self, path: str):
+        """Сохраняет снимок схемы в JSON для работы без подключения к базе.
+
+        Файл пишется во временный и переименовывается, чтобы прерванная
+        запись не оставила обрезанный снимок для следующего запуска.
+        """
+        temporary_path = path + '.tmp'
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                json.dump(self._catalog.to_dict(), f, ensure_ascii=False, indent=2)
+            os.replace(temporary_path, path)
+        except OSError as e:
+            print(f"⚠️  Не удалось сохранить снимок схемы в '{path}': {e}")
+
+    def get_foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
+        """Получает информацию о внешних ключах таблицы"""
+        catalog = self.get_catalog()
+        return catalog.get_foreign_keys(table_name) if catalog else []
 
     def get_existing_foreign_keys_values(self, foreign_table_name: str, foreign_column_name: str) -> List[Any]:
         """Получает существующие значения из таблицы, на которую ссылается внешний ключ"""
+        # Файлы загружаются в другую базу: ключи берутся только из записанных файлов
+        if self.is_offline():
+            return []
+        
         try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
+            with self.connection() as conn:
                 with conn.cursor() as cursor:
-                    query = sql.SQL("SELECT DISTINCT {} FROM {}.{} WHERE {} IS NOT NULL").format(
+                    # Порядок фиксирован, чтобы выбор из значений повторялся при том же seed
+                    query = sql.SQL("SELECT DISTINCT {} FROM {}.{} WHERE {} IS NOT NULL ORDER BY 1").format(
                         sql.Identifier(foreign_column_name),
                         sql.Identifier(self.config.schema),
                         sql.Identifier(foreign_table_name),
@@ -159,10 +369,104 @@ class PostgresUtils:
             print(f"❌ Ошибка получения значений внешнего ключа: {e}")
             return []
 
+    def get_foreign_key_values(self, foreign_table_name: str, foreign_column_name: str) -> List[Any]:
+        """Значения для внешнего ключа из реестра ключей.
+
+        Из базы читаются только строки, существовавшие до запуска, и только
+        один раз на колонку; ключи, вставленные за запуск, берутся из реестра.
+        """
+        foreign_key = KeyRegistry.key(foreign_table_name, foreign_column_name)
+        values = self.key_registry.get_values(foreign_table_name, foreign_column_name)
+        if values is None:
+            print(f"🔍 Получение существующих значений для внешнего ключа: {foreign_key}")
+            self.key_registry.set_existing(foreign_table_name, foreign_column_name,
+                                           self.get_existing_foreign_keys_values(foreign_table_name, foreign_column_name))
+            values = self.key_registry.get_values(foreign_table_name, foreign_column_name)
+        
+        count = self.key_registry.count(foreign_table_name, foreign_column_name)
+        print(f"📊 Значения внешнего ключа {foreign_key}: {count['existing']} существовавших, "
+              f"{count['inserted']} вставленных за запуск")
+        return values
+
+    def get_key_columns(self, table_name: str) -> List[str]:
+        """Колонки таблицы, на которые ссылаются внешние ключи (их значения попадают в реестр)"""
+        catalog = self.get_catalog()
+        return catalog.get_referenced_columns(table_name) if catalog else []
+
+    def has_rows(self, table_name: str) -> bool:
+        """Есть ли в таблице строки (в файловом режиме таблицы считаются пустыми)"""
+        if self.is_offline():
+            return False
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {}.{})").format(
+                        sql.Identifier(self.config.schema), sql.Identifier(table_name)))
+                    return cursor.fetchone()[0]
+        except psycopg2.Error as e:
+            print(f"⚠️  Не удалось проверить, есть ли строки в таблице '{table_name}': {e}")
+            return True
+
+    def _remember_existing_keys(self, table_name: str, key_columns: List[str]):
+        """Перед вставкой запоминает ключи строк, уже существующих в таблице.
+
+        Пустая таблица не сканируется. Для колонок, которые заполняет база
+        (identity, serial), запоминается наибольший ключ до вставки: после
+        нее из базы читаются только новые ключи.
+        """
+        missing = [column for column in key_columns if not self.key_registry.has_existing(table_name, column)]
+        if missing:
+            has_rows = self.has_rows(table_name)
+            for column_name in missing:
+                self.key_registry.set_existing(table_name, column_name,
+                                               self.get_existing_foreign_keys_values(table_name, column_name)
+                                               if has_rows else [])
+        
+        auto_increment = {column['name'] for column in self.get_table_structure(table_name)
+                          if self._is_auto_increment_column(column)}
+        for column_name in key_columns:
+            if column_name in auto_increment and not self.is_offline():
+                values = self.key_registry.get_values(table_name, column_name)
+                self._key_marks[(table_name, column_name)] = max(values) if values else None
+
+    def get_keys_after(self, table_name: str, column_name: str, mark: Any) -> Optional[List[Any]]:
+        """Ключи колонки больше mark (все, если mark - None) или None при ошибке"""
+        condition = sql.SQL("{} > %s" if mark is not None else "{} IS NOT NULL").format(sql.Identifier(column_name))
+        query = sql.SQL("SELECT {} FROM {}.{} WHERE {} ORDER BY 1").format(
+            sql.Identifier(column_name), sql.Identifier(self.config.schema), sql.Identifier(table_name), condition)
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, (mark,) if mark is not None else None)
+                    return [row[0] for row in cursor.fetchall()]
+        except psycopg2.Error as e:
+            print(f"⚠️  Не удалось прочитать новые ключи {table_name}.{column_name}: {e}")
+            return None
+
+    def _register_inserted_keys(self, table_name: str, key_columns: List[str], keys: Dict[str, List[Any]]):
+        """Записывает вставленные ключи в реестр.
+
+        Значения колонок, которые заполняет сама база (identity, serial),
+        читаются после вставки по индексу ключа: только ключи больше
+        запомненного до вставки. Если их прочитать не удалось, колонка
+        забывается и при следующем запросе перечитывается целиком.
+        """
+        for column_name in key_columns:
+            if column_name in keys:
+                self.key_registry.add_inserted(table_name, column_name, keys[column_name])
+                continue
+            values = None
+            if (table_name, column_name) in self._key_marks:
+                values = self.get_keys_after(table_name, column_name, self._key_marks.pop((table_name, column_name)))
+            if values is not None:
+                self.key_registry.add_inserted(table_name, column_name, values)
+            else:
+                self.key_registry.forget(table_name, column_name)
+
     def get_all_schemas(self) -> List[str]:
         """Получаем список всех схем в базе данных"""
         try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
+            with self.connection() as conn:
                 with conn.cursor() as cursor:
                     query = """
                     SELECT schema_name 
@@ -182,65 +486,13 @@ class PostgresUtils:
 
     def get_all_tables(self) -> List[str]:
         """Получаем список всех таблиц в выбранной схеме"""
-        try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
-                with conn.cursor() as cursor:
-                    query = """
-                    SELECT table_name 
-                    FROM information_schema.tables 
-                    WHERE table_schema = %s 
-                    AND table_type = 'BASE TABLE'
-                    ORDER BY table_name;
-                    """
-                    
-                    cursor.execute(query, (self.config.schema,))
-                    tables = cursor.fetchall()
-                    return [table[0] for table in tables]
-                    
-        except psycopg2.Error as e:
-            print(f"❌ Ошибка: {e}")
-            return []
+        catalog = self.get_catalog()
+        return catalog.table_names() if catalog else []
 
     def get_table_structure(self, table_name: str) -> List[Dict[str, Any]]:
         """Получаем полную структуру таблицы"""
-        try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
-                with conn.cursor() as cursor:
-                    query = """
-                    SELECT 
-                        column_name, 
-                        data_type, 
-                        character_maximum_length,
-                        is_nullable,
-                        column_default,
-                        is_generated,
-                        generation_expression
-                    FROM information_schema.columns 
-                    WHERE table_schema = %s 
-                    AND table_name = %s
-                    ORDER BY ordinal_position;
-                    """
-                    
-                    cursor.execute(query, (self.config.schema, table_name))
-                    columns = cursor.fetchall()
-                    
-                    structure = []
-                    for col in columns:
-                        column_info = {
-                            'name': col[0],
-                            'data_type': col[1],
-                            'max_length': col[2],
-                            'nullable': col[3] == 'YES',
-                            'default': col[4],
-                            'is_generated': col[5],
-                            'generation_expression': col[6]
-                        }
-                        structure.append(column_info)
-                    return structure
-                    
-        except psycopg2.Error as e:
-            print(f"❌ Ошибка получения структуры: {e}")
-            return []
+        catalog = self.get_catalog()
+        return catalog.get_columns(table_name) if catalog else []
 
     def display_table_structure(self, table_name: str, structure: List[Dict[str, Any]]):
         """Показывает структуру таблицы в читаемом формате"""
@@ -264,112 +516,27 @@ class PostgresUtils:
 
     def _generate_fallback_value(self, value_type: str, rules: Dict[str, Any], existing_values: set) -> Any:
         """Генерирует запасное значение при невозможности создать уникальное"""
-        if value_type == 'int':
-            min_val = rules.get('min_value', 1)
-            # Ищем первое свободное число
-            for i in range(min_val, min_val + 10000):
-                if i not in existing_values:
-                    return i
-        # Для остальных типов добавляем уникальный суффикс
-        return f"fallback_{len(existing_values) + 1}_{random.randint(1000, 9999)}"
+        return fallback_rule_value(value_type, rules, existing_values)
 
     def _generate_value_by_rules(self, column_name: str, rules: Dict[str, Any], existing_values: set = None) -> Any:
+        """Генерирует одно значение по правилам из конфигурации.
 
-
-        """Генерирует значение по правилам из конфигурации"""
-        value_type = rules.get('type', 'text')
-        max_retry = self.generation_config.get('global_settings', {}).get('max_retry_unique', 100)
+        Для генерации таблиц используется скомпилированный план (build_table_plan),
+        этот метод компилирует правило заново при каждом вызове.
+        """
+        try:
+            generate = compile_rule(rules)
+        except ValueError as e:
+            print(f"❌ Ошибка генерации значения для {column_name}: {e}")
+            return f"error_{random.randint(1, 1000)}"
         
-        for attempt in range(max_retry):
-            try:
-                if value_type == 'int':
-                    min_val = rules.get('min_value', 1)
-                    max_val = rules.get('max_value', 100)
-                    value = random.randint(min_val, max_val)
-                    
-                elif value_type == 'decimal':
-                    min_val = rules.get('min_value', 1.0)
-                    max_val = rules.get('max_value', 1000.0)
-                    precision = rules.get('precision', 2)
-                    value = round(random.uniform(min_val, max_val), precision)
-                    
-                elif value_type == 'timestamp':
-                    start_date_str = rules.get('start_date', '2020-01-01 00:00:00')
-                    end_date_str = rules.get('end_date', '2024-12-31 23:59:59')
-                    start_date, end_date = self._validate_date_range(start_date_str, end_date_str)
-                    time_between = end_date - start_date
-                    random_seconds = random.randint(0, int(time_between.total_seconds()))
-                    random_date = start_date + timedelta(seconds=random_seconds)
-                    value = random_date.strftime('%Y-%m-%d %H:%M:%S')
-                    
-                elif value_type == 'date':
-                    start_date_str = rules.get('start_date', '2020-01-01')
-                    end_date_str = rules.get('end_date', '2024-12-31')
-                    start_date, end_date = self._validate_date_range(start_date_str, end_date_str)
-                    time_between = end_date - start_date
-                    random_days = random.randint(0, time_between.days)
-                    random_date = start_date + timedelta(days=random_days)
-                    value = random_date.strftime('%Y-%m-%d')
-                    
-                elif value_type == 'boolean':
-                    true_probability = rules.get('true_probability', 0.5)
-                    value = random.random() < true_probability
-                    
-                elif value_type == 'email':
-                    domains = rules.get('domains', ['gmail.com', 'mail.ru', 'yandex.ru'])
-                    name = ''.join(random.choices(string.ascii_lowercase, k=random.randint(5, 10)))
-                    domain = random.choice(domains)
-                    value = f"{name}{random.randint(1, 999)}@{domain}"
-                    
-                elif value_type == 'pattern':
-                    pattern = rules.get('pattern', '#####')
-                    value = ''.join(
-                        random.choice(string.ascii_uppercase) if char == 'A' else
-                        random.choice(string.ascii_lowercase) if char == 'a' else
-                        random.choice(string.digits) if char == '#' else
-                        char
-                        for char in pattern
-                    )
-                    
-                elif value_type == 'enum':
-                    values = rules.get('values', ['value1', 'value2'])
-                    value = random.choice(values)
-                    
-                else:  # text или другие типы
-                    min_words = rules.get('min_words', 5)
-                    max_words = rules.get('max_words', 20)
-                    include_words = rules.get('include_words', [])
-                    
-                    words = []
-                    num_words = random.randint(min_words, max_words)
-                    
-                    for word in include_words:
-                        if len(words) < num_words:
-                            words.append(word)
-
-
-                    while len(words) < num_words:
-                        word_length = random.randint(3, 10)
-                        word = ''.join(random.choices(string.ascii_letters, k=word_length))
-                        words.append(word)
-                    
-                    random.shuffle(words)
-                    value = ' '.join(words)
-                
-                # ПРОВЕРКА УНИКАЛЬНОСТИ - ИСПРАВЛЕННАЯ ЛОГИКА
-                if existing_values is None:
-                    return value
-                elif value not in existing_values:
-                    return value
-                    
-            except Exception as e:
-                print(f"❌ Ошибка генерации значения для {column_name}: {e}")
-                value = f"error_{random.randint(1, 1000)}"
-                if existing_values is None or value not in existing_values:
-                    return value
+        if existing_values is None:
+            return generate()
         
-        # Если не удалось сгенерировать уникальное значение
-        return self._generate_fallback_value(value_type, rules, existing_values)
+        max_retry = self.generation_config.get('global_settings', {}).get('max_retry_unique', 100)
+        value_type = rules.get('type', 'text')
+        return draw_unique(generate, existing_values, max_retry,
+                           lambda: fallback_rule_value(value_type, rules, existing_values))
 
     def _generate_unique_value_by_rules(self, column_name: str, rules: Dict[str, Any], existing_values: set) -> Any:
         """Генерирует уникальное значение по правилам с проверкой уникальности"""
@@ -377,88 +544,85 @@ class PostgresUtils:
 
     def _generate_column_value(self, column_name: str, data_type: str, max_length: int = None):
         """Генерирует значение для конкретной колонки (резервный метод)"""
-        
-        first_names = ['Ivan', 'Petr', 'Maria', 'Anna', 'Sergey', 'Olga', 'Alexey', 'Elena']
-        last_names = ['Ivanov', 'Petrov', 'Sidorov', 'Smirnov', 'Kuznetsov', 'Popov']
-        cities = ['Moscow', 'Saint Petersburg', 'Novosibirsk', 'Yekaterinburg', 'Kazan']
-        
-        if 'int' in data_type:
-            return random.randint(1, 1000)
-        elif 'varchar' in data_type or 'text' in data_type:
-            max_len = max_length or 50
-            
-            # Определяем тип данных по имени колонки
-            if 'name' in column_name.lower() and 'last' not in column_name.lower():
-                value = random.choice(first_names)
-            elif 'last' in column_name.lower() or 'surname' in column_name.lower():
-                value = random.choice(last_names)
-            elif 'email' in column_name.lower():
-                name = random.choice(first_names).lower()
-                domain = random.choice(['gmail.com', 'mail.ru', 'yandex.ru'])
-                value = f"{name}{random.randint(1, 999)}@{domain}"
-            elif 'city' in column_name.lower() or 'address' in column_name.lower():
-                value = random.choice(cities)
-            else:
-                # Генерируем случайную строку
-                length = random.randint(5, min(20, max_len))
-                value = ''.join(random.choices(string.ascii_letters + string.digits, k=length))
-            
-            # Обрезаем если превышает длину
-            if len(value) > max_len:
-                value = value[:max_len]
-            return value
-            
-        elif 'bool' in data_type:
-            return random.choice([True, False])
-        elif 'date' in data_type:
-            year = random.randint(2020, 2024)
-            month = random.randint(1, 12)
-            day = random.randint(1, self._get_days_in_month(year, month))
-            return f"{year}-{month:02d}-{day:02d}"
-        elif 'timestamp' in data_type:
-            year = random.randint(2020, 2024)
-            month = random.randint(1, 12)
-            day = random.randint(1, self._get_days_in_month(year, month))
-            hour = random.randint(0, 23)
-            minute = random.randint(0, 59)
-            return f"{year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:00"
-        elif 'decimal' in data_type or 'numeric' in data_type:
-            return round(random.uniform(1, 1000), 2)
-        else:
-            return f"data_{random.randint(1, 1000)}"
-
+        return compile_default(column_name, data_type, max_length)()
 
     def _generate_unique_simple_value(self, column_name: str, data_type: str, max_length: int, existing_values: set, max_attempts: int):
         """Генерирует уникальное простое значение (без рекурсии)"""
-        for _ in range(max_attempts):
-            value = self._generate_column_value(column_name, data_type, max_length)
-            if value not in existing_values:
-                return value
-        # Fallback
-        base_value = self._generate_column_value(column_name, data_type, max_length - 5 if max_length else None)
-        suffix = random.randint(1000, 9999)
-        return f"{base_value}_{suffix}" if isinstance(base_value, str) else base_value * 1000 + suffix
+        generate_shorter = compile_default(column_name, data_type, max_length - 5 if max_length else None)
+        return draw_unique(compile_default(column_name, data_type, max_length), existing_values, max_attempts,
+                           lambda: fallback_default_value(generate_shorter))
+
+    def get_batch_size(self, table_name: str) -> int:
+        """Возвращает размер пачки: из настроек таблицы или global_settings"""
+        table_config = self.get_table_config(table_name)
+        batch_size = table_config.get('batch_size',
+                                      self.generation_config.get('global_settings', {}).get('batch_size', 1000))
+        return max(1, int(batch_size))
 
     def generate_synthetic_data(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int, existing_fk_values: Dict[str, List[Any]] = None) -> List[Dict[str, Any]]:
-        """Генерирует синтетические данные с учетом внешних ключей"""
+        """Генерирует синтетические данные с учетом внешних ключей (вся таблица целиком)"""
+        synthetic_data = []
+        for batch in self.generate_synthetic_batches(table_name, structure, num_rows, existing_fk_values):
+            synthetic_data.extend(batch)
+        return synthetic_data
+
+    def generate_synthetic_batches(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int,
+                                   existing_fk_values: Dict[str, List[Any]] = None,
+                                   batch_size: int = None) -> Iterator[List[Dict[str, Any]]]:
+        """Генерирует синтетические данные пачками по batch_size строк (строки - словари)"""
+        plan = self.build_table_plan(table_name, structure, existing_fk_values)
+        if plan is None:
+            return
         
-        table_config = self.get_table_config(table_name)
+        if batch_size is None:
+            batch_size = self.get_batch_size(table_name)
+        
+        for rows in self.generate_row_batches(plan, num_rows, batch_size):
+            yield [dict(zip(plan.column_names, row)) for row in rows]
+
+    def get_seed(self) -> Optional[int]:
+        """Зерно из global_settings: с ним каждая ячейка - функция (seed, таблица, колонка, строка)"""
+        seed = self.generation_config.get('global_settings', {}).get('seed')
+        return int(seed) if seed is not None else None
+
+    def get_generation_engine(self) -> str:
+        """Движок генерации из global_settings: 'python', 'numpy' или 'auto'"""
+        engine = self.generation_config.get('global_settings', {}).get('generation_engine', 'auto')
+        if engine == 'auto':
+            return 'numpy' if numpy_engine.is_available() else 'python'
+        if engine == 'numpy' and not numpy_engine.is_available():
+            print("⚠️  NumPy не установлен, используется движок 'python'")
+            return 'python'
+        if engine not in ('python', 'numpy'):
+            print(f"⚠️  Неизвестный generation_engine '{engine}', используется 'python'")
+            return 'python'
+        return engine
+
+    def build_table_plan(self, table_name: str, structure: List[Dict[str, Any]],
+                         existing_fk_values: Dict[str, List[Any]] = None) -> Optional[TablePlan]:
+        """Компилирует план генерации таблицы: правила, структура и внешние ключи разбираются один раз"""
+        table_config = self.get_plan_config(table_name)
         if not table_config:
             print(f"❌ Конфигурация для таблицы '{table_name}' не найдена")
-            return []
+            return None
         
-        null_probability = table_config.get('null_probability', 
-                                        self.generation_config.get('global_settings', {}).get('default_null_probability', 0.1))
-        unique_columns = table_config.get('unique_columns', [])
-        column_rules = table_config.get('column_rules', {})
-        
-        # Получаем информацию о внешних ключах
-        foreign_keys = self.get_foreign_keys(table_name)
-        
-        synthetic_data = []
-        generated_values = {col: set() for col in unique_columns}
-        
-        # ФИЛЬТРУЕМ КОЛОНКИ: исключаем GENERATED ALWAYS и auto-increment
+        try:
+            return compile_table_plan(
+                table_name,
+                self._get_insertable_columns(structure),
+                table_config,
+                self.generation_config.get('global_settings', {}),
+                self.get_foreign_keys(table_name),
+                existing_fk_values,
+                self.get_generation_engine(),
+                seed=self.get_seed()
+            )
+        except (ValueError, TypeError) as e:
+            print(f"❌ Ошибка в правилах генерации таблицы '{table_name}': {e}")
+            return None
+
+    def _get_insertable_columns(self, structure: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Колонки, в которые генератор пишет значения (без GENERATED ALWAYS и auto-increment)"""
         filtered_columns = []
         for column in structure:
             if self._is_generated_column(column):
@@ -468,58 +632,149 @@ class PostgresUtils:
                 print(f"⚠️  Пропуск auto-increment колонки: {column['name']}")
                 continue
             filtered_columns.append(column)
+        return filtered_columns
+
+    def generate_row_batches(self, plan: TablePlan, num_rows: int, batch_size: int,
+                             label: str = None) -> Iterator[List[tuple]]:
+        """Генерирует строки по плану пачками; строки - кортежи в порядке plan.column_names.
+
+        Прогресс печатается не чаще progress_interval секунд (при log_level
+        DEBUG - после каждой пачки); label - подпись таблицы в прогрессе.
+        """
+        print(f"🔄 Генерация {num_rows} строк для {len(plan.columns)} колонок (движок {plan.engine})...")
         
-        print(f"🔄 Генерация {num_rows} строк для {len(filtered_columns)} колонок...")
+        progress = self.metrics.progress(label or f"'{plan.table_name}'", num_rows)
+        generated = 0
+        try:
+            while generated < num_rows:
+                rows = plan.generate_rows(min(batch_size, num_rows - generated))
+                generated += len(rows)
+                self.metrics.add_rows(plan.table_name, len(rows))
+                progress.update(len(rows))
+                yield rows
+        finally:
+            # Метрики записываются, даже если загрузка прервала генерацию
+            self.metrics.add_time('generate', sum(column.seconds for column in plan.columns) + plan.assemble_seconds,
+                                  plan.table_name)
+            self.metrics.add_columns(plan.table_name, plan.column_stats())
         
-        for row_num in range(num_rows):
-            row_data = {}
-            
-            for column in filtered_columns:
-                column_name = column['name']
-                data_type = column['data_type'].lower()
-                
-                # Проверяем, является ли колонка внешним ключом
-                fk_info = next((fk for fk in foreign_keys if fk['column_name'] == column_name), None)
-                
-                # Генерируем NULL с заданной вероятностью для nullable полей
-                if column['nullable'] and random.random() < null_probability:
-                    row_data[column_name] = None
-                    continue
-                
-                # Если это внешний ключ, используем существующие значения
-                if fk_info and existing_fk_values:
-                    foreign_key = f"{fk_info['foreign_table_name']}.{fk_info['foreign_column_name']}"
-                    if foreign_key in existing_fk_values and existing_fk_values[foreign_key]:
-                        value = random.choice(existing_fk_values[foreign_key])
-                        row_data[column_name] = value
-                        continue
-                
-                # Генерируем значение по правилам из конфига или по умолчанию
-                if column_name in column_rules:
-                    if column_name in unique_columns:
-                        value = self._generate_unique_value_by_rules(
-                            column_name, column_rules[column_name], generated_values[column_name])
-                        generated_values[column_name].add(value)
-                    else:
-                        value = self._generate_value_by_rules(column_name, column_rules[column_name])
-                else:
-                    # Генерируем уникальные значения для указанных колонок
-                    if column_name in unique_columns:
-                        value = self._generate_unique_simple_value(
-                            column_name, data_type, column['max_length'], generated_values[column_name], 1000
-                        )
-                        generated_values[column_name].add(value)
-                    else:
-                        value = self._generate_column_value(column_name, data_type, column['max_length'])
-                
-                row_data[column_name] = value
-            
-            synthetic_data.append(row_data)
-            
-            if (row_num + 1) % 100 == 0 or (row_num + 1) == num_rows:
-                print(f"✅ Сгенерировано {row_num + 1} строк...")
+        # Память, которую заняло отслеживание уникальных значений
+        tracker_stats = plan.tracker_stats()
+        if tracker_stats['columns']:
+            self.metrics.add_trackers(plan.table_name, tracker_stats)
+            print(f"🧮 Трекеры уникальности '{plan.table_name}': {tracker_stats['values']} значений "
+                  f"в {tracker_stats['columns']} колонках, {tracker_stats['memory_bytes'] / 2 ** 20:.1f} МБ")
+
+    def _get_insert_method(self) -> str:
+        """Возвращает способ вставки из global_settings: 'copy', 'copy_binary' или 'executemany'"""
+        insert_method = self.generation_config.get('global_settings', {}).get('insert_method', 'copy')
+        if insert_method not in ('copy', 'copy_binary', 'executemany'):
+            print(f"⚠️  Неизвестный insert_method '{insert_method}', используется 'executemany'")
+            return 'executemany'
+        return insert_method
+
+    def _relation_sql(self, table_name: str, relation: Tuple[str, str] = None) -> sql.Composed:
+        """Имя таблицы со схемой для запроса; relation = (схема, секция), если пачка идет прямо в секцию"""
+        schema, name = relation or (self.config.schema, table_name)
+        return sql.SQL("{}.{}").format(sql.Identifier(schema), sql.Identifier(name))
+
+    def _insert_rows_with_copy(self, cursor, table_name: str, columns: List[str], rows,
+                               relation: Tuple[str, str] = None) -> int:
+        """Потоково загружает строки через COPY ... FROM STDIN"""
+        query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            self._relation_sql(table_name, relation),
+            sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+        )
+        stream = CopyTextStream(rows)
+        started = time.perf_counter()
+        cursor.copy_expert(query, stream)
+        # Строки форматируются, пока сервер читает поток: время сети - остаток
+        self._add_write_time(table_name, time.perf_counter() - started - stream.serialize_seconds,
+                             stream.serialize_seconds)
+        return stream.rows_written
+
+    def _add_write_time(self, table_name: str, network_seconds: float, serialize_seconds: float = 0.0):
+        if serialize_seconds:
+            self.metrics.add_time('serialize', serialize_seconds, table_name)
+        self.metrics.add_time('network', network_seconds, table_name)
+
+    def get_column_types(self, table_name: str, columns: List[str]) -> List[str]:
+        """Типы колонок таблицы (format_type из снимка схемы) в порядке columns"""
+        types = {column['name']: column['data_type'] for column in self.get_table_structure(table_name)}
+        return [types.get(column, 'unknown') for column in columns]
+
+    def get_binary_encoder(self, table_name: str, columns: List[str]) -> Optional[BinaryCopyEncoder]:
+        """Кодировщик COPY binary для колонок таблицы или None, если есть неподдерживаемые типы"""
+        encoders = getattr(self._binary_encoders, 'by_columns', None)
+        if encoders is None:
+            encoders = self._binary_encoders.by_columns = {}
+        key = (table_name, tuple(columns))
+        if key not in encoders:
+            types = self.get_column_types(table_name, columns)
+            unsupported = unsupported_types(types)
+            if unsupported:
+                if table_name not in self._binary_fallback_tables:
+                    self._binary_fallback_tables.add(table_name)
+                    print(f"⚠️  Таблица '{table_name}': типы {sorted(set(unsupported))} не поддерживаются "
+                          f"форматом binary, используется текстовый COPY")
+                encoders[key] = None
+            else:
+                encoders[key] = BinaryCopyEncoder(types, columns)
+        return encoders[key]
+
+    def _insert_rows_with_copy_binary(self, cursor, table_name: str, columns: List[str], rows,
+                                      relation: Tuple[str, str] = None) -> int:
+        """Загружает пачку строк через COPY ... WITH (FORMAT binary) без разбора текста сервером"""
+        encoder = self.get_binary_encoder(table_name, columns)
+        if encoder is None:
+            return self._insert_rows_with_copy(cursor, table_name, columns, rows, relation)
         
-        return synthetic_data
+        query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT binary)").format(
+            self._relation_sql(table_name, relation),
+            sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+        )
+        stream = BinaryCopyStream(encoder, rows)
+        started = time.perf_counter()
+        cursor.copy_expert(query, stream)
+        self._add_write_time(table_name, time.perf_counter() - started, stream.serialize_seconds)
+        return stream.rows_written
+
+    def _insert_rows_with_executemany(self, cursor, table_name: str, columns: List[str], rows,
+                                      relation: Tuple[str, str] = None) -> int:
+        """Вставляет строки через executemany (по одному INSERT на строку)"""
+        placeholders = ', '.join(['%s'] * len(columns))
+        columns_str = ', '.join(columns)
+
+        # Безопасное формирование запроса
+        query = sql.SQL("INSERT INTO {} ({}) VALUES ({})").format(
+            self._relation_sql(table_name, relation),
+            sql.SQL(columns_str),
+            sql.SQL(placeholders)
+        )
+
+        data_to_insert = list(rows)
+        started = time.perf_counter()
+        cursor.executemany(query, data_to_insert)
+        self._add_write_time(table_name, time.perf_counter() - started)
+        return len(data_to_insert)
+
+    def write_rows(self, cursor, table_name: str, columns: List[str], rows, insert_method: str = None) -> int:
+        """Отправляет одну пачку строк выбранным способом вставки (без фиксации).
+
+        Пачка секции (PartitionBatch) загружается прямо в свою секцию.
+        """
+        if insert_method is None:
+            insert_method = self._get_insert_method()
+        relation = getattr(rows, 'relation', None)
+        if insert_method == 'copy':
+            return self._insert_rows_with_copy(cursor, table_name, columns, rows, relation)
+        if insert_method == 'copy_binary':
+            return self._insert_rows_with_copy_binary(cursor, table_name, columns, list(rows), relation)
+        return self._insert_rows_with_executemany(cursor, table_name, columns, rows, relation)
+
+    def _commit_every_batch(self) -> bool:
+        """Нужно ли фиксировать транзакцию после каждой пачки"""
+        return bool(self.generation_config.get('global_settings', {}).get('commit_every_batch', False))
 
     def insert_synthetic_data(self, table_name: str, synthetic_data: List[Dict[str, Any]]) -> bool:
         """Вставляет синтетические данные в таблицу"""
@@ -527,68 +782,652 @@ class PostgresUtils:
             print("❌ Нет данных для вставки")
             return False
         
+        return self.insert_synthetic_batches(table_name, [synthetic_data])
+
+    def insert_synthetic_batches(self, table_name: str, batches: Iterable[List[Dict[str, Any]]]) -> bool:
+        """Вставляет пачки данных (строки - словари) по мере их генерации"""
+        batches = iter(batches)
+        first_batch = next((batch for batch in batches if batch), None)
+        if first_batch is None:
+            print(f"❌ Не удалось сгенерировать данные для таблицы {table_name}")
+            return False
+        
+        columns = list(first_batch[0].keys())
+        row_batches = ([tuple(row[col] for col in columns) for row in batch]
+                       for batch in itertools.chain([first_batch], batches))
+        return self.insert_row_batches(table_name, columns, row_batches)
+
+    def use_pipeline(self) -> bool:
+        """Генерировать следующую пачку, пока предыдущая записывается в отдельном потоке"""
+        return bool(self.generation_config.get('global_settings', {}).get('pipeline', True))
+
+    def get_pipeline_depth(self) -> int:
+        """Сколько сгенерированных пачек может ждать записи (на один поток записи)"""
+        depth = self.generation_config.get('global_settings', {}).get('pipeline_depth', DEFAULT_PIPELINE_DEPTH)
+        return max(1, int(depth))
+
+    def _add_pipeline_time(self, table_name: str, pipeline: BatchPipeline):
+        """Ожидание генератора из-за медленной записи и простой записи в ожидании пачек"""
+        self.metrics.add_time('backpressure', pipeline.producer_wait_seconds, table_name)
+        self.metrics.add_time('writer_idle', pipeline.writer_wait_seconds, table_name)
+
+    def insert_row_batches(self, table_name: str, columns: List[str], batches: Iterable[List[tuple]]) -> bool:
+        """Вставляет пачки строк-кортежей по мере их генерации через одно соединение.
+
+        С pipeline (по умолчанию) пачки отправляет отдельный поток записи,
+        а генерация следующих пачек идет в это время в вызывающем потоке.
+        """
+        insert_method = self._get_insert_method()
+        commit_every_batch = self._commit_every_batch()
+        inserted = 0
+        committed = 0
+        batch_num = 0
+        
         try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
+            with self.connection() as conn:
                 with conn.cursor() as cursor:
-                    # Создаем SQL запрос для вставки
-                    columns = list(synthetic_data[0].keys())
-                    placeholders = ', '.join(['%s'] * len(columns))
-                    columns_str = ', '.join(columns)
+                    def write(rows: List[tuple]):
+                        nonlocal inserted, committed, batch_num
+                        batch_num += 1
+                        inserted += self.write_rows(cursor, table_name, columns, rows, insert_method)
+                        
+                        if commit_every_batch:
+                            with self.metrics.timer('commit', table_name):
+                                conn.commit()
+                            committed = inserted
+                        if self.metrics.log_level == 'DEBUG':
+                            print(f"📦 Пачка {batch_num}: вставлено {inserted} строк в таблицу {table_name}")
                     
-                    # Безопасное формирование запроса
-                    query = sql.SQL("INSERT INTO {}.{} ({}) VALUES ({})").format(
-                        sql.Identifier(self.config.schema),
-                        sql.Identifier(table_name),
-                        sql.SQL(columns_str),
-                        sql.SQL(placeholders)
-                    )
+                    pipeline = run_batches(batches, write, self.use_pipeline(), self.get_pipeline_depth(),
+                                           f"writer-{table_name}")
+                    self._add_pipeline_time(table_name, pipeline)
                     
-                    # Подготавливаем данные для вставки
-                    data_to_insert = [tuple(row[col] for col in columns) for row in synthetic_data]
+                    with self.metrics.timer('commit', table_name):
+                        conn.commit()
+                    committed = inserted
                     
-                    # Вставляем данные
-                    cursor.executemany(query, data_to_insert)
-                    conn.commit()
+                    if not inserted:
+                        print(f"❌ Не удалось сгенерировать данные для таблицы {table_name}")
+                        return False
                     
-                    print(f"✅ Успешно вставлено {len(synthetic_data)} строк в таблицу {table_name}")
+                    print(f"✅ Успешно вставлено {inserted} строк в таблицу {table_name} ({insert_method})")
                     return True
                     
-        except psycopg2.Error as e:
+        except (psycopg2.Error, ValueError) as e:
             print(f"❌ Ошибка при вставке данных: {e}")
+            if committed:
+                print(f"⚠️  В таблице '{table_name}' уже зафиксировано {committed} строк")
             return False
 
-    def insert_data_with_fk_handling(self, table_name: str, num_rows: int) -> bool:
-        """Вставляет данные с автоматической обработкой внешних ключей"""
+    def get_load_connections(self, table_name: str) -> int:
+        """Количество соединений для загрузки таблицы: из настроек таблицы или global_settings"""
+        table_config = self.get_table_config(table_name)
+        connections = table_config.get('load_connections',
+                                       self.generation_config.get('global_settings', {}).get('load_connections', 1))
+        return max(1, int(connections))
+
+    def _get_load_failure_policy(self) -> str:
+        """Политика ошибок параллельной загрузки из global_settings: 'abort' или 'keep'"""
+        policy = self.generation_config.get('global_settings', {}).get('load_failure_policy', 'abort')
+        if policy not in FAILURE_POLICIES:
+            print(f"⚠️  Неизвестная load_failure_policy '{policy}', используется 'abort'")
+            return 'abort'
+        return policy
+
+    def get_output_mode(self) -> str:
+        """Куда пишутся данные (global_settings.output_mode): 'database' или 'file'"""
+        output_mode = self.generation_config.get('global_settings', {}).get('output_mode', 'database')
+        if output_mode not in ('database', 'file'):
+            print(f"⚠️  Неизвестный output_mode '{output_mode}', используется 'database'")
+            return 'database'
+        return output_mode
+
+    def is_offline(self) -> bool:
+        """Пишутся ли данные в файлы без подключения к базе"""
+        return self.get_output_mode() == 'file'
+
+    def get_output_dir(self) -> str:
+        output_dir = self.generation_config.get('global_settings', {}).get('output_dir', 'output')
+        if self.dataset_shard is not None:
+            # Шарды, запущенные в одном каталоге, не перезаписывают файлы друг друга
+            shard = self.dataset_shard
+            return os.path.join(output_dir, f"shard_{shard.index + 1}_of_{shard.count}")
+        return output_dir
+
+    def _get_output_format(self) -> str:
+        """Формат файлов из global_settings: 'text' (формат COPY по умолчанию), 'csv' или 'binary'"""
+        output_format = self.generation_config.get('global_settings', {}).get('output_format', 'text')
+        if output_format not in FILE_FORMATS:
+            print(f"⚠️  Неизвестный output_format '{output_format}', используется 'text'")
+            return 'text'
+        return output_format
+
+    def create_file_sink(self, table_name: str, columns: List[str], shard: int = None) -> FileSink:
+        """Создает запись файлов таблицы (у шардов параллельной генерации свои файлы)"""
+        global_settings = self.generation_config.get('global_settings', {})
+        output_format = self._get_output_format()
+        encoder = None
+        if output_format == 'binary':
+            encoder = BinaryCopyEncoder(self.get_column_types(table_name, columns), columns)
+        output_dir = self.get_output_dir()
+        os.makedirs(output_dir, exist_ok=True)
+        base_name = table_name if shard is None else f"{table_name}.shard{shard + 1}"
+        return FileSink(output_dir, base_name, output_format,
+                        bool(global_settings.get('output_compress', False)),
+                        int(global_settings.get('output_rotate_rows', 0)), encoder)
+
+    def _record_output_files(self, table_name: str, columns: List[str], files: List[str]):
+        with self._output_lock:
+            record = self.output_files.setdefault(table_name, {'table_name': table_name, 'columns': columns, 'files': []})
+            record['files'].extend(files)
+
+    def write_row_batches_to_files(self, table_name: str, columns: List[str], batches: Iterable[List[tuple]],
+                                   shard: int = None) -> bool:
+        """Пишет пачки строк в файлы COPY вместо вставки в базу"""
+        try:
+            sink = self.create_file_sink(table_name, columns, shard)
+            started = time.perf_counter()
+            with sink:
+                # Запись и сжатие файлов идут в отдельном потоке, пока генерируются следующие пачки
+                pipeline = run_batches(batches, sink.write_rows, self.use_pipeline(), self.get_pipeline_depth(),
+                                       f"writer-{table_name}")
+            rows = sink.rows_written
+            self._add_pipeline_time(table_name, pipeline)
+        except (OSError, ValueError) as e:
+            print(f"❌ Ошибка записи файлов таблицы {table_name}: {e}")
+            return False
         
+        elapsed = time.perf_counter() - started
+        self.metrics.add_time('file_write', sink.write_seconds, table_name)
+        if not rows:
+            print(f"❌ Не удалось сгенерировать данные для таблицы {table_name}")
+            return False
+        
+        self._record_output_files(table_name, columns, sink.files)
+        print(f"✅ Записано {rows} строк таблицы {table_name} в {len(sink.files)} файлов "
+              f"({sink.bytes_written() / 2 ** 20:.1f} МБ) за {elapsed:.2f} с "
+              f"({rows / max(elapsed, 1e-9):.0f} строк/с)")
+        return True
+
+    def write_load_script(self, table_names: List[str]) -> Optional[str]:
+        """Пишет load.sql с командами \\copy для записанных файлов в порядке table_names"""
+        tables = [self.output_files[name] for name in table_names if name in self.output_files]
+        if not tables:
+            return None
+        
+        global_settings = self.generation_config.get('global_settings', {})
+        path = os.path.join(self.get_output_dir(), 'load.sql')
+        try:
+            write_load_script(path, self.config.schema, tables, self._get_output_format(),
+                              bool(global_settings.get('output_compress', False)))
+        except OSError as e:
+            print(f"❌ Ошибка записи скрипта загрузки '{path}': {e}")
+            return None
+        print(f"📁 Скрипт загрузки файлов: {path} (запуск из каталога {self.get_output_dir()}: psql -f load.sql)")
+        return path
+
+    def load_row_batches(self, table_name: str, columns: List[str], batches: Iterable[List[tuple]],
+                         shard: int = None) -> bool:
+        """Загружает пачки строк через одно или несколько соединений (load_connections).
+
+        При output_mode 'file' строки пишутся в файлы; shard - номер шарда
+        параллельной генерации, у которого свои файлы. Строки секционированной
+        таблицы раскладываются по секциям на клиенте (get_partition_router).
+        """
+        if self.is_offline():
+            return self.write_row_batches_to_files(table_name, columns, batches, shard)
+        
+        router = self.get_partition_router(table_name, columns)
+        if router is None:
+            return self._load_database_batches(table_name, columns, batches)
+        
+        print(f"🧩 Строки '{table_name}' распределяются по {len(router.relations)} секциям на клиенте")
+        try:
+            return self._load_database_batches(table_name, columns,
+                                               router.route_batches(batches, self.get_batch_size(table_name)))
+        finally:
+            self.metrics.add_time('route', router.seconds, table_name)
+
+    def get_partition_router(self, table_name: str, columns: List[str]) -> Optional[PartitionRouter]:
+        """Распределение строк секционированной таблицы по секциям на клиенте (partition_routing).
+
+        None - таблица не секционирована, распределение выключено или секцию
+        выбирает сервер (строки идут в родительскую таблицу).
+        """
+        table_config = self.get_table_config(table_name)
+        global_settings = self.generation_config.get('global_settings', {})
+        if not table_config.get('partition_routing', global_settings.get('partition_routing', True)):
+            return None
+        catalog = self.get_catalog()
+        if catalog is None or not catalog.get_partitioning(table_name):
+            return None
+        
+        # Шарды ждут ключ последней строки пачки (wait_for_shard_keys); если пачки
+        # фиксируются по одной, пачки секций нарушили бы этот порядок
+        connections = self.get_load_connections(table_name)
+        commits_batches = (self._get_load_failure_policy() == 'keep' if connections > 1
+                           else self._commit_every_batch())
+        if self.dataset_shard is not None and commits_batches:
+            self._warn_partitions(f"⚠️  Строки '{table_name}' идут в родительскую таблицу: "
+                                  f"при загрузке шардами пачки фиксируются целиком")
+            return None
+        
+        router, warnings = build_partition_router(catalog, table_name, columns)
+        for warning in warnings:
+            self._warn_partitions(f"⚠️  {warning}")
+        return router
+
+    def _load_database_batches(self, table_name: str, columns: List[str], batches: Iterable[List[tuple]]) -> bool:
+        """Вставляет пачки через одно или несколько соединений (load_connections)"""
+        connections = self.get_load_connections(table_name)
+        if connections <= 1:
+            return self.insert_row_batches(table_name, columns, batches)
+        
+        # Писатели держат соединения до конца загрузки, поэтому их не больше размера пула
+        if connections > self.config.pool_max_size:
+            print(f"⚠️  load_connections={connections} больше pool_max_size={self.config.pool_max_size}, "
+                  f"используется {self.config.pool_max_size} соединений")
+            connections = self.config.pool_max_size
+        
+        loader = ParallelLoader(self, table_name, columns, connections, self._get_load_failure_policy(),
+                                self.get_pipeline_depth())
+        try:
+            success = loader.load(batches)
+        except Exception as e:
+            print(f"❌ Ошибка при генерации данных для таблицы {table_name}: {e}")
+            return False
+        
+        summary = loader.summary()
+        if success and summary['rows']:
+            print(f"✅ Успешно вставлено {summary['rows']} строк в таблицу {table_name} "
+                  f"({self._get_insert_method()}, {connections} соединений)")
+            return True
+        
+        if not summary['rows']:
+            print(f"❌ Не удалось сгенерировать данные для таблицы {table_name}")
+        elif summary['committed_rows']:
+            print(f"⚠️  В таблице '{table_name}' уже зафиксировано {summary['committed_rows']} строк")
+        return False
+
+    def insert_data_with_fk_handling(self, table_name: str, num_rows: int, deferred_columns: List[str] = None) -> bool:
+        """Вставляет данные с автоматической обработкой внешних ключей.
+
+        Колонки deferred_columns (отложенные внешние ключи самоссылок и циклов)
+        не вставляются и заполняются позже через fill_deferred_foreign_key.
+        Время и результат таблицы записываются в метрики запуска.
+        """
+        started = time.perf_counter()
+        success = False
+        try:
+            success = self._insert_data_with_fk_handling(table_name, num_rows, deferred_columns)
+            return success
+        finally:
+            self.metrics.finish_table(table_name, time.perf_counter() - started, success)
+
+    def _insert_data_with_fk_handling(self, table_name: str, num_rows: int, deferred_columns: List[str]) -> bool:
         # Получаем структуру таблицы
         structure = self.get_table_structure(table_name)
         if not structure:
             print(f"❌ Не удалось получить структуру таблицы {table_name}")
             return False
         
+        # До генерации проверяем, что уникальных значений хватит на все строки
+        capacity_errors = self.check_unique_capacity(table_name, num_rows)
+        if capacity_errors:
+            for error in capacity_errors:
+                print(f"❌ Таблица '{table_name}', {error}")
+            return False
+        
+        deferred_columns = deferred_columns or []
+        structure = [column for column in structure if column['name'] not in deferred_columns]
+        
         # Получаем внешние ключи
-        foreign_keys = self.get_foreign_keys(table_name)
+        foreign_keys = [fk for fk in self.get_foreign_keys(table_name) if fk['column_name'] not in deferred_columns]
         
-        # Собираем существующие значения для внешних ключей
+        # Значения внешних ключей берем из реестра ключей
         existing_fk_values = {}
+        with self.metrics.timer('fk_fetch', table_name):
+            for fk in foreign_keys:
+                foreign_key = KeyRegistry.key(fk['foreign_table_name'], fk['foreign_column_name'])
+                existing_fk_values[foreign_key] = self.get_foreign_key_values(fk['foreign_table_name'],
+                                                                              fk['foreign_column_name'])
+        
+        # Ключи, на которые ссылаются другие таблицы, попадут в реестр после вставки
+        key_columns = self.get_key_columns(table_name)
+        
+        if self.dataset_shard is not None:
+            return self._insert_shard(table_name, structure, num_rows, existing_fk_values, foreign_keys, key_columns)
+        
+        self._remember_existing_keys(table_name, key_columns)
+        
+        # Большие таблицы можно генерировать параллельно в нескольких процессах
+        workers = min(self.get_workers(table_name), num_rows)
+        if workers > 1:
+            return self.insert_data_parallel(table_name, structure, num_rows, existing_fk_values, workers, key_columns)
+        
+        # Компилируем план генерации с учетом внешних ключей
+        plan = self.build_table_plan(table_name, structure, existing_fk_values)
+        if plan is None:
+            return False
+        
+        return self.insert_plan_rows(table_name, plan, num_rows, key_columns)
+
+    def set_dataset_shard(self, shard: DatasetShard):
+        """Ограничивает запуск срезом набора данных (main.py --shard K --shards N)"""
+        self.dataset_shard = shard
+
+    def _insert_shard(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int,
+                      existing_fk_values: Dict[str, List[Any]], foreign_keys: List[Dict[str, Any]],
+                      key_columns: List[str]) -> bool:
+        """Генерирует и загружает только строки своего шарда.
+
+        Строки родительских таблиц, на которые ссылается срез, могут
+        загружаться другими машинами: перед загрузкой шард ждет их. После
+        загрузки в реестр записываются ключи всех шардов таблицы.
+        """
+        row_start, rows = self.dataset_shard.row_range(num_rows)
+        print(f"🧩 Шард {self.dataset_shard.label}: строки {row_start}..{row_start + rows - 1} из {num_rows}")
+        # Таблицы запуска считаются пустыми: ключи других шардов берутся не из базы
+        for column_name in key_columns:
+            self.key_registry.set_existing(table_name, column_name, [])
+        
+        if not self.is_offline() and not self.wait_for_shard_keys(table_name, foreign_keys):
+            return False
+        
+        if rows == 0:
+            success = True
+        elif min(self.get_workers(table_name), rows) > 1:
+            success = self.insert_data_parallel(table_name, structure, rows, existing_fk_values,
+                                                min(self.get_workers(table_name), rows), key_columns, row_start)
+        else:
+            plan = self.build_table_plan(table_name, structure, existing_fk_values)
+            if plan is None:
+                return False
+            plan.next_row = row_start
+            success = self.insert_plan_rows(table_name, plan, rows, key_columns)
+        
+        if success and key_columns:
+            success = self._register_shard_keys(table_name, structure, num_rows, existing_fk_values, key_columns)
+        return success
+
+    def _register_shard_keys(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int,
+                             existing_fk_values: Dict[str, List[Any]], key_columns: List[str]) -> bool:
+        """Вычисляет ключи всех строк таблицы (всех шардов) по плану с seed и записывает их в реестр.
+
+        Ключи идут в порядке строк, как при обычном запуске, поэтому дочерние
+        таблицы выбирают внешние ключи из того же списка. Для каждой пачки
+        других шардов запоминается ключ ее последней строки.
+        """
+        plan = self.build_table_plan(table_name, structure, existing_fk_values)
+        if plan is None:
+            return False
+        columns = [column for column in plan.columns if column.name in key_columns]
+        keys = {column.name: [] for column in columns}
+        probes = {column.name: [] for column in columns}
+        batch_size = self.get_batch_size(table_name)
+        
+        for shard, (start, rows) in enumerate(self.dataset_shard.slices(num_rows)):
+            workers = min(self.get_workers(table_name), rows)
+            # Срез, который нельзя разбить между процессами, загружается одним (как в insert_data_parallel)
+            if workers > 1 and self.check_parallel_plan(table_name, structure, rows, workers,
+                                                        existing_fk_values) is not None:
+                workers = 1
+            for batch_start, batch_rows in batch_ranges(start, rows, batch_size, workers):
+                for column in columns:
+                    values = [value for value in column.generate_many(batch_rows, batch_start) if value is not None]
+                    keys[column.name].extend(values)
+                    if shard != self.dataset_shard.index and values:
+                        probes[column.name].append(values[-1])
+        
+        for column_name, values in keys.items():
+            self.key_registry.forget(table_name, column_name)
+            self.key_registry.set_existing(table_name, column_name, [])
+            self.key_registry.add_inserted(table_name, column_name, values)
+        self._shard_probes[table_name] = probes
+        return True
+
+    def wait_for_shard_keys(self, table_name: str, foreign_keys: List[Dict[str, Any]]) -> bool:
+        """Ждет, пока другие шарды загрузят строки родительских таблиц, на которые ссылается таблица.
+
+        Пачка загружается в одной транзакции, поэтому видимый ключ последней
+        строки пачки означает, что видна вся пачка.
+        """
+        timeout = float(self.generation_config.get('global_settings', {}).get('shard_wait_timeout',
+                                                                             DEFAULT_SHARD_WAIT_TIMEOUT))
+        deadline = time.monotonic() + timeout
         for fk in foreign_keys:
-            foreign_key = f"{fk['foreign_table_name']}.{fk['foreign_column_name']}"
-            print(f"🔍 Получение значений для внешнего ключа: {foreign_key}")
-            values = self.get_existing_foreign_keys_values(fk['foreign_table_name'], fk['foreign_column_name'])
-            existing_fk_values[foreign_key] = values
-            print(f"📊 Найдено {len(values)} существующих значений")
+            parent, column_name = fk['foreign_table_name'], fk['foreign_column_name']
+            probes = sorted(set(self._shard_probes.get(parent, {}).get(column_name, [])), key=repr)
+            if not probes:
+                continue
+            query = sql.SQL("SELECT count(DISTINCT {}) FROM {}.{} WHERE {} = ANY(%s)").format(
+                sql.Identifier(column_name), sql.Identifier(self.config.schema),
+                sql.Identifier(parent), sql.Identifier(column_name))
+            announced = False
+            with self.metrics.timer('shard_wait', table_name):
+                while True:
+                    try:
+                        with self.connection() as conn:
+                            with conn.cursor() as cursor:
+                                found = 0
+                                for offset in range(0, len(probes), 10000):
+                                    cursor.execute(query, (probes[offset:offset + 10000],))
+                                    found += cursor.fetchone()[0]
+                    except psycopg2.Error as e:
+                        print(f"❌ Ошибка проверки строк других шардов в '{parent}': {e}")
+                        return False
+                    if found == len(probes):
+                        break
+                    if time.monotonic() >= deadline:
+                        print(f"❌ За {timeout:.0f} с другие шарды не загрузили строки '{parent}' "
+                              f"({found} из {len(probes)} пачек), таблица '{table_name}' не загружена")
+                        return False
+                    if not announced:
+                        print(f"⏳ Ожидание строк '{parent}' от других шардов: {found} из {len(probes)} пачек")
+                        announced = True
+                    time.sleep(SHARD_POLL_INTERVAL)
+        return True
+
+    def insert_plan_rows(self, table_name: str, plan: TablePlan, num_rows: int, key_columns: List[str] = None) -> bool:
+        """Генерирует строки по плану, вставляет их пачками и записывает ключи в реестр"""
+        key_columns = key_columns or []
+        keys = {column: [] for column in key_columns if column in plan.column_names}
+        batches = self.generate_row_batches(plan, num_rows, self.get_batch_size(table_name))
+        success = self.load_row_batches(table_name, plan.column_names, collect_keys(batches, plan.column_names, keys))
+        # Генерация могла прерваться на ошибке вставки: метрики плана записываются сейчас
+        batches.close()
+        if success:
+            self._register_inserted_keys(table_name, key_columns, keys)
+        return success
+
+    def fill_deferred_foreign_key(self, table_name: str, columns: List[str],
+                                  foreign_table_name: str, foreign_columns: List[str]) -> bool:
+        """Заполняет отложенный внешний ключ после загрузки обеих таблиц.
+
+        Строки, в которых все колонки ключа пустые, получают ключ случайной
+        строки родительской таблицы; доля NULL сохраняется по null_probability.
+        """
+        if self.is_offline():
+            print(f"⚠️  Отложенный внешний ключ {table_name}({', '.join(columns)}) в файлах остается пустым: "
+                  f"заполните его после загрузки")
+            return False
+        
+        table_config = self.get_table_config(table_name)
+        null_probability = table_config.get('null_probability',
+                                            self.generation_config.get('global_settings', {}).get('default_null_probability', 0.1))
         
-        # Генерируем данные с учетом внешних ключей
+        schema = sql.Identifier(self.config.schema)
+        query = sql.SQL("""
+            WITH parent AS (
+                SELECT {foreign_columns}, row_number() OVER (ORDER BY {foreign_columns}) AS row_number
+                FROM {schema}.{foreign_table}
+                WHERE {foreign_not_null}
+            ), total AS (
+                SELECT count(*) AS rows FROM parent
+            ), target AS (
+                SELECT t.tableoid AS target_tableoid, t.ctid AS target_ctid,
+                       1 + floor(random() * total.rows)::bigint AS row_number
+                FROM {schema}.{table} t, total
+                WHERE {columns_null} AND total.rows > 0 AND random() >= %s
+            )
+            UPDATE {schema}.{table} t
+            SET ({columns}) = ROW({parent_columns})
+            FROM target JOIN parent ON parent.row_number = target.row_number
+            WHERE t.tableoid = target.target_tableoid AND t.ctid = target.target_ctid
+        """).format(
+            schema=schema,
+            table=sql.Identifier(table_name),
+            foreign_table=sql.Identifier(foreign_table_name),
+            foreign_columns=sql.SQL(', ').join(sql.Identifier(column) for column in foreign_columns),
+            foreign_not_null=sql.SQL(' AND ').join(
+                sql.SQL("{} IS NOT NULL").format(sql.Identifier(column)) for column in foreign_columns),
+            columns_null=sql.SQL(' AND ').join(
+                sql.SQL("t.{} IS NULL").format(sql.Identifier(column)) for column in columns),
+            columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+            parent_columns=sql.SQL(', ').join(
+                sql.SQL("parent.{}").format(sql.Identifier(column)) for column in foreign_columns)
+        )
+        
+        try:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    seed = self.get_seed()
+                    if seed is not None:
+                        # random() в запросе повторяется при том же seed
+                        cursor.execute("SELECT setseed(%s)", (derive_key(seed, table_name, *columns) / 2 ** 64,))
+                    with self.metrics.timer('deferred_fk', table_name):
+                        cursor.execute(query, (null_probability,))
+                    print(f"🔗 Заполнен отложенный внешний ключ {table_name}({', '.join(columns)}): "
+                          f"{cursor.rowcount} строк")
+                    return True
+        except psycopg2.Error as e:
+            print(f"❌ Ошибка заполнения отложенного внешнего ключа {table_name}({', '.join(columns)}): {e}")
+            return False
 
+    def get_table_parallelism(self) -> int:
+        """Сколько независимых таблиц одного уровня обрабатывать одновременно"""
+        parallelism = self.generation_config.get('global_settings', {}).get('table_parallelism', 1)
+        return max(1, int(parallelism))
 
-        synthetic_data = self.generate_synthetic_data(table_name, structure, num_rows, existing_fk_values)
+    def get_workers(self, table_name: str) -> int:
+        """Количество процессов генерации: из настроек таблицы или global_settings"""
+        table_config = self.get_table_config(table_name)
+        workers = table_config.get('workers', self.generation_config.get('global_settings', {}).get('workers', 1))
+        return max(1, int(workers))
+
+    def check_parallel_plan(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int, workers: int,
+                            existing_fk_values: Dict[str, List[Any]]) -> Optional[str]:
+        """Почему таблицу нельзя сгенерировать в workers процессах (None - можно).
+
+        Правила и разбиение уникальных колонок проверяются до запуска процессов;
+        результат зависит только от конфигурации и схемы и хранится в кэше плана.
+        """
+        item = f'shards:{num_rows}:{workers}'
+        shard_check = self._plan_cache.get_table(table_name, item) if self._plan_cache is not None else None
+        if shard_check is None:
+            shard_check = {'error': None}
+            table_config = self.get_plan_config(table_name)
+            columns = self._get_insertable_columns(structure)
+            foreign_keys = self.get_foreign_keys(table_name)
+            global_settings = self.generation_config.get('global_settings', {})
+            engine = self.get_generation_engine()
+            configured_seed = self.get_seed()
+            try:
+                for shard in range(workers):
+                    compile_table_plan(table_name, columns, table_config, global_settings, foreign_keys,
+                                       existing_fk_values, engine, partition=(shard, workers), seed=configured_seed)
+                # С seed шарды делят строки, а не пространство уникальных значений
+                capacity_errors = self.check_unique_capacity(table_name, num_rows,
+                                                             workers if configured_seed is None else 1)
+                if capacity_errors:
+                    raise ValueError(capacity_errors[0])
+            except ValueError as e:
+                shard_check['error'] = str(e)
+            if self._plan_cache is not None:
+                self._plan_cache.put_table(table_name, item, shard_check)
+        return shard_check['error']
+
+    def insert_data_parallel(self, table_name: str, structure: List[Dict[str, Any]], num_rows: int,
+                             existing_fk_values: Dict[str, List[Any]], workers: int,
+                             key_columns: List[str] = None, row_start: int = 0) -> bool:
+        """Генерирует и вставляет таблицу шардами в пуле процессов.
+
+        Каждый шард получает свой диапазон строк, независимый генератор
+        случайных чисел и непересекающуюся часть пространства значений
+        уникальных колонок, а затем сам вставляет данные через свое соединение.
+        row_start - номер первой строки (срез набора данных этой машины).
+        """
+        table_config = self.get_table_config(table_name)
+        if not table_config:
+            print(f"❌ Конфигурация для таблицы '{table_name}' не найдена")
+            return False
         
-        if not synthetic_data:
-            print(f"❌ Не удалось сгенерировать данные для таблицы {table_name}")
+        columns = self._get_insertable_columns(structure)
+        foreign_keys = self.get_foreign_keys(table_name)
+        engine = self.get_generation_engine()
+        
+        # С seed шарды генерируют свои диапазоны строк того же плана, что и один процесс
+        configured_seed = self.get_seed()
+        
+        shard_error = self.check_parallel_plan(table_name, structure, num_rows, workers, existing_fk_values)
+        if shard_error is not None:
+            print(f"⚠️  Таблица '{table_name}' будет сгенерирована в одном процессе: {shard_error}")
+            plan = self.build_table_plan(table_name, structure, existing_fk_values)
+            if plan is None:
+                return False
+            plan.next_row = row_start
+            return self.insert_plan_rows(table_name, plan, num_rows, key_columns)
+        
+        key_columns = key_columns or []
+        seed = configured_seed if configured_seed is not None else random.SystemRandom().getrandbits(64)
+        # Шарды получают снимок каталога вместо повторной загрузки в каждом процессе
+        catalog = self.get_catalog()
+        tasks = []
+        for shard, rows in enumerate(split_rows(num_rows, workers)):
+            tasks.append({
+                'db_params': vars(self.config),
+                'generation_config': self.generation_config,
+                'catalog': catalog.to_dict() if catalog is not None else None,
+                'table_name': table_name,
+                'columns': columns,
+                'foreign_keys': foreign_keys,
+                'existing_fk_values': existing_fk_values,
+                'engine': engine,
+                'seed': seed,
+                'seeded': configured_seed is not None,
+                'row_start': row_start,
+                'shard': shard,
+                'shards': workers,
+                'rows': rows,
+                'batch_size': self.get_batch_size(table_name),
+                'key_columns': key_columns
+            })
+            row_start += rows
+        
+        print(f"🧩 Параллельная генерация '{table_name}': {num_rows} строк в {workers} процессах")
+        started = time.perf_counter()
+        results = run_parallel(tasks, workers)
+        elapsed = time.perf_counter() - started
+        
+        failed = [result['shard'] + 1 for result in results if not result['success']]
+        inserted = sum(result['rows'] for result in results if result['success'])
+        
+        # Ключи успешных шардов зафиксированы в базе и доступны дочерним таблицам
+        for result in results:
+            self.metrics.merge_table(table_name, result['metrics'])
+            if result['success']:
+                self._register_inserted_keys(table_name, key_columns, result['keys'])
+                self._record_output_files(table_name, [column['name'] for column in columns], result['files'])
+        if failed:
+            print(f"❌ Шарды {failed} таблицы '{table_name}' завершились с ошибкой; "
+                  f"успешные шарды вставили {inserted} строк")
             return False
         
-        # Вставляем данные
-        return self.insert_synthetic_data(table_name, synthetic_data)
+        action = "записано" if self.is_offline() else "вставлено"
+        target = "в файлы таблицы" if self.is_offline() else "в таблицу"
+        print(f"✅ Параллельно {action} {inserted} строк {target} {table_name} "
+              f"за {elapsed:.2f} с ({inserted / max(elapsed, 1e-9):.0f} строк/с)")
+        return True
 
     def validate_foreign_keys(self, table_name: str, synthetic_data: List[Dict[str, Any]]) -> bool:
         """Проверяет, что все внешние ключи в данных существуют"""
@@ -614,79 +1453,17 @@ class PostgresUtils:
     def test_connection(self) -> bool:
         """Проверяет подключение к базе данных"""
         try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
                 return True
         except psycopg2.Error as e:
             print(f"❌ Ошибка подключения: {e}")
             return False
 
     def get_advanced_table_structure(self, table_name: str) -> List[Dict[str, Any]]:
-        """Расширенный метод получения структуры с надежным определением GENERATED колонок"""
-        try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
-                with conn.cursor() as cursor:
-                    # Запрос к системным таблицам PostgreSQL для надежного определения
-                    query = """
-                    SELECT 
-                        a.attname as column_name,
-                        format_type(a.atttypid, a.atttypmod) as data_type,
-                        CASE WHEN a.atttypmod > 0 THEN a.atttypmod - 4 ELSE NULL END as max_length,
-                        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END as is_nullable,
-                        pg_get_expr(ad.adbin, ad.adrelid) as column_default,
-                        a.attgenerated as is_generated
-                    FROM pg_attribute a
-                    LEFT JOIN pg_attrdef ad ON a.attrelid = ad.adrelid AND a.attnum = ad.adnum
-                    WHERE a.attrelid = %s::regclass
-                    AND a.attnum > 0
-                    AND NOT a.attisdropped
-                    ORDER BY a.attnum;
-                    """
-                    
-                    full_table_name = f"{self.config.schema}.{table_name}"
-                    cursor.execute(query, (full_table_name,))
-                    columns = cursor.fetchall()
-                    
-                    structure = []
-                    for col in columns:
-                        column_info = {
-                            'name': col[0],
-                            'data_type': col[1],
-                            'max_length': col[2],
-                            'nullable': col[3] == 'YES',
-                            'default': col[4],
-                            'is_generated': 'ALWAYS' if col[5] == 's' else 'NEVER'
-                        }
-                        structure.append(column_info)
-                    return structure
-                    
-        except psycopg2.Error as e:
-            print(f"❌ Ошибка получения расширенной структуры: {e}")
-            # Fallback к базовому методу
-            return self.get_table_structure(table_name)
-    
-    def _collect_generated_fk_values(self, table_name: str, existing_fk_values: Dict[str, List[Any]]):
-        """Собирает значения из сгенерированной таблицы для использования как внешние ключи"""
-        try:
-            with psycopg2.connect(**self.config.get_connection_params()) as conn:
-                with conn.cursor() as cursor:
-                    # Получаем структуру таблицы чтобы определить первичные ключи
-                    structure = self.get_table_structure(table_name)
-                    
-                    for column in structure:
-                        # Предполагаем, что первичные ключи имеют имена вида id, table_id, etc.
-                        if column['name'] in ['id', f'{table_name}_id', 'user_id', 'order_id']:
-                            query = sql.SQL("SELECT DISTINCT {} FROM {}.{}").format(
-                                sql.Identifier(column['name']),
-                                sql.Identifier(self.config.schema),
-                                sql.Identifier(table_name)
-                            )
-                            
-                            cursor.execute(query)
-                            values = [row[0] for row in cursor.fetchall()]
-                            
-                            fk_key = f"{table_name}.{column['name']}"
-                            existing_fk_values[fk_key] = values
-                            print(f"📊 Сохранено {len(values)} значений для внешнего ключа: {fk_key}")
-                            
-        except psycopg2.Error as e:
-            print(f"❌ Ошибка при сборе значений FK: {e}")
\ No newline at end of file
+        """Структура таблицы с полными типами (с модификаторами, например varchar(50))"""
+        structure = self.get_table_structure(table_name)
+        for column in structure:
+            column['data_type'] = column.get('full_type') or column['data_type']
+        return structure
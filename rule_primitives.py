@@ -0,0 +1,110 @@
+import string
+from datetime import datetime
+from typing import List, Callable
+
+# Общие константы и разбор параметров column_rules. Модуль не импортирует
+# модули генерации, поэтому его используют и generation_plan, и движки
+# (numpy_engine, batch_strings, unique_values) без циклических импортов
+
+DEFAULT_EMAIL_DOMAINS = ['gmail.com', 'mail.ru', 'yandex.ru']
+
+# Пулы символов для слотов шаблона: '#' - цифра, 'A' - заглавная, 'a' - строчная буква
+PATTERN_SLOTS = {
+    '#': string.digits,
+    'A': string.ascii_uppercase,
+    'a': string.ascii_lowercase,
+}
+
+DATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M',
+    '%d.%m.%Y',
+    '%d.%m.%Y %H:%M:%S'
+]
+
+# Диапазон числового суффикса email (name123@domain)
+EMAIL_NUMBER_RANGE = (1, 999)
+
+# Длина имени email в буквах
+EMAIL_NAME_LENGTH = (5, 10)
+
+
+def days_in_month(year: int, month: int) -> int:
+    """Возвращает количество дней в месяце с учетом високосных годов"""
+    if month == 2:
+        if (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0):
+            return 29
+        return 28
+    if month in (4, 6, 9, 11):
+        return 30
+    return 31
+
+
+def parse_date(date_str: str) -> datetime:
+    """Парсит дату из строки с учетом формата"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+
+    # Если ни один формат не подошел, пробуем угадать
+    try:
+        return datetime.fromisoformat(date_str.replace(' ', 'T'))
+    except ValueError:
+        raise ValueError(f"Неизвестный формат даты: {date_str}")
+
+
+def validate_date_range(start_date_str: str, end_date_str: str) -> tuple:
+    """Проверяет и парсит диапазон дат"""
+    start_date = parse_date(start_date_str)
+    end_date = parse_date(end_date_str)
+
+    if start_date > end_date:
+        raise ValueError(f"Начальная дата {start_date} не может быть больше конечной {end_date}")
+
+    return start_date, end_date
+
+
+def partition_range(min_val: int, max_val: int, partition: tuple = None) -> tuple:
+    """Возвращает часть [min_val, max_val] для шарда partition = (номер, всего шардов).
+
+    Части шардов не пересекаются и вместе покрывают весь диапазон.
+    """
+    if partition is None:
+        return min_val, max_val
+    shard, shards = partition
+    span = max_val - min_val + 1
+    if span < shards:
+        raise ValueError(f"диапазон из {span} значений нельзя разбить на {shards} шардов")
+    return min_val + span * shard // shards, min_val + span * (shard + 1) // shards - 1
+
+
+def pattern_slots(pattern: str) -> List[str]:
+    """Разбирает шаблон: для слотов '#', 'A', 'a' - пул символов, для остальных - сам символ"""
+    return [PATTERN_SLOTS.get(char) or char for char in pattern]
+
+
+def pattern_space_size(slots: List[str]) -> int:
+    """Количество различных строк, которые порождает шаблон"""
+    size = 1
+    for slot in slots:
+        size *= len(slot)
+    return size
+
+
+def compile_pattern_decoder(slots: List[str]) -> Callable[[int], str]:
+    """Функция, переводящая номер из [0, pattern_space_size) в строку шаблона (взаимно однозначно)"""
+    # Слоты-литералы не влияют на номер, разбираем только позиции с пулами
+    variable = [(position, slot) for position, slot in enumerate(slots) if len(slot) > 1][::-1]
+    template = [slot if len(slot) == 1 else '' for slot in slots]
+
+    def decode(index: int) -> str:
+        chars = template[:]
+        for position, slot in variable:
+            index, digit = divmod(index, len(slot))
+            chars[position] = slot[digit]
+        return ''.join(chars)
+
+    return decode
@@ -0,0 +1,261 @@
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional
+
+try:
+    import resource
+except ImportError:
+    # В Windows модуля resource нет: пик памяти не измеряется
+    resource = None
+
+# Стадии запуска, время которых суммируется по всем потокам и процессам
+STAGES = ('catalog', 'fk_fetch', 'generate', 'serialize', 'network', 'commit', 'file_write', 'deferred_fk',
+          'bulk_load', 'backpressure', 'writer_idle', 'shard_wait', 'route')
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# Прогресс таблицы печатается не чаще одного раза за столько секунд
+DEFAULT_PROGRESS_INTERVAL = 5.0
+
+
+def get_log_level(global_settings: Dict[str, Any]) -> str:
+    """Уровень логов из global_settings: DEBUG, INFO, WARNING или ERROR"""
+    level = str(global_settings.get('log_level', 'INFO')).upper()
+    if level not in LOG_LEVELS:
+        print(f"⚠️  Неизвестный log_level '{level}', используется 'INFO'")
+        return 'INFO'
+    return level
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """Пиковый объем памяти процесса (или завершенных дочерних процессов) в байтах"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # Linux сообщает ru_maxrss в килобайтах, macOS - в байтах
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def load_hook(spec: str) -> Callable[[Dict[str, Any]], None]:
+    """Импортирует функцию-обработчик событий по строке 'модуль:функция'"""
+    module_name, _, function_name = spec.partition(':')
+    if not module_name or not function_name:
+        raise ValueError(f"metrics_hook '{spec}' должен иметь вид 'модуль:функция'")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _empty_table() -> Dict[str, Any]:
+    return {'rows': 0, 'seconds': 0.0, 'success': None, 'stages': {}, 'columns': {},
+            'unique_trackers': {'columns': 0, 'values': 0, 'memory_bytes': 0}}
+
+
+class ProgressTracker:
+    """Прогресс генерации одной таблицы: печатается не чаще, чем раз в interval секунд"""
+
+    def __init__(self, metrics: 'RunMetrics', label: str, total: int):
+        self.metrics = metrics
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+        self._reported = self.started
+
+    def update(self, rows: int):
+        self.done += rows
+        now = time.perf_counter()
+        if self.metrics.log_level == 'DEBUG':
+            print(f"✅ {self.label}: сгенерировано {self.done} строк...")
+        elif now - self._reported >= self.metrics.progress_interval and self.done < self.total:
+            self._report(now)
+
+    def _report(self, now: float):
+        self._reported = now
+        rate = self.done / max(now - self.started, 1e-9)
+        if self.metrics.log_level in ('DEBUG', 'INFO'):
+            print(f"⏳ {self.label}: {self.done}/{self.total} строк "
+                  f"({self.done * 100 // max(self.total, 1)}%), {rate:.0f} строк/с")
+        self.metrics.emit('progress', label=self.label, rows=self.done, total=self.total, rows_per_second=rate)
+
+
+class RunMetrics:
+    """Метрики запуска: время стадий, строки и скорость по таблицам, повторы уникальных значений, пик памяти.
+
+    Время стадий суммируется по всем потокам и процессам, поэтому при
+    параллельной загрузке оно может превышать время таблицы. События
+    (progress, table, run) передаются обработчикам из add_hook и metrics_hook.
+    """
+
+    def __init__(self, global_settings: Dict[str, Any] = None):
+        global_settings = global_settings or {}
+        self.log_level = get_log_level(global_settings)
+        self.progress_interval = float(global_settings.get('progress_interval', DEFAULT_PROGRESS_INTERVAL))
+        self.report_path = global_settings.get('metrics_report')
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tables = {}
+        self.hooks = []
+        self._lock = threading.Lock()
+
+        hook = global_settings.get('metrics_hook')
+        if hook:
+            try:
+                self.add_hook(load_hook(hook))
+            except (ImportError, AttributeError, ValueError) as e:
+                print(f"⚠️  Не удалось загрузить metrics_hook '{hook}': {e}")
+
+    def add_hook(self, hook: Callable[[Dict[str, Any]], None]):
+        """Добавляет обработчик событий; он получает словарь с ключом event"""
+        self.hooks.append(hook)
+
+    def emit(self, event: str, **fields):
+        """Передает событие всем обработчикам; их ошибки не прерывают загрузку"""
+        if not self.hooks:
+            return
+        fields.update(event=event, time=time.time())
+        for hook in list(self.hooks):
+            try:
+                hook(fields)
+            except Exception as e:
+                print(f"⚠️  Ошибка обработчика метрик {getattr(hook, '__name__', hook)}: {e}; он отключен")
+                self.hooks.remove(hook)
+
+    def _table(self, table_name: str) -> Dict[str, Any]:
+        if table_name not in self.tables:
+            self.tables[table_name] = _empty_table()
+        return self.tables[table_name]
+
+    def add_time(self, stage: str, seconds: float, table_name: str = None):
+        """Добавляет время стадии (всего запуска или таблицы)"""
+        with self._lock:
+            stages = self.stages if table_name is None else self._table(table_name)['stages']
+            stages[stage] = stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage: str, table_name: str = None):
+        """Измеряет время блока и добавляет его к стадии"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started, table_name)
+
+    def add_rows(self, table_name: str, rows: int):
+        with self._lock:
+            self._table(table_name)['rows'] += rows
+
+    def add_columns(self, table_name: str, columns: Dict[str, Dict[str, Any]]):
+        """Добавляет время генерации и повторы уникальных значений по колонкам"""
+        with self._lock:
+            table_columns = self._table(table_name)['columns']
+            for name, stats in columns.items():
+                column = table_columns.setdefault(name, {})
+                for key, value in stats.items():
+                    column[key] = column.get(key, 0) + value
+
+    def add_trackers(self, table_name: str, stats: Dict[str, int]):
+        """Добавляет значения и память трекеров уникальности (планы шардов складываются)"""
+        with self._lock:
+            trackers = self._table(table_name)['unique_trackers']
+            trackers['columns'] = max(trackers['columns'], stats.get('columns', 0))
+            trackers['values'] += stats.get('values', 0)
+            trackers['memory_bytes'] += stats.get('memory_bytes', 0)
+
+    def progress(self, label: str, total: int) -> ProgressTracker:
+        return ProgressTracker(self, label, total)
+
+    def finish_table(self, table_name: str, seconds: float, success: bool):
+        """Отмечает окончание таблицы и передает ее метрики обработчикам"""
+        with self._lock:
+            table = self._table(table_name)
+            table['seconds'] += seconds
+            table['success'] = bool(success)
+        self.emit('table', table_name=table_name, **self.table_report(table_name))
+
+    def table_report(self, table_name: str) -> Dict[str, Any]:
+        """Метрики таблицы в виде словаря (из дочернего процесса передаются в merge_table)"""
+        with self._lock:
+            table = self.tables.get(table_name) or _empty_table()
+            report = dict(table, stages=dict(table['stages']),
+                          columns={name: dict(column) for name, column in table['columns'].items()},
+                          unique_trackers=dict(table['unique_trackers']))
+        report['rows_per_second'] = round(report['rows'] / report['seconds'], 1) if report['seconds'] else None
+        return report
+
+    def merge_table(self, table_name: str, report: Dict[str, Any]):
+        """Добавляет метрики шарда, собранные в другом процессе"""
+        self.add_rows(table_name, report.get('rows', 0))
+        for stage, seconds in report.get('stages', {}).items():
+            self.add_time(stage, seconds, table_name)
+        self.add_columns(table_name, report.get('columns', {}))
+        self.add_trackers(table_name, report.get('unique_trackers', {}))
+
+    def report(self) -> Dict[str, Any]:
+        """Отчет о запуске для записи в JSON"""
+        stages = dict(self.stages)
+        tables = {name: self.table_report(name) for name in list(self.tables)}
+        for table in tables.values():
+            for stage, seconds in table['stages'].items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+            table['seconds'] = round(table['seconds'], 3)
+            table['stages'] = {stage: round(seconds, 3) for stage, seconds in table['stages'].items()}
+            for column in table['columns'].values():
+                column['seconds'] = round(column['seconds'], 3)
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self.started, 3),
+            'rows': sum(table['rows'] for table in tables.values()),
+            'stages': {stage: round(seconds, 3) for stage, seconds in stages.items()},
+            'unique_retries': sum(column.get('retries', 0) for table in tables.values()
+                                  for column in table['columns'].values()),
+            'unique_tracker_bytes': sum(table['unique_trackers']['memory_bytes'] for table in tables.values()),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_rss_children_bytes': peak_rss_bytes(children=True),
+            'tables': tables
+        }
+
+    def write_report(self, path: str, report: Dict[str, Any]) -> bool:
+        """Записывает отчет в JSON (через временный файл, чтобы не оставить обрезанный)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        temp_path = path + '.tmp'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, path)
+            return True
+        except OSError as e:
+            print(f"⚠️  Не удалось записать отчет о запуске в '{path}': {e}")
+            return False
+
+    def finish(self) -> Dict[str, Any]:
+        """Печатает сводку, пишет отчет metrics_report и передает его обработчикам"""
+        report = self.report()
+        if self.log_level in ('DEBUG', 'INFO'):
+            self.print_summary(report)
+        if self.report_path and self.write_report(self.report_path, report):
+            print(f"📊 Отчет о запуске: {self.report_path}")
+        self.emit('run', **report)
+        return report
+
+    def print_summary(self, report: Dict[str, Any]):
+        print(f"\n📊 Итоги запуска: {report['rows']} строк за {report['seconds']:.2f} с")
+        for table_name, table in report['tables'].items():
+            rate = f"{table['rows_per_second']:.0f} строк/с" if table['rows_per_second'] else "-"
+            stages = ', '.join(f"{stage} {seconds:.2f} с" for stage, seconds in
+                               sorted(table['stages'].items(), key=lambda item: -item[1]))
+            print(f"   {table_name}: {table['rows']} строк за {table['seconds']:.2f} с ({rate}); {stages}")
+            retries = {name: column['retries'] for name, column in table['columns'].items() if column.get('retries')}
+            if retries:
+                print(f"      🔁 Повторы уникальных значений: {retries}")
+        if report['peak_rss_bytes'] is not None:
+            memory = f"{report['peak_rss_bytes'] / 2 ** 20:.0f} МБ"
+            if report['peak_rss_children_bytes']:
+                memory += f", дочерние процессы {report['peak_rss_children_bytes'] / 2 ** 20:.0f} МБ"
+            print(f"   💾 Пик памяти: {memory}")
@@ -0,0 +1,260 @@
+from typing import List, Dict, Any, Optional
+
+# Стратегии секционирования из pg_partitioned_table.partstrat
+PARTITION_STRATEGIES = {'r': 'range', 'l': 'list', 'h': 'hash'}
+
+
+class SchemaCatalog:
+    """Снимок структуры схемы: колонки, ключи и ограничения всех таблиц.
+
+    Загружается несколькими запросами к pg_catalog сразу для всей схемы,
+    после чего все методы работают только с памятью. Данные хранятся в
+    виде обычных словарей и списков, поэтому снимок сериализуется в JSON.
+    """
+
+    COLUMNS_QUERY = """
+    SELECT
+        c.relname,
+        c.relkind,
+        a.attname,
+        format_type(a.atttypid, NULL) AS data_type,
+        format_type(a.atttypid, a.atttypmod) AS full_type,
+        CASE WHEN a.atttypid IN ('varchar'::regtype, 'bpchar'::regtype) AND a.atttypmod > 0
+             THEN a.atttypmod - 4 END AS max_length,
+        NOT a.attnotnull AS nullable,
+        CASE WHEN a.attgenerated = '' THEN pg_get_expr(ad.adbin, ad.adrelid) END AS column_default,
+        CASE WHEN a.attgenerated = 's' THEN 'ALWAYS' ELSE 'NEVER' END AS is_generated,
+        CASE WHEN a.attgenerated = 's' THEN pg_get_expr(ad.adbin, ad.adrelid) END AS generation_expression,
+        CASE a.attidentity WHEN 'a' THEN 'ALWAYS' WHEN 'd' THEN 'BY DEFAULT' END AS identity
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef ad ON ad.adrelid = a.attrelid AND ad.adnum = a.attnum
+    WHERE n.nspname = %s
+    AND c.relkind IN ('r', 'p')
+    ORDER BY c.relname, a.attnum;
+    """
+
+    # Первичные ключи и уникальные индексы (без частичных и по выражениям)
+    UNIQUE_QUERY = """
+    SELECT
+        c.relname,
+        i.indisprimary,
+        array_agg(a.attname ORDER BY k.ord) AS columns
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+    LEFT JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE n.nspname = %s
+    AND i.indisunique
+    AND i.indpred IS NULL
+    AND k.ord <= i.indnkeyatts
+    GROUP BY c.relname, i.indexrelid, i.indisprimary, i.indnkeyatts
+    HAVING count(a.attname) = i.indnkeyatts
+    ORDER BY c.relname, i.indisprimary DESC, i.indexrelid;
+    """
+
+    # Внешние ключи; копии ограничения, которые PostgreSQL создает для
+    # секций секционированной родительской таблицы, пропускаются
+    FOREIGN_KEYS_QUERY = """
+    SELECT
+        c.relname,
+        con.conname,
+        a.attname,
+        fn.nspname,
+        fc.relname,
+        fa.attname,
+        con.condeferrable
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class fc ON fc.oid = con.confrelid
+    JOIN pg_namespace fn ON fn.oid = fc.relnamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+    WHERE n.nspname = %s
+    AND con.contype = 'f'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_constraint parent
+        WHERE parent.oid = con.conparentid
+        AND parent.conrelid = con.conrelid
+    )
+    ORDER BY c.relname, con.conname, k.ord;
+    """
+
+    # Секционированные таблицы: стратегия и колонки ключа (ключ с выражениями
+    # отмечается отдельно, его колонки на клиенте не вычислить)
+    PARTITIONED_QUERY = """
+    SELECT
+        c.relname,
+        p.partstrat,
+        p.partexprs IS NOT NULL AS has_expressions,
+        ARRAY(
+            SELECT a.attname
+            FROM unnest(p.partattrs::int2[]) WITH ORDINALITY AS k(attnum, ord)
+            JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = k.attnum
+            ORDER BY k.ord
+        ) AS key_columns
+    FROM pg_partitioned_table p
+    JOIN pg_class c ON c.oid = p.partrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s
+    ORDER BY c.relname;
+    """
+
+    # Непосредственные секции секционированных таблиц схемы и их границы
+    PARTITIONS_QUERY = """
+    SELECT
+        parent.relname,
+        cn.nspname,
+        child.relname,
+        pg_get_expr(child.relpartbound, child.oid)
+    FROM pg_inherits i
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    JOIN pg_namespace n ON n.oid = parent.relnamespace
+    JOIN pg_class child ON child.oid = i.inhrelid
+    JOIN pg_namespace cn ON cn.oid = child.relnamespace
+    WHERE n.nspname = %s
+    AND child.relispartition
+    ORDER BY parent.relname, cn.nspname, child.relname;
+    """
+
+    def __init__(self, schema: str, tables: Dict[str, Dict[str, Any]]):
+        self.schema = schema
+        self.tables = tables
+
+    @classmethod
+    def load(cls, cursor, schema: str) -> 'SchemaCatalog':
+        """Загружает снимок схемы пятью запросами к pg_catalog"""
+        tables = {}
+
+        cursor.execute(cls.COLUMNS_QUERY, (schema,))
+        for row in cursor.fetchall():
+            table = tables.setdefault(row[0], cls._empty_table(row[1]))
+            table['columns'].append({
+                'name': row[2],
+                'data_type': row[3],
+                'full_type': row[4],
+                'max_length': row[5],
+                'nullable': row[6],
+                'default': row[7],
+                'is_generated': row[8],
+                'generation_expression': row[9],
+                'identity': row[10]
+            })
+
+        cursor.execute(cls.UNIQUE_QUERY, (schema,))
+        for table_name, is_primary, columns in cursor.fetchall():
+            table = tables.get(table_name)
+            if table is None:
+                continue
+            if is_primary:
+                table['primary_key'] = list(columns)
+            elif list(columns) not in table['unique_constraints']:
+                table['unique_constraints'].append(list(columns))
+
+        cursor.execute(cls.FOREIGN_KEYS_QUERY, (schema,))
+        for row in cursor.fetchall():
+            table = tables.get(row[0])
+            if table is None:
+                continue
+            table['foreign_keys'].append({
+                'constraint_name': row[1],
+                'column_name': row[2],
+                'foreign_table_schema': row[3],
+                'foreign_table_name': row[4],
+                'foreign_column_name': row[5],
+                'deferrable': row[6]
+            })
+
+        cursor.execute(cls.PARTITIONED_QUERY, (schema,))
+        for table_name, strategy, has_expressions, key_columns in cursor.fetchall():
+            table = tables.get(table_name)
+            if table is None:
+                continue
+            table['partitioning'] = {
+                'strategy': PARTITION_STRATEGIES.get(strategy, strategy),
+                'key': None if has_expressions else list(key_columns),
+                'partitions': []
+            }
+
+        cursor.execute(cls.PARTITIONS_QUERY, (schema,))
+        for parent_name, child_schema, child_name, bound in cursor.fetchall():
+            parent = tables.get(parent_name)
+            if parent is None or not parent.get('partitioning'):
+                continue
+            parent['partitioning']['partitions'].append({'schema': child_schema, 'name': child_name, 'bound': bound})
+            if child_schema == schema and child_name in tables:
+                tables[child_name]['partition_of'] = parent_name
+
+        return cls(schema, tables)
+
+    @staticmethod
+    def _empty_table(relkind: str) -> Dict[str, Any]:
+        return {
+            'kind': relkind,
+            'columns': [],
+            'primary_key': [],
+            'unique_constraints': [],
+            'foreign_keys': [],
+            'partitioning': None,
+            'partition_of': None
+        }
+
+    def table_names(self) -> List[str]:
+        """Имена всех таблиц схемы в алфавитном порядке (секции загружаются через свою родительскую таблицу)"""
+        return sorted(name for name, table in self.tables.items() if not table.get('partition_of'))
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self.tables
+
+    def get_table(self, table_name: str) -> Optional[Dict[str, Any]]:
+        return self.tables.get(table_name)
+
+    def get_columns(self, table_name: str) -> List[Dict[str, Any]]:
+        """Колонки таблицы в порядке их следования"""
+        table = self.tables.get(table_name)
+        return [dict(column) for column in table['columns']] if table else []
+
+    def get_foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
+        """Внешние ключи таблицы (по одной записи на пару колонок)"""
+        table = self.tables.get(table_name)
+        return [dict(fk) for fk in table['foreign_keys']] if table else []
+
+    def get_referenced_columns(self, table_name: str) -> List[str]:
+        """Колонки таблицы, на которые ссылаются внешние ключи таблиц схемы"""
+        columns = []
+        for table in self.tables.values():
+            for fk in table['foreign_keys']:
+                if (fk['foreign_table_schema'] == self.schema and fk['foreign_table_name'] == table_name
+                        and fk['foreign_column_name'] not in columns):
+                    columns.append(fk['foreign_column_name'])
+        return columns
+
+    def get_primary_key(self, table_name: str) -> List[str]:
+        table = self.tables.get(table_name)
+        return list(table['primary_key']) if table else []
+
+    def get_partitioning(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Стратегия, ключ и секции секционированной таблицы; None для обычной"""
+        table = self.tables.get(table_name)
+        return table.get('partitioning') if table else None
+
+    def get_partition_parent(self, table_name: str) -> Optional[str]:
+        """Родительская таблица секции; None, если таблица не секция"""
+        table = self.tables.get(table_name)
+        return table.get('partition_of') if table else None
+
+    def get_unique_constraints(self, table_name: str) -> List[List[str]]:
+        """Уникальные ограничения и индексы таблицы, кроме первичного ключа"""
+        table = self.tables.get(table_name)
+        return [list(columns) for columns in table['unique_constraints']] if table else []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'schema': self.schema, 'tables': self.tables}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SchemaCatalog':
+        return cls(data['schema'], data['tables'])
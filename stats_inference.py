@@ -0,0 +1,298 @@
+import re
+import string
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+import rule_primitives
+import text_vocabulary
+
+# Статистика планировщика по колонкам (то, что собирает ANALYZE); статистика
+# с inherited = true (по родителю и секциям) идет последней и заменяет свою
+STATS_QUERY = """
+SELECT
+    tablename,
+    attname,
+    null_frac,
+    n_distinct,
+    avg_width,
+    most_common_vals::text::text[],
+    most_common_freqs,
+    histogram_bounds::text::text[]
+FROM pg_stats
+WHERE schemaname = %s
+AND tablename = ANY(%s)
+ORDER BY tablename, attname, inherited;
+"""
+
+# Оценка числа строк; у секционированной таблицы - сумма оценок ее секций
+RELTUPLES_QUERY = """
+SELECT
+    c.relname,
+    CASE WHEN c.relkind = 'p' THEN (
+        SELECT sum(greatest(leaf.reltuples, 0))
+        FROM pg_partition_tree(c.oid) tree
+        JOIN pg_class leaf ON leaf.oid = tree.relid
+        WHERE tree.isleaf
+    ) ELSE c.reltuples END
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %s
+AND c.relname = ANY(%s)
+AND c.relkind IN ('r', 'p');
+"""
+
+INT_TYPES = ('smallint', 'integer', 'bigint')
+DECIMAL_TYPES = ('numeric', 'real', 'double precision')
+TEXT_TYPES = ('text', 'character varying', 'character')
+
+EMAIL_REGEX = re.compile(r'^[^@\s]+@([^@\s]+\.[^@\s]+)$')
+
+# Символ позиции шаблона для класса символов, встреченных в этой позиции
+PATTERN_CLASSES = (('#', set(string.digits)), ('A', set(string.ascii_uppercase)), ('a', set(string.ascii_lowercase)))
+
+
+def load_statistics(cursor, schema: str, tables: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Статистика pg_stats и оценки reltuples для таблиц схемы двумя запросами, без чтения самих таблиц.
+
+    Возвращает {таблица: {'rows': оценка строк или None, 'columns': {колонка: статистика}}}.
+    """
+    statistics = {table: {'rows': None, 'columns': {}} for table in tables}
+
+    cursor.execute(RELTUPLES_QUERY, (schema, list(tables)))
+    for table_name, reltuples in cursor.fetchall():
+        # -1 и 0 - таблица еще не анализировалась
+        if reltuples is not None and reltuples > 0:
+            statistics[table_name]['rows'] = float(reltuples)
+
+    cursor.execute(STATS_QUERY, (schema, list(tables)))
+    for table_name, column_name, null_frac, n_distinct, avg_width, common_values, common_freqs, histogram \
+            in cursor.fetchall():
+        statistics[table_name]['columns'][column_name] = {
+            'null_frac': float(null_frac or 0.0),
+            'n_distinct': float(n_distinct or 0.0),
+            'avg_width': avg_width,
+            'common_values': list(common_values or []),
+            'common_freqs': [float(freq) for freq in common_freqs or []],
+            'histogram': list(histogram or [])
+        }
+    return statistics
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    # NaN и бесконечности правилом decimal не воспроизводятся
+    return number if number - number == 0 else None
+
+
+def _to_datetime(value: str) -> Optional[datetime]:
+    # Дробные секунды и часовой пояс отбрасываются
+    try:
+        return rule_primitives.parse_date(value[:19])
+    except ValueError:
+        return None
+
+
+def _common_share(stats: Dict[str, Any]) -> float:
+    """Доля непустых строк, которая приходится на одну строку pg_stats"""
+    return 1.0 / max(1.0 - stats['null_frac'], 1e-9)
+
+
+def _weighted_values(values: List[Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Частые значения и их доли среди непустых строк"""
+    share = _common_share(stats)
+    pairs = [(value, freq) for value, freq in zip(values, stats['common_freqs']) if value is not None]
+    return {
+        'common_values': [value for value, _ in pairs],
+        'common_weights': [round(min(freq * share, 1.0), 6) for _, freq in pairs]
+    }
+
+
+def _is_enum(stats: Dict[str, Any]) -> bool:
+    """Все значения колонки перечислены в most_common_vals"""
+    if not stats['common_values']:
+        return False
+    return not stats['histogram'] or 0 < stats['n_distinct'] <= len(stats['common_values'])
+
+
+def _enum_rule(values: List[Any], stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    pairs = [(value, freq) for value, freq in zip(values, stats['common_freqs']) if value is not None]
+    if not pairs:
+        return None
+    return {
+        'type': 'enum',
+        'values': [value for value, _ in pairs],
+        'weights': [round(freq, 6) for _, freq in pairs]
+    }
+
+
+def _decimal_precision(column: Dict[str, Any], samples: List[str]) -> int:
+    """Число знаков после запятой: из типа numeric(p,s) или по самим значениям"""
+    match = re.search(r'numeric\(\d+,(\d+)\)', column.get('full_type') or '')
+    if match:
+        return int(match.group(1))
+    decimals = [len(sample.partition('.')[2]) for sample in samples if 'e' not in sample.lower()]
+    return min(max(decimals, default=2), 6)
+
+
+def _infer_number(column: Dict[str, Any], stats: Dict[str, Any], integer: bool, unique: bool,
+                  rows: int) -> Optional[Dict[str, Any]]:
+    convert = _to_int if integer else _to_float
+    histogram = [value for value in map(convert, stats['histogram']) if value is not None]
+    common = [convert(value) for value in stats['common_values']]
+
+    if _is_enum(stats) and not unique:
+        return _enum_rule(common, stats)
+
+    values = histogram + [value for value in common if value is not None]
+    if not values:
+        return None
+    rule = {'type': 'int' if integer else 'decimal', 'min_value': min(values), 'max_value': max(values)}
+
+    if integer and unique:
+        # Пространство уникальных значений должно вместить все строки
+        rule['max_value'] = max(rule['max_value'], rule['min_value'] + rows - 1)
+        return rule
+    if not integer:
+        rule['precision'] = _decimal_precision(column, stats['histogram'] + stats['common_values'])
+    if unique:
+        # Различных чисел с precision знаками в диапазоне должно хватить на все строки
+        step = 10 ** -rule['precision']
+        rule['max_value'] = max(rule['max_value'],
+                                round(rule['min_value'] + (rows - 1) * step, rule['precision']))
+        return rule
+    if len(histogram) >= 2:
+        rule['histogram'] = histogram
+    if any(value is not None for value in common):
+        rule.update(_weighted_values(common, stats))
+    return rule
+
+
+def _infer_datetime(stats: Dict[str, Any], date_only: bool, unique: bool = False,
+                    rows: int = 0) -> Optional[Dict[str, Any]]:
+    fmt = '%Y-%m-%d' if date_only else '%Y-%m-%d %H:%M:%S'
+    histogram = [value for value in map(_to_datetime, stats['histogram']) if value is not None]
+    values = histogram + [value for value in map(_to_datetime, stats['common_values']) if value is not None]
+    if not values:
+        return None
+    start, end = min(values), max(values)
+    if unique:
+        # Уникальных дней (секунд) в диапазоне должно хватить на все строки
+        step = timedelta(days=1) if date_only else timedelta(seconds=1)
+        end = max(end, start + step * max(rows - 1, 0))
+    rule = {
+        'type': 'date' if date_only else 'timestamp',
+        'start_date': start.strftime(fmt),
+        'end_date': end.strftime(fmt)
+    }
+    if len(histogram) >= 2 and not unique:
+        rule['histogram'] = [value.strftime(fmt) for value in histogram]
+    return rule
+
+
+def infer_pattern(samples: List[str]) -> Optional[str]:
+    """Шаблон pattern, если все значения одной длины и в каждой позиции один класс символов"""
+    if len(samples) < 2 or len({len(sample) for sample in samples}) != 1 or not samples[0]:
+        return None
+    pattern = []
+    for chars in zip(*samples):
+        seen = set(chars)
+        if len(seen) == 1 and chars[0] not in rule_primitives.PATTERN_SLOTS:
+            pattern.append(chars[0])
+            continue
+        slot = next((slot for slot, pool in PATTERN_CLASSES if seen <= pool), None)
+        if slot is None:
+            return None
+        pattern.append(slot)
+    pattern = ''.join(pattern)
+    # Шаблон без слотов - это одна и та же строка
+    return pattern if any(slot in pattern for slot, _ in PATTERN_CLASSES) else None
+
+
+def widen_pattern(pattern: str, rows: int, max_length: int = None) -> Optional[str]:
+    """Дописывает к шаблону цифры, пока в нем не станет rows различных строк.
+
+    None, если для этого шаблон пришлось бы сделать длиннее max_length.
+    """
+    while rule_primitives.pattern_space_size(rule_primitives.pattern_slots(pattern)) < rows:
+        if max_length and len(pattern) >= max_length:
+            return None
+        pattern += '#'
+    return pattern
+
+
+def _infer_text(column: Dict[str, Any], stats: Dict[str, Any], unique: bool,
+                rows: int = 0) -> Optional[Dict[str, Any]]:
+    samples = [value for value in stats['histogram'] + stats['common_values'] if value is not None]
+
+    if _is_enum(stats) and not unique:
+        return _enum_rule(stats['common_values'], stats)
+
+    domains = [EMAIL_REGEX.match(sample) for sample in samples]
+    if samples and all(domains):
+        counts = Counter(match.group(1) for match in domains)
+        return {'type': 'email', 'domains': [domain for domain, _ in counts.most_common()]}
+
+    pattern = infer_pattern(samples)
+    if pattern and unique:
+        # Короткий шаблон дополняется цифрами, иначе остается текст
+        pattern = widen_pattern(pattern, rows, column.get('max_length'))
+    if pattern:
+        return {'type': 'pattern', 'pattern': pattern}
+
+    if samples:
+        word_counts = [len(sample.split()) or 1 for sample in samples]
+        min_words, max_words = min(word_counts), max(word_counts)
+    elif stats['avg_width']:
+        # Без образцов длина оценивается по среднему размеру значения
+        words = text_vocabulary.load_vocabulary()
+        mean_word = sum(map(len, words)) / len(words) + 1
+        min_words = max_words = max(1, round(stats['avg_width'] / mean_word))
+    else:
+        return None
+    rule = {'type': 'text', 'min_words': min_words, 'max_words': max_words}
+    if not unique and stats['common_values']:
+        rule.update(_weighted_values(stats['common_values'], stats))
+    return rule
+
+
+def infer_column_rule(column: Dict[str, Any], stats: Dict[str, Any], unique: bool = False,
+                      rows: int = 0) -> Optional[Dict[str, Any]]:
+    """Правило колонки, воспроизводящее распределение из pg_stats; None - статистики не хватает.
+
+    Уникальные колонки получают только диапазон или шаблон (частые значения
+    и гистограмма для них не имеют смысла), расширенные так, чтобы различных
+    значений хватило на rows строк; у колонок с NULL доля NULL переносится
+    в null_probability правила.
+    """
+    data_type = column['data_type'].lower()
+    if data_type in INT_TYPES:
+        rule = _infer_number(column, stats, True, unique, rows)
+    elif data_type in DECIMAL_TYPES:
+        rule = _infer_number(column, stats, False, unique, rows)
+    elif data_type == 'boolean':
+        freqs = dict(zip(stats['common_values'], stats['common_freqs']))
+        total = freqs.get('t', 0.0) + freqs.get('f', 0.0)
+        rule = {'type': 'boolean', 'true_probability': round(freqs.get('t', 0.0) / total, 6)} if total else None
+    elif data_type == 'date':
+        rule = _infer_datetime(stats, True, unique, rows)
+    elif data_type.startswith('timestamp'):
+        rule = _infer_datetime(stats, False, unique, rows)
+    elif data_type in TEXT_TYPES:
+        rule = _infer_text(column, stats, unique, rows)
+    else:
+        rule = None
+
+    if rule is not None and column['nullable']:
+        rule['null_probability'] = round(stats['null_frac'], 6)
+    return rule
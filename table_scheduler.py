@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+
+from schema_catalog import SchemaCatalog
+
+
+class DeferredForeignKey:
+    """Внешний ключ, колонки которого заполняются после загрузки обеих таблиц"""
+
+    def __init__(self, table_name: str, constraint_name: str, columns: List[str],
+                 foreign_table_name: str, foreign_columns: List[str]):
+        self.table_name = table_name
+        self.constraint_name = constraint_name
+        self.columns = columns
+        self.foreign_table_name = foreign_table_name
+        self.foreign_columns = foreign_columns
+
+    def __repr__(self) -> str:
+        return (f"{self.table_name}({', '.join(self.columns)}) -> "
+                f"{self.foreign_table_name}({', '.join(self.foreign_columns)})")
+
+
+class TableSchedule:
+    """Порядок обработки таблиц по графу внешних ключей.
+
+    levels - топологические уровни: таблицы одного уровня зависят только
+    от таблиц предыдущих уровней и могут обрабатываться одновременно.
+    deferred - внешние ключи, разорванные ради самоссылок и циклов.
+    unresolved - циклы (самоссылка - цикл из одной таблицы), которые не
+    удалось разорвать через nullable колонки.
+    """
+
+    def __init__(self, levels: List[List[str]], deferred: List[DeferredForeignKey],
+                 unresolved: List[List[str]]):
+        self.levels = levels
+        self.deferred = deferred
+        self.unresolved = unresolved
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'levels': self.levels,
+            'deferred': [vars(fk) for fk in self.deferred],
+            'unresolved': self.unresolved
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TableSchedule':
+        return cls(data['levels'], [DeferredForeignKey(**fk) for fk in data['deferred']], data['unresolved'])
+
+    def deferred_columns(self, table_name: str) -> List[str]:
+        """Колонки таблицы, которые вставляются пустыми и заполняются позже"""
+        return [column for fk in self.deferred if fk.table_name == table_name for column in fk.columns]
+
+    def display(self):
+        print("🗺️  Порядок обработки таблиц по внешним ключам:")
+        for level, tables in enumerate(self.levels, 1):
+            print(f"   Уровень {level}: {', '.join(tables)}")
+        for fk in self.deferred:
+            print(f"   ⏳ Отложенный внешний ключ {fk.constraint_name}: {fk}")
+        for cycle in self.unresolved:
+            kind = "Самоссылка" if len(cycle) == 1 else "Цикл"
+            print(f"   ⚠️  {kind} без nullable колонок: {' -> '.join(cycle)}; "
+                  f"значения внешних ключей берутся только из уже существующих строк")
+
+
+def _group_foreign_keys(catalog: SchemaCatalog, table_name: str) -> List[Dict[str, Any]]:
+    """Внешние ключи таблицы, сгруппированные по ограничениям (составные ключи - одна запись)"""
+    constraints = {}
+    for fk in catalog.get_foreign_keys(table_name):
+        constraint = constraints.setdefault(fk['constraint_name'], {
+            'constraint_name': fk['constraint_name'],
+            'foreign_table_schema': fk['foreign_table_schema'],
+            'foreign_table_name': fk['foreign_table_name'],
+            'columns': [],
+            'foreign_columns': []
+        })
+        constraint['columns'].append(fk['column_name'])
+        constraint['foreign_columns'].append(fk['foreign_column_name'])
+    return list(constraints.values())
+
+
+def _is_nullable(catalog: SchemaCatalog, table_name: str, columns: List[str]) -> bool:
+    nullable = {column['name']: column['nullable'] for column in catalog.get_columns(table_name)}
+    return all(nullable.get(column, False) for column in columns)
+
+
+def _defer(edge: Dict[str, Any], table_name: str) -> DeferredForeignKey:
+    return DeferredForeignKey(table_name, edge['constraint_name'], edge['columns'],
+                              edge['foreign_table_name'], edge['foreign_columns'])
+
+
+def _find_cycle(parents: Dict[str, Dict[str, List[Dict[str, Any]]]], remaining: set) -> List[str]:
+    """Находит цикл среди таблиц, которые не удалось упорядочить.
+
+    У каждой такой таблицы есть родитель среди оставшихся, поэтому обход
+    от любой из них по родителям обязательно возвращается в уже пройденную.
+    """
+    path = [min(remaining)]
+    seen = {path[0]: 0}
+    while True:
+        parent = min(name for name in parents[path[-1]] if name in remaining)
+        if parent in seen:
+            return path[seen[parent]:]
+        seen[parent] = len(path)
+        path.append(parent)
+
+
+def build_schedule(catalog: SchemaCatalog, table_names: List[str]) -> TableSchedule:
+    """Строит топологические уровни таблиц по внешним ключам из снимка схемы.
+
+    Учитываются только ссылки между обрабатываемыми таблицами: остальные
+    родительские таблицы считаются уже заполненными. Nullable самоссылки и
+    одно nullable ребро каждого цикла откладываются; самоссылка с NOT NULL
+    колонками и цикл без nullable внешнего ключа разрываются без
+    откладывания и попадают в unresolved.
+    """
+    selected = set(table_names)
+    # parents[child][parent] - внешние ключи child, ссылающиеся на parent
+    parents = {name: {} for name in table_names}
+    deferred = []
+    unresolved = []
+
+    for table_name in table_names:
+        for edge in _group_foreign_keys(catalog, table_name):
+            parent = edge['foreign_table_name']
+            if edge['foreign_table_schema'] != catalog.schema or parent not in selected:
+                continue
+            if parent == table_name:
+                if _is_nullable(catalog, table_name, edge['columns']):
+                    deferred.append(_defer(edge, table_name))
+                elif [table_name] not in unresolved:
+                    unresolved.append([table_name])
+                continue
+            parents[table_name].setdefault(parent, []).append(edge)
+
+    levels = []
+    remaining = set(table_names)
+    while remaining:
+        level = [name for name in table_names
+                 if name in remaining and not any(parent in remaining for parent in parents[name])]
+        if level:
+            levels.append(level)
+            remaining.difference_update(level)
+            continue
+
+        # Все оставшиеся таблицы ждут друг друга: разрываем одно ребро цикла
+        cycle = _find_cycle(parents, remaining)
+        pairs = list(zip(cycle, cycle[1:] + cycle[:1]))
+        nullable = [(child, parent) for child, parent in pairs
+                    if all(_is_nullable(catalog, child, edge['columns']) for edge in parents[child][parent])]
+        child, parent = nullable[0] if nullable else pairs[0]
+        if nullable:
+            deferred.extend(_defer(edge, child) for edge in parents[child][parent])
+        else:
+            unresolved.append(list(reversed(cycle)))
+        del parents[child][parent]
+
+    return TableSchedule(levels, deferred, unresolved)
+
+
+def run_schedule(schedule: TableSchedule, process_table: Callable[[str], bool],
+                 parallelism: int) -> Dict[str, bool]:
+    """Обрабатывает уровни по очереди, а таблицы одного уровня - параллельно.
+
+    Возвращает результат process_table для каждой таблицы; исключение
+    при обработке одной таблицы считается ее ошибкой и не прерывает
+    остальные.
+    """
+    def process_isolated(table_name: str) -> bool:
+        try:
+            return process_table(table_name)
+        except Exception as e:
+            print(f"❌ Ошибка при обработке таблицы '{table_name}': {e}")
+            return False
+
+    results = {}
+    for level in schedule.levels:
+        if parallelism <= 1 or len(level) == 1:
+            for table_name in level:
+                results[table_name] = process_isolated(table_name)
+            continue
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(level))) as executor:
+            results.update(zip(level, executor.map(process_isolated, level)))
+    return results
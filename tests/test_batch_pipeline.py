@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from batch_pipeline import BatchPipeline, run_batches
+
+TIMEOUT = 5
+
+
+def make_batches(count, produced):
+    for number in range(count):
+        produced.append(number)
+        yield [(number,)]
+
+
+def start_run(pipeline, batches):
+    """Запускает run в отдельном потоке; результат или исключение - в outcome"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['batches'] = pipeline.run(batches)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "условие не выполнилось"
+        time.sleep(0.01)
+
+
+def test_writes_all_batches_in_order():
+    written = []
+    pipeline = run_batches(make_batches(50, []), written.append, depth=3)
+    assert pipeline.batches == 50
+    assert written == [[(number,)] for number in range(50)]
+
+
+def test_empty_batches_are_skipped():
+    written = []
+    pipeline = run_batches([[(1,)], [], [(2,)]], written.append)
+    assert pipeline.batches == 2 and written == [[(1,)], [(2,)]]
+
+
+def test_sequential_mode():
+    written = []
+    pipeline = run_batches(make_batches(5, []), written.append, pipelined=False)
+    assert pipeline.batches == 5 and len(written) == 5
+
+
+@pytest.mark.parametrize('depth', [1, 2, 4])
+def test_bounded_queue_blocks_producer(depth):
+    gate = threading.Event()
+    produced = []
+    pipeline = BatchPipeline(lambda rows: gate.wait(TIMEOUT), depth)
+    thread, outcome = start_run(pipeline, make_batches(100, produced))
+    # Одна пачка пишется, depth ждут в очереди, еще одна ждет места в put
+    wait_until(lambda: len(produced) == depth + 2)
+    time.sleep(0.1)
+    assert len(produced) == depth + 2
+    gate.set()
+    thread.join(TIMEOUT)
+    assert outcome == {'batches': 100}
+    assert pipeline.producer_wait_seconds > 0
+
+
+def test_writer_error_stops_producer():
+    produced = []
+
+    def write(rows):
+        if rows[0][0] == 3:
+            raise RuntimeError('disk full')
+
+    with pytest.raises(RuntimeError, match='disk full'):
+        BatchPipeline(write, depth=2).run(make_batches(1000, produced))
+    assert len(produced) < 1000
+
+
+def test_producer_error_stops_writer():
+    written = []
+
+    def batches():
+        yield [(1,)]
+        raise ValueError('bad rule')
+
+    pipeline = BatchPipeline(written.append)
+    with pytest.raises(ValueError, match='bad rule'):
+        pipeline.run(batches())
+    assert len(written) <= 1
+
+
+def test_cancel_releases_blocked_producer():
+    gate = threading.Event()
+    produced = []
+    written = []
+
+    def write(rows):
+        gate.wait(TIMEOUT)
+        written.append(rows)
+
+    pipeline = BatchPipeline(write, depth=1)
+    thread, outcome = start_run(pipeline, make_batches(1000, produced))
+    wait_until(lambda: len(produced) == 3)
+    pipeline.cancel()
+    gate.set()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive()
+    assert outcome == {'batches': len(written)}
+    # После отмены пачки из очереди отбрасываются; генератор успевает выдать не больше одной пачки
+    assert len(written) <= 1 and len(produced) <= 4
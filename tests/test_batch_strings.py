@@ -0,0 +1,102 @@
+import random
+import re
+from collections import Counter
+
+import pytest
+
+from batch_strings import UniformBytes, compile_batch_email, compile_batch_rule
+from generation_plan import compile_rule
+from rule_primitives import DEFAULT_EMAIL_DOMAINS, EMAIL_NAME_LENGTH, EMAIL_NUMBER_RANGE
+
+
+class CyclingBytes:
+    """Генератор, который выдает байты 0, 1, ..., 255 по кругу"""
+
+    def __init__(self):
+        self.next_byte = 0
+
+    def getrandbits(self, bits):
+        count = bits // 8
+        data = bytes((self.next_byte + offset) % 256 for offset in range(count))
+        self.next_byte = (self.next_byte + count) % 256
+        return int.from_bytes(data, 'little')
+
+
+def shape(value):
+    """Класс каждого символа: '#' цифра, 'A' заглавная, 'a' строчная, иначе сам символ"""
+    return ''.join('#' if char.isdigit() else 'A' if char.isupper() else 'a' if char.islower() else char
+                   for char in value)
+
+
+@pytest.mark.parametrize('pattern', ['#####', 'AA-####', 'ID{a#A}', 'aaaa', '+7 (###) ###-##-##', '-'])
+def test_batch_pattern_matches_scalar_shape(pattern):
+    rules = {'type': 'pattern', 'pattern': pattern}
+    batch = compile_batch_rule(rules, random.Random(1))(500)
+    generate = compile_rule(rules, random.Random(1))
+    scalar = [generate() for _ in range(500)]
+    assert len(batch) == 500
+    assert {shape(value) for value in batch} == {shape(value) for value in scalar} == {shape(pattern)}
+
+
+def test_batch_pattern_uses_every_slot_value():
+    values = compile_batch_rule({'type': 'pattern', 'pattern': '#A'}, random.Random(2))(5000)
+    assert {value[0] for value in values} == set('0123456789')
+    assert len({value[1] for value in values}) == 26
+
+
+def test_batch_email_matches_scalar_structure():
+    first_number, last_number = EMAIL_NUMBER_RANGE
+    min_length, max_length = EMAIL_NAME_LENGTH
+    email = re.compile(r'([a-z]+?)(\d+)@(.+)')
+    batch = compile_batch_email(['example.com', 'mail.test'], random.Random(3))(3000)
+    generate = compile_rule({'type': 'email', 'domains': ['example.com', 'mail.test']}, random.Random(3))
+    scalar = [generate() for _ in range(3000)]
+    for values in (batch, scalar):
+        parts = [email.fullmatch(value).groups() for value in values]
+        lengths = {len(name) for name, _, _ in parts}
+        assert lengths == set(range(min_length, max_length + 1))
+        assert all(first_number <= int(number) <= last_number for _, number, _ in parts)
+        assert {domain for _, _, domain in parts} == {'example.com', 'mail.test'}
+
+
+def test_batch_rule_types():
+    assert compile_batch_rule({'type': 'int'}, random.Random()) is None
+    assert compile_batch_rule({'type': 'pattern', 'common_values': {'x': 0.5}}, random.Random()) is None
+    email = compile_batch_rule({'type': 'email'}, random.Random(4))(10)
+    assert all(value.split('@')[1] in DEFAULT_EMAIL_DOMAINS for value in email)
+    with pytest.raises(ValueError):
+        compile_batch_rule({'type': 'email', 'domains': []}, random.Random())
+
+
+@pytest.mark.parametrize('size', [1, 3, 10, 26, 62, 255, 256])
+def test_uniform_bytes_has_no_modulo_bias(size):
+    """Каждый полный круг из 256 байт дает каждое значение одинаковое число раз"""
+    sampler = UniformBytes(bytes(range(size)))
+    limit = 256 - 256 % size
+    values = sampler.draw(CyclingBytes(), limit * 40)
+    counts = Counter(values)
+    assert set(counts) == set(range(size))
+    assert max(counts.values()) - min(counts.values()) <= 1
+
+
+@pytest.mark.parametrize('count', [0, 1, 17, 1000, 65536])
+def test_uniform_bytes_returns_exactly_count(count):
+    values = UniformBytes(b'abcdefghij').draw(random.Random(count), count)
+    assert len(values) == count
+    assert set(values) <= set(b'abcdefghij')
+
+
+def test_uniform_bytes_is_uniform_with_random_source():
+    draws = 100000
+    counts = Counter(UniformBytes(bytes(range(10))).draw(random.Random(5), draws))
+    expected = draws / 10
+    chi_square = sum((counts[value] - expected) ** 2 / expected for value in range(10))
+    # 9 степеней свободы: критическое значение для p = 0.001 - 27.9
+    assert chi_square < 27.9
+
+
+def test_uniform_bytes_rejects_large_alphabets():
+    with pytest.raises(ValueError):
+        UniformBytes(b'')
+    with pytest.raises(ValueError):
+        UniformBytes(bytes(257))
@@ -0,0 +1,69 @@
+import pytest
+
+from database_config import DatabaseConfig
+from generation_plan import compile_table_plan
+from postgres_utils import PostgresUtils
+
+COLUMNS = [{'name': name, 'data_type': data_type, 'max_length': None, 'nullable': False,
+            'default': None, 'identity': None, 'is_generated': 'NEVER'}
+           for name, data_type in [('id', 'integer'), ('status', 'text')]]
+
+TABLE_CONFIG = {
+    'table_name': 'orders',
+    'unique_columns': ['id'],
+    'column_rules': {
+        'id': {'type': 'int', 'min_value': 1, 'max_value': 100000},
+        'status': {'type': 'enum', 'values': ['new', 'paid']}
+    }
+}
+
+
+def make_utils(global_batch_size=100, table_batch_size=None):
+    table_config = dict(TABLE_CONFIG, **({'batch_size': table_batch_size} if table_batch_size else {}))
+    config = {'global_settings': {'batch_size': global_batch_size, 'log_level': 'ERROR'}, 'tables': [table_config]}
+    return PostgresUtils(DatabaseConfig(), config)
+
+
+def make_plan(pg_utils, seed=None):
+    return compile_table_plan('orders', COLUMNS, pg_utils.get_table_config('orders'),
+                              pg_utils.generation_config['global_settings'], seed=seed)
+
+
+@pytest.mark.parametrize('num_rows, expected', [
+    (0, []), (1, [1]), (99, [99]), (100, [100]), (101, [100, 1]), (250, [100, 100, 50])
+])
+def test_batches_follow_batch_size(num_rows, expected):
+    pg_utils = make_utils()
+    batches = list(pg_utils.generate_row_batches(make_plan(pg_utils), num_rows, pg_utils.get_batch_size('orders')))
+    assert [len(batch) for batch in batches] == expected
+    assert pg_utils.metrics.table_report('orders')['rows'] == num_rows
+
+
+def test_table_batch_size_overrides_global():
+    assert make_utils(100).get_batch_size('orders') == 100
+    assert make_utils(100, 7).get_batch_size('orders') == 7
+    assert make_utils(0).get_batch_size('orders') == 1
+
+
+def test_seeded_batches_continue_row_numbering():
+    pg_utils = make_utils()
+    batches = pg_utils.generate_row_batches(make_plan(pg_utils, seed=3), 250, 100)
+    rows = [row for batch in batches for row in batch]
+    assert rows == make_plan(pg_utils, seed=3).generate_rows(250, 0)
+
+
+def test_insert_plan_rows_streams_batches_and_registers_keys():
+    pg_utils = make_utils(table_batch_size=40)
+    loaded = []
+
+    def load_row_batches(table_name, columns, batches, *args):
+        for batch in batches:
+            loaded.append(len(batch))
+        return True
+
+    pg_utils.load_row_batches = load_row_batches
+    pg_utils.key_registry.set_existing('orders', 'id', [])
+    assert pg_utils.insert_plan_rows('orders', make_plan(pg_utils), 130, ['id'])
+    assert loaded == [40, 40, 40, 10]
+    keys = pg_utils.key_registry.get_values('orders', 'id')
+    assert len(keys) == len(set(keys)) == 130
@@ -0,0 +1,222 @@
+import json
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2 import sql
+
+from bulk_load import BulkLoad, create_bulk_load, get_session_settings
+
+CONSTRAINTS = [
+    ('public', 'orders', 'orders_user_id_fkey', 'f', 'FOREIGN KEY (user_id) REFERENCES public.users(id)', True),
+    ('public', 'users', 'users_email_key', 'u', 'UNIQUE (email)', True),
+]
+INDEXES = [
+    ('public', 'orders', 'orders_created_idx', 'CREATE INDEX orders_created_idx ON public.orders USING btree (created_at)'),
+]
+
+
+class FakeDatabase:
+    """pg_utils без сервера: запоминает выполненные команды и отвечает на запросы BulkLoad"""
+
+    def __init__(self, tables_with_rows=(), failing=()):
+        self.config = SimpleNamespace(schema='public', pool_max_size=4)
+        self.generation_config = {'global_settings': {}}
+        self.tables_with_rows = set(tables_with_rows)
+        self.failing = list(failing)
+        self.statements = []
+        self.dropped = set()
+        # Файл состояния в момент первого DROP
+        self.state_on_drop = None
+        self.state_path = None
+
+    def is_offline(self):
+        return False
+
+    def has_rows(self, table_name):
+        return table_name in self.tables_with_rows
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.result = []
+
+    def execute(self, statement, params=None):
+        database = self.database
+        if statement is BulkLoad.CONSTRAINTS_QUERY:
+            self.result = CONSTRAINTS
+            return
+        if statement is BulkLoad.INDEXES_QUERY:
+            self.result = INDEXES
+            return
+        text = statement if isinstance(statement, str) else statement.as_string(self)
+        if 'to_regclass' in text or 'SELECT EXISTS' in text:
+            name = params[0].split('.')[-1].strip('"') if 'to_regclass' in text else params[2]
+            self.result = [(name not in database.dropped,)]
+            return
+        if any(pattern in text for pattern in database.failing):
+            raise psycopg2.Error(f"could not run: {text}")
+        database.statements.append(text)
+        if text.startswith(('DROP INDEX', 'ALTER TABLE')) and ' DROP CONSTRAINT ' in text or text.startswith('DROP'):
+            if database.state_on_drop is None:
+                with open(database.state_path, encoding='utf-8') as f:
+                    database.state_on_drop = json.load(f)
+            database.dropped.add(text.rsplit('.', 1)[-1].rsplit(' ', 1)[-1].strip('"'))
+        elif ' ADD CONSTRAINT ' in text or text.startswith('CREATE INDEX'):
+            name = text.split(' ADD CONSTRAINT ')[1].split(' ')[0] if ' ADD CONSTRAINT ' in text else text.split()[2]
+            database.dropped.discard(name.strip('"'))
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+@pytest.fixture(autouse=True)
+def quote_without_server(monkeypatch):
+    """sql.Identifier без соединения: кавычки как у PostgreSQL"""
+    monkeypatch.setattr(sql.ext, 'quote_ident', lambda name, context: '"' + name.replace('"', '""') + '"')
+
+
+def make_bulk_load(tmp_path, database, table_names=('users', 'orders'), **kwargs):
+    state_path = str(tmp_path / 'bulk_load_state.json')
+    database.state_path = state_path
+    return BulkLoad(database, list(table_names), state_path, **kwargs)
+
+
+def read_state(bulk_load):
+    with open(bulk_load.state_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_prepare_saves_ddl_before_dropping(tmp_path):
+    database = FakeDatabase()
+    bulk_load = make_bulk_load(tmp_path, database)
+    assert bulk_load.prepare()
+    assert [item['name'] for item in database.state_on_drop['objects']] == \
+        ['orders_user_id_fkey', 'users_email_key', 'orders_created_idx']
+    assert database.statements == [
+        'ALTER TABLE "public"."orders" DROP CONSTRAINT IF EXISTS "orders_user_id_fkey"',
+        'ALTER TABLE "public"."users" DROP CONSTRAINT IF EXISTS "users_email_key"',
+        'DROP INDEX IF EXISTS "public"."orders_created_idx"',
+    ]
+    assert read_state(bulk_load)['objects'] == database.state_on_drop['objects']
+    assert not os.path.exists(bulk_load.state_path + '.tmp')
+
+
+def test_finish_recreates_objects_and_removes_state(tmp_path):
+    database = FakeDatabase()
+    bulk_load = make_bulk_load(tmp_path, database)
+    bulk_load.prepare()
+    database.statements.clear()
+    assert bulk_load.finish()
+    assert not os.path.exists(bulk_load.state_path)
+    # Индексы и ограничения строятся параллельно, внешние ключи после них
+    assert sorted(database.statements[:2]) == sorted([
+        'ALTER TABLE "public"."users" ADD CONSTRAINT "users_email_key" UNIQUE (email)', INDEXES[0][3]])
+    assert database.statements[2:4] == [
+        'ALTER TABLE "public"."orders" ADD CONSTRAINT "orders_user_id_fkey" '
+        'FOREIGN KEY (user_id) REFERENCES public.users(id) NOT VALID',
+        'ALTER TABLE "public"."orders" VALIDATE CONSTRAINT "orders_user_id_fkey"',
+    ]
+    assert sorted(database.statements[4:]) == ['ANALYZE "public"."orders"', 'ANALYZE "public"."users"']
+
+
+def test_failed_restore_keeps_only_failed_objects(tmp_path, capsys):
+    database = FakeDatabase(failing=['UNIQUE (email)'])
+    bulk_load = make_bulk_load(tmp_path, database)
+    bulk_load.prepare()
+    assert not bulk_load.restore()
+    assert [item['name'] for item in read_state(bulk_load)['objects']] == ['users_email_key']
+    output = capsys.readouterr().out
+    assert 'ALTER TABLE "public"."users" ADD CONSTRAINT "users_email_key" UNIQUE (email);' in output
+
+
+def test_interrupted_run_is_restored_first(tmp_path):
+    database = FakeDatabase()
+    make_bulk_load(tmp_path, database).prepare()
+    # Запуск прервался после снятия объектов; новый запуск сначала восстанавливает их
+    database.statements.clear()
+    database.state_on_drop = None
+    rerun = make_bulk_load(tmp_path, database)
+    assert rerun.prepare()
+    created = [text for text in database.statements if ' ADD CONSTRAINT ' in text or text.startswith('CREATE')]
+    assert len(created) == 3
+    assert [item['name'] for item in read_state(rerun)['objects']] == \
+        ['orders_user_id_fkey', 'users_email_key', 'orders_created_idx']
+
+
+def test_failed_restore_of_interrupted_run_stops_prepare(tmp_path):
+    database = FakeDatabase()
+    make_bulk_load(tmp_path, database).prepare()
+    database.failing = ['CREATE INDEX']
+    database.statements.clear()
+    rerun = make_bulk_load(tmp_path, database)
+    assert not rerun.prepare()
+    assert not any(text.startswith(('DROP', 'ALTER TABLE "public"."orders" DROP')) for text in database.statements)
+
+
+def test_tables_with_rows_keep_their_indexes(tmp_path, capsys):
+    database = FakeDatabase(tables_with_rows=['users', 'orders'])
+    bulk_load = make_bulk_load(tmp_path, database)
+    assert bulk_load.prepare()
+    assert database.statements == [] and not os.path.exists(bulk_load.state_path)
+    assert 'уже есть строки' in capsys.readouterr().out
+
+
+def test_unlogged_tables_are_recorded_and_restored(tmp_path):
+    database = FakeDatabase()
+    bulk_load = make_bulk_load(tmp_path, database, unlogged=True)
+    bulk_load.prepare()
+    assert read_state(bulk_load)['unlogged'] == ['users', 'orders']
+    assert 'ALTER TABLE "public"."users" SET UNLOGGED' in database.statements
+    assert bulk_load.restore()
+    assert 'ALTER TABLE "public"."orders" SET LOGGED' in database.statements
+    assert not os.path.exists(bulk_load.state_path)
+
+
+def test_abandon_moves_state_file_and_prints_ddl(tmp_path, capsys):
+    database = FakeDatabase()
+    bulk_load = make_bulk_load(tmp_path, database, unlogged=True)
+    bulk_load.prepare()
+    capsys.readouterr()
+    abandoned = make_bulk_load(tmp_path, database, table_names=())
+    assert abandoned.abandon()
+    assert not os.path.exists(bulk_load.state_path)
+    assert os.path.exists(bulk_load.state_path + '.abandoned')
+    output = capsys.readouterr().out
+    assert 'ALTER TABLE "public"."users" SET LOGGED;' in output
+    assert 'ALTER TABLE "public"."users" ADD CONSTRAINT "users_email_key" UNIQUE (email);' in output
+    assert f"{INDEXES[0][3]};" in output
+    assert 'VALIDATE CONSTRAINT orders_user_id_fkey' in output
+    assert not make_bulk_load(tmp_path, database).abandon()
+
+
+def test_ddl_text_quotes_names():
+    item = {'kind': 'constraint', 'schema': 'my schema', 'table_name': 'a"b', 'name': 'uq', 'definition': 'UNIQUE (x)'}
+    assert BulkLoad._ddl_text(item) == 'ALTER TABLE "my schema"."a""b" ADD CONSTRAINT "uq" UNIQUE (x)'
+    assert BulkLoad._ddl_text({'kind': 'index', 'definition': 'CREATE INDEX i ON t (x)'}) == 'CREATE INDEX i ON t (x)'
+
+
+def test_create_bulk_load_settings(tmp_path):
+    database = FakeDatabase()
+    database.generation_config = {'global_settings': {'bulk_load_state': str(tmp_path / 'state.json')}}
+    assert create_bulk_load(database, ['users']) is None
+    database.generation_config['global_settings'].update(bulk_load=True, bulk_load_connections=16)
+    bulk_load = create_bulk_load(database, ['users'])
+    assert bulk_load.table_names == ['users'] and bulk_load.connections == 4
+    assert get_session_settings({'bulk_load': True, 'bulk_load_settings': {'work_mem': '64MB'}}) == \
+        {'synchronous_commit': 'off', 'maintenance_work_mem': '1GB', 'work_mem': '64MB'}
+    assert get_session_settings({}) == {}
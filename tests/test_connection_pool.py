@@ -0,0 +1,137 @@
+import threading
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from connection_pool import ManagedConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query):
+        self.conn.pings += 1
+        if self.conn.fail_ping:
+            raise psycopg2.OperationalError('server closed the connection')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        self.pings = 0
+        self.fail_ping = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    """Подменяет psycopg2.connect; failing = True имитирует недоступный сервер"""
+    state = SimpleNamespace(failing=False, opened=[])
+
+    def fake_connect(*args, **kwargs):
+        if state.failing:
+            raise psycopg2.OperationalError('connection refused')
+        conn = FakeConnection()
+        state.opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(psycopg2, 'connect', fake_connect)
+    return state
+
+
+def test_connections_are_reused(connect):
+    pool = ManagedConnectionPool(1, 3, ping_interval=60)
+    for _ in range(10):
+        pool.putconn(pool.getconn())
+    assert pool.connections_opened == 1
+
+    held = [pool.getconn() for _ in range(3)]
+    for conn in held:
+        pool.putconn(conn)
+    # Возвращенные соединения сверх minconn не закрываются
+    assert not any(conn.closed for conn in held)
+    held = [pool.getconn() for _ in range(3)]
+    assert pool.connections_opened == 3
+
+
+def test_checkout_waits_for_free_connection(connect):
+    pool = ManagedConnectionPool(1, 2, ping_interval=60)
+    held = [pool.getconn(), pool.getconn()]
+    got = []
+    thread = threading.Thread(target=lambda: got.append(pool.getconn()), daemon=True)
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive() and not got
+    pool.putconn(held[0])
+    thread.join(5)
+    assert got == [held[0]]
+
+
+def test_broken_connections_are_replaced(connect):
+    pool = ManagedConnectionPool(1, 2, ping_interval=60)
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_UNKNOWN
+    pool.putconn(conn)
+    assert conn.closed
+
+    conn = pool.getconn()
+    pool.putconn(conn)
+    # Соединение оборвалось, пока лежало в пуле
+    conn.closed = 2
+    replacement = pool.getconn()
+    assert replacement is not conn and not replacement.closed
+
+
+def test_idle_connections_are_pinged(connect):
+    pool = ManagedConnectionPool(1, 1, ping_interval=0)
+    conn = pool.getconn()
+    assert conn.pings == 0
+    pool.putconn(conn)
+    assert pool.getconn() is conn and conn.pings == 1
+    pool.putconn(conn)
+    conn.fail_ping = True
+    replacement = pool.getconn()
+    assert replacement is not conn and conn.closed
+
+
+def test_recently_used_connections_are_not_pinged(connect):
+    pool = ManagedConnectionPool(1, 1, ping_interval=60)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    pool.getconn()
+    assert conn.pings == 0
+
+
+def test_failed_checkout_releases_slot(connect):
+    pool = ManagedConnectionPool(1, 1, ping_interval=60)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.closed = 2
+    connect.failing = True
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    connect.failing = False
+    # Место в семафоре освобождено: следующая выдача не ждет
+    result = []
+    thread = threading.Thread(target=lambda: result.append(pool.getconn()), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert result and not result[0].closed
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from copy_binary import BinaryCopyEncoder, BinaryCopyStream, unsupported_types
+from database_config import DatabaseConfig
+from postgres_utils import PostgresUtils
+from schema_catalog import SchemaCatalog
+
+HEADER = b'PGCOPY\n\xff\r\n\x00' + b'\x00' * 8
+TRAILER = b'\xff\xff'
+
+
+def encode_field(data_type, value):
+    """Байты одного поля: без заголовка строки (число полей, 2 байта)"""
+    return bytes(BinaryCopyEncoder([data_type]).encode_rows([[value]]))[2:]
+
+
+def test_header_trailer_and_field_count():
+    data = bytes(BinaryCopyEncoder(['integer', 'text']).encode_rows([[1, 'a']], header=True, trailer=True))
+    assert data == (HEADER + b'\x00\x02' + b'\x00\x00\x00\x04\x00\x00\x00\x01'
+                    + b'\x00\x00\x00\x01a' + TRAILER)
+
+
+def test_stream_reads_whole_copy_data():
+    stream = BinaryCopyStream(BinaryCopyEncoder(['integer']), [[1], [2]])
+    data = stream.read(5) + stream.read()
+    assert data.startswith(HEADER) and data.endswith(TRAILER)
+    assert stream.read() == b''
+    assert stream.rows_written == 2
+
+
+def test_null_is_minus_one_length():
+    assert encode_field('integer', None) == b'\xff\xff\xff\xff'
+    assert encode_field('text', None) == b'\xff\xff\xff\xff'
+
+
+@pytest.mark.parametrize('data_type, value, expected', [
+    ('smallint', 5, b'\x00\x00\x00\x02\x00\x05'),
+    ('smallint', -2, b'\x00\x00\x00\x02\xff\xfe'),
+    ('integer', -1, b'\x00\x00\x00\x04\xff\xff\xff\xff'),
+    ('integer', 258, b'\x00\x00\x00\x04\x00\x00\x01\x02'),
+    ('bigint', 2 ** 40, b'\x00\x00\x00\x08\x00\x00\x01\x00\x00\x00\x00\x00'),
+    ('double precision', 1.5, b'\x00\x00\x00\x08\x3f\xf8\x00\x00\x00\x00\x00\x00'),
+    ('real', 1.5, b'\x00\x00\x00\x04\x3f\xc0\x00\x00'),
+    ('boolean', True, b'\x00\x00\x00\x01\x01'),
+    ('boolean', False, b'\x00\x00\x00\x01\x00'),
+    ('boolean', 'yes', b'\x00\x00\x00\x01\x01'),
+    ('boolean', 'false', b'\x00\x00\x00\x01\x00'),
+    ('text', 'ё', b'\x00\x00\x00\x02\xd1\x91'),
+])
+def test_scalar_fields(data_type, value, expected):
+    assert encode_field(data_type, value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    # длина, ndigits, weight, sign, dscale, цифры по основанию 10000
+    (Decimal('0'), b'\x00\x00\x00\x08' + b'\x00\x00\x00\x00\x00\x00\x00\x00'),
+    (Decimal('0.00'), b'\x00\x00\x00\x08' + b'\x00\x00\x00\x00\x00\x00\x00\x02'),
+    (Decimal('10000.01'), b'\x00\x00\x00\x0e' + b'\x00\x03\x00\x01\x00\x00\x00\x02' + b'\x00\x01\x00\x00\x00\x64'),
+    (Decimal('-1.5'), b'\x00\x00\x00\x0c' + b'\x00\x02\x00\x00\x40\x00\x00\x01' + b'\x00\x01\x13\x88'),
+    (Decimal('12300'), b'\x00\x00\x00\x0c' + b'\x00\x02\x00\x01\x00\x00\x00\x00' + b'\x00\x01\x08\xfc'),
+    (Decimal('1.23E+4'), b'\x00\x00\x00\x0c' + b'\x00\x02\x00\x01\x00\x00\x00\x00' + b'\x00\x01\x08\xfc'),
+    (Decimal('20000'), b'\x00\x00\x00\x0a' + b'\x00\x01\x00\x01\x00\x00\x00\x00' + b'\x00\x02'),
+    (Decimal('0.0001'), b'\x00\x00\x00\x0a' + b'\x00\x01\xff\xff\x00\x00\x00\x04' + b'\x00\x01'),
+    ('-123.45', b'\x00\x00\x00\x0c' + b'\x00\x02\x00\x00\x40\x00\x00\x02' + b'\x00\x7b\x11\x94'),
+    (Decimal('NaN'), b'\x00\x00\x00\x08' + b'\x00\x00\x00\x00\xc0\x00\x00\x00'),
+])
+def test_numeric_base_10000(value, expected):
+    assert encode_field('numeric', value) == expected
+
+
+@pytest.mark.parametrize('data_type, value, expected', [
+    ('date', date(2000, 1, 1), b'\x00\x00\x00\x04\x00\x00\x00\x00'),
+    ('date', date(2000, 1, 2), b'\x00\x00\x00\x04\x00\x00\x00\x01'),
+    ('date', date(1999, 12, 31), b'\x00\x00\x00\x04\xff\xff\xff\xff'),
+    ('date', '2000-02-01', b'\x00\x00\x00\x04\x00\x00\x00\x1f'),
+    ('timestamp without time zone', datetime(2000, 1, 1, 0, 0, 1, 500000),
+     b'\x00\x00\x00\x08\x00\x00\x00\x00\x00\x16\xe3\x60'),
+    ('timestamp without time zone', datetime(1999, 12, 31, 23, 59, 59),
+     b'\x00\x00\x00\x08\xff\xff\xff\xff\xff\xf0\xbd\xc0'),
+    ('timestamp without time zone', date(2000, 1, 2),
+     b'\x00\x00\x00\x08\x00\x00\x00\x14\x1d\xd7\x60\x00'),
+])
+def test_dates_count_from_2000_epoch(data_type, value, expected):
+    assert encode_field(data_type, value) == expected
+
+
+def test_bad_value_names_column():
+    encoder = BinaryCopyEncoder(['integer'], ['amount'])
+    with pytest.raises(ValueError, match="'amount'"):
+        encoder.encode_rows([['abc']])
+
+
+def test_unsupported_types():
+    assert unsupported_types(['integer', 'jsonb', 'uuid']) == ['jsonb', 'uuid']
+    with pytest.raises(ValueError):
+        BinaryCopyEncoder(['integer', 'jsonb'])
+
+
+def test_unsupported_types_fall_back_to_text_copy():
+    columns = [{'name': 'id', 'data_type': 'integer'}, {'name': 'payload', 'data_type': 'jsonb'}]
+    table = {'kind': 'r', 'columns': columns, 'primary_key': [], 'unique_constraints': [],
+             'foreign_keys': [], 'partitioning': None, 'partition_of': None}
+    pg_utils = PostgresUtils(DatabaseConfig(), {})
+    pg_utils._catalog = SchemaCatalog('public', {'events': table})
+    assert pg_utils.get_binary_encoder('events', ['id']) is not None
+    assert pg_utils.get_binary_encoder('events', ['id', 'payload']) is None
+
+    calls = []
+    pg_utils._insert_rows_with_copy = lambda *args: calls.append(args) or 1
+    assert pg_utils._insert_rows_with_copy_binary(None, 'events', ['id', 'payload'], [[1, '{}']]) == 1
+    assert len(calls) == 1
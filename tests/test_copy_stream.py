@@ -0,0 +1,68 @@
+import pytest
+
+from copy_stream import CopyTextStream, format_copy_row, format_copy_value, format_csv_row, format_csv_value
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, '\\N'),
+    ('\\N', '\\\\N'),
+    ('a\tb', 'a\\tb'),
+    ('a\nb', 'a\\nb'),
+    ('a\rb', 'a\\rb'),
+    ('C:\\temp', 'C:\\\\temp'),
+    (True, 't'),
+    (False, 'f'),
+    (0, '0'),
+    ('', ''),
+])
+def test_copy_text_escaping(value, expected):
+    assert format_copy_value(value) == expected
+
+
+def test_copy_text_row():
+    assert format_copy_row([1, None, 'x\ty']) == '1\t\\N\tx\\ty\n'
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, ''),
+    ('', '""'),
+    ('plain', 'plain'),
+    ('a,b', '"a,b"'),
+    ('say "hi"', '"say ""hi"""'),
+    ('a\nb', '"a\nb"'),
+    ('a\rb', '"a\rb"'),
+    ('\\.', '"\\."'),
+    ('\\N', '\\N'),
+    (True, 't'),
+])
+def test_csv_quoting(value, expected):
+    assert format_csv_value(value) == expected
+
+
+def test_csv_row():
+    assert format_csv_row([1, None, 'a,b']) == '1,,"a,b"\n'
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 64, 10000])
+def test_stream_reassembles_across_chunks(size):
+    rows = [[number, f"name\t{number}", None] for number in range(200)]
+    stream = CopyTextStream(rows)
+    chunks = []
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        assert len(chunk) <= size
+        chunks.append(chunk)
+    assert ''.join(chunks) == ''.join(format_copy_row(row) for row in rows)
+    assert stream.rows_written == len(rows)
+
+
+def test_stream_read_all_and_readline():
+    rows = [[1, 'a'], [2, 'b'], [3, 'c']]
+    stream = CopyTextStream(rows)
+    assert stream.read(3) == '1\ta'
+    assert stream.readline() == '\n'
+    assert stream.readline() == '2\tb\n'
+    assert stream.read() == '3\tc\n'
+    assert stream.read() == ''
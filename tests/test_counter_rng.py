@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from counter_rng import CounterArrayRandom, CounterRandom, derive_key
+
+# NumPy нужен только векторному варианту генератора
+np = pytest.importorskip('numpy')
+
+KEY = derive_key(42, 'orders', 'amount')
+
+
+def draw_row(rng, row, draws=5):
+    rng.seek(row)
+    return [rng.random() for _ in range(draws)] + [rng.randint(1, 10 ** 6), rng.choice('abcdef')]
+
+
+def test_seek_matches_sequential_run():
+    sequential = CounterRandom(KEY)
+    expected = [draw_row(sequential, row) for row in range(300)]
+    rng = CounterRandom(KEY)
+    order = list(range(300))
+    random.Random(1).shuffle(order)
+    for row in order:
+        assert draw_row(rng, row) == expected[row]
+
+
+def test_rows_and_keys_give_different_streams():
+    rng = CounterRandom(KEY)
+    assert draw_row(rng, 0) != draw_row(rng, 1)
+    assert draw_row(CounterRandom(KEY + 1), 0) != draw_row(rng, 0)
+
+
+def test_state_round_trip():
+    rng = CounterRandom(KEY)
+    rng.seek(10)
+    rng.random()
+    state = rng.getstate()
+    expected = [rng.random() for _ in range(3)]
+    rng.seek(0)
+    rng.setstate(state)
+    assert [rng.random() for _ in range(3)] == expected
+
+
+def test_getrandbits_widths():
+    rng = CounterRandom(KEY)
+    assert rng.getrandbits(0) == 0
+    assert all(0 <= rng.getrandbits(bits) < 2 ** bits for bits in (1, 63, 64, 65, 200))
+
+
+def test_array_random_matches_scalar_rows():
+    array_rng = CounterArrayRandom(KEY)
+    array_rng.seek(100, 50)
+    draws = [array_rng.random(50) for _ in range(3)]
+    rng = CounterRandom(KEY)
+    for offset in range(50):
+        rng.seek(100 + offset)
+        assert [rng.random() for _ in range(3)] == [draw[offset] for draw in draws]
+
+
+@pytest.mark.parametrize('low, high', [(0, 2), (1, 1001), (-500, 500), (0, 2 ** 40)])
+def test_array_integers_match_scalar_floor(low, high):
+    """integers - floor(random * span), как целые правила int движка python, а не randint"""
+    array_rng = CounterArrayRandom(KEY)
+    array_rng.seek(0, 1000)
+    values = array_rng.integers(low, high, size=1000, dtype=np.int64)
+    rng = CounterRandom(KEY)
+    expected = []
+    for row in range(1000):
+        rng.seek(row)
+        expected.append(low + int(rng.random() * (high - low)))
+    assert values.tolist() == expected
+    assert values.min() >= low and values.max() < high
+
+
+def test_array_integers_differ_from_randint():
+    array_rng = CounterArrayRandom(KEY)
+    array_rng.seek(0, 200)
+    values = array_rng.integers(1, 10 ** 6 + 1, size=200).tolist()
+    rng = CounterRandom(KEY)
+    randints = []
+    for row in range(200):
+        rng.seek(row)
+        randints.append(rng.randint(1, 10 ** 6))
+    assert values != randints
+
+
+def test_array_size_must_match_range():
+    array_rng = CounterArrayRandom(KEY)
+    array_rng.seek(0, 10)
+    with pytest.raises(ValueError):
+        array_rng.random(5)
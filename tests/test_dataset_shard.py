@@ -0,0 +1,92 @@
+import itertools
+from bisect import bisect_right
+
+import pytest
+
+from dataset_shard import DatasetShard, batch_ranges, check_shardable
+from generation_plan import compile_table_plan
+from parallel_generation import split_rows
+
+SEED = 2024
+NUM_ROWS = 1003
+
+TABLE_CONFIG = {
+    'unique_columns': ['id', 'code', 'email'],
+    'column_rules': {
+        'id': {'type': 'int', 'min_value': 1, 'max_value': 100000},
+        'code': {'type': 'pattern', 'pattern': 'AA-####'},
+        'email': {'type': 'email'},
+        'status': {'type': 'enum', 'values': ['new', 'paid', 'sent']}
+    }
+}
+
+COLUMNS = [{'name': name, 'data_type': data_type, 'max_length': None, 'nullable': nullable,
+            'default': None, 'identity': None, 'is_generated': 'NEVER'}
+           for name, data_type, nullable in [('id', 'integer', False), ('code', 'text', False),
+                                             ('email', 'text', False), ('status', 'text', True),
+                                             ('amount', 'numeric', True)]]
+
+
+def compile_plan(partition=None):
+    return compile_table_plan('orders', COLUMNS, TABLE_CONFIG, {'default_null_probability': 0.1},
+                              partition=partition, seed=SEED)
+
+
+def load_shard(shard, batch_size, workers):
+    """Строки среза так, как их грузит insert_data_parallel: процессы режут свои части на пачки"""
+    start, rows = shard.row_range(NUM_ROWS)
+    workers = min(workers, rows)
+    plans = [compile_plan((worker, workers) if workers > 1 else None) for worker in range(workers)]
+    part_ends = list(itertools.accumulate(split_rows(rows, workers), initial=start))[1:]
+    ranges = batch_ranges(start, rows, batch_size, workers)
+    loaded = {}
+    for batch_start, batch_rows in ranges:
+        plan = plans[bisect_right(part_ends, batch_start)]
+        for offset, row in enumerate(plan.generate_rows(batch_rows, batch_start)):
+            loaded[batch_start + offset] = row
+    return ranges, loaded
+
+
+def test_slices_cover_rows_without_gaps():
+    for count in (1, 2, 3, 7, 1003, 1010):
+        slices = DatasetShard(0, count).slices(NUM_ROWS)
+        assert [start for start, _ in slices] == [sum(rows for _, rows in slices[:i]) for i in range(count)]
+        assert sum(rows for _, rows in slices) == NUM_ROWS
+        assert [DatasetShard(index, count).row_range(NUM_ROWS) for index in range(count)] == slices
+
+
+@pytest.mark.parametrize('rows, batch_size, workers', [(0, 10, 1), (95, 10, 1), (95, 10, 3), (5, 10, 4)])
+def test_batch_ranges_tile_the_slice(rows, batch_size, workers):
+    ranges = batch_ranges(100, rows, batch_size, workers)
+    assert [start for start, _ in ranges] == [100 + sum(count for _, count in ranges[:i]) for i in range(len(ranges))]
+    assert sum(count for _, count in ranges) == rows
+    assert all(0 < count <= batch_size for _, count in ranges)
+
+
+@pytest.mark.parametrize('shards, batch_size, workers', [(1, 1000, 1), (3, 100, 1), (4, 64, 3), (7, 50, 2)])
+def test_union_of_shards_equals_single_run(shards, batch_size, workers):
+    expected = compile_plan().generate_rows(NUM_ROWS, 0)
+    loaded = {}
+    for index in range(shards):
+        ranges, rows = load_shard(DatasetShard(index, shards), batch_size, workers)
+        # Диапазоны пачек разных шардов не пересекаются
+        assert not set(rows) & set(loaded)
+        loaded.update(rows)
+    assert sorted(loaded) == list(range(NUM_ROWS))
+    assert [loaded[row] for row in range(NUM_ROWS)] == expected
+    for position in range(3):
+        assert len({row[position] for row in loaded.values()}) == NUM_ROWS
+
+
+def test_shard_index_is_checked():
+    with pytest.raises(ValueError):
+        DatasetShard(3, 3)
+    assert DatasetShard(2, 3).label == '3/3'
+
+
+def test_check_shardable():
+    assert check_shardable('orders', TABLE_CONFIG, ['id', 'code', 'email', 'status'], ['id']) == []
+    table_config = {'unique_columns': ['name'], 'column_rules': {'name': {'type': 'text'}}}
+    errors = check_shardable('users', table_config, ['name'], ['id'])
+    assert len(errors) == 2
+    assert "'users.name'" in errors[0] and "'users.id'" in errors[1]
@@ -0,0 +1,95 @@
+import gzip
+import os
+import struct
+
+import pytest
+
+from copy_binary import BinaryCopyEncoder, COPY_BINARY_HEADER, COPY_BINARY_TRAILER
+from file_sink import FileSink, copy_command, write_load_script, write_rows_to_files
+
+
+def make_rows(count, start=0):
+    return [(number, f"name {number}") for number in range(start, start + count)]
+
+
+def count_binary_rows(data):
+    """Число строк в файле COPY binary из колонок integer и text"""
+    position = len(COPY_BINARY_HEADER)
+    rows = 0
+    while data[position:position + 2] != COPY_BINARY_TRAILER:
+        fields, = struct.unpack_from('>h', data, position)
+        position += 2
+        for _ in range(fields):
+            length, = struct.unpack_from('>i', data, position)
+            position += 4 + max(length, 0)
+        rows += 1
+    assert position + 2 == len(data)
+    return rows
+
+
+def test_text_file_without_rotation(tmp_path):
+    with FileSink(str(tmp_path), 'users') as sink:
+        sink.write_rows([(1, 'a\tb'), (2, None)])
+    assert sink.files == [str(tmp_path / 'users.tsv')]
+    assert (tmp_path / 'users.tsv').read_bytes() == b'1\ta\\tb\n2\t\\N\n'
+
+
+@pytest.mark.parametrize('batches, expected', [
+    ([100], [100]),
+    ([70, 70, 60], [100, 100]),
+    ([250], [100, 100, 50]),
+    ([1, 99, 1], [100, 1]),
+])
+def test_rotation_splits_rows_between_files(tmp_path, batches, expected):
+    sink = FileSink(str(tmp_path), 'orders', 'csv', rotate_rows=100)
+    start = 0
+    for count in batches:
+        sink.write_rows(make_rows(count, start))
+        start += count
+    sink.close()
+    assert [os.path.basename(path) for path in sink.files] == \
+        [f"orders.{number:04d}.csv" for number in range(1, len(expected) + 1)]
+    lines = [open(path, encoding='utf-8').read().splitlines() for path in sink.files]
+    assert [len(file_lines) for file_lines in lines] == expected
+    assert [line for file_lines in lines for line in file_lines] == [f"{n},name {n}" for n in range(start)]
+    assert sink.rows_written == start
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_binary_files_have_header_and_trailer(tmp_path, compress):
+    encoder = BinaryCopyEncoder(['integer', 'text'], ['id', 'name'])
+    sink = FileSink(str(tmp_path), 'users', 'binary', compress=compress, rotate_rows=40, encoder=encoder)
+    write_rows_to_files([make_rows(30), make_rows(30, 30), []], sink)
+    assert len(sink.files) == 2
+    counts = []
+    for path in sink.files:
+        data = gzip.open(path).read() if compress else open(path, 'rb').read()
+        assert data.startswith(COPY_BINARY_HEADER) and data.endswith(COPY_BINARY_TRAILER)
+        counts.append(count_binary_rows(data))
+    assert counts == [40, 20]
+    assert sink.files[0].endswith('.0001.bin.gz' if compress else '.0001.bin')
+
+
+def test_compressed_text(tmp_path):
+    sink = FileSink(str(tmp_path), 'users', compress=True)
+    assert write_rows_to_files([make_rows(3)], sink) == 3
+    assert gzip.open(sink.files[0], 'rt', encoding='utf-8').read() == '0\tname 0\n1\tname 1\n2\tname 2\n'
+    assert sink.bytes_written() > 0
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        FileSink('.', 'users', 'parquet')
+    with pytest.raises(ValueError):
+        FileSink('.', 'users', 'binary')
+
+
+def test_load_script(tmp_path):
+    path = tmp_path / 'load.sql'
+    write_load_script(str(path), 'public', [{'table_name': 'users', 'columns': ['id', 'name'],
+                                             'files': [str(tmp_path / "users.0001.csv.gz")]}], 'csv', True)
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines[:2] == ['\\set ON_ERROR_STOP on', 'BEGIN;'] and lines[-1] == 'COMMIT;'
+    assert lines[3] == copy_command('public', 'users', ['id', 'name'], 'users.0001.csv.gz', 'csv', True)
+    assert lines[3] == ('\\copy "public"."users" ("id", "name") FROM PROGRAM \'gzip -dc "users.0001.csv.gz"\' '
+                        'WITH (FORMAT csv)')
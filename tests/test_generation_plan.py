@@ -0,0 +1,79 @@
+import random
+import re
+
+import pytest
+
+from database_config import DatabaseConfig
+from generation_plan import compile_column
+from postgres_utils import PostgresUtils
+
+RULES = {
+    'int': {'type': 'int', 'min_value': 1, 'max_value': 1000000},
+    'decimal': {'type': 'decimal', 'min_value': 0, 'max_value': 10000, 'precision': 2},
+    'timestamp': {'type': 'timestamp', 'start_date': '2020-01-01 00:00:00', 'end_date': '2024-12-31 23:59:59'},
+    'date': {'type': 'date', 'start_date': '2020-01-01', 'end_date': '2024-12-31'},
+    'enum': {'type': 'enum', 'values': ['new', 'paid', 'shipped']},
+    'text': {'type': 'text', 'min_words': 3, 'max_words': 10},
+    'boolean': {'type': 'boolean', 'true_probability': 0.7},
+}
+
+# Строковые правила план генерирует пачками из случайных байт: совпадает форма значений, а не сами значения
+SHAPES = {
+    'pattern': ({'type': 'pattern', 'pattern': 'AA-####-aa'}, re.compile(r'[A-Z]{2}-\d{4}-[a-z]{2}')),
+    'email': ({'type': 'email', 'domains': ['example.com']}, re.compile(r'[a-z]{5,10}\d{1,3}@example\.com')),
+}
+
+
+def column(name='value', data_type='text'):
+    return {'name': name, 'data_type': data_type, 'max_length': None, 'nullable': True}
+
+
+def make_plan(rules, rng, null_probability=0.0, unique=False):
+    table_config = {'column_rules': {'value': rules}, 'null_probability': null_probability,
+                    'unique_columns': ['value'] if unique else []}
+    return compile_column(column(), table_config, {}, rng=rng)
+
+
+def per_value(rules, count, seed):
+    """Старый путь: правило компилируется заново для каждого значения (глобальный random)"""
+    pg_utils = PostgresUtils(DatabaseConfig(), {})
+    random.seed(seed)
+    return [pg_utils._generate_value_by_rules('value', rules) for _ in range(count)]
+
+
+@pytest.mark.parametrize('rule_name', sorted(RULES))
+def test_generate_many_matches_per_value_path(rule_name):
+    rules = RULES[rule_name]
+    assert make_plan(rules, random.Random(7)).generate_many(300) == per_value(rules, 300, 7)
+
+
+@pytest.mark.parametrize('rule_name', sorted(SHAPES))
+def test_batch_rules_match_per_value_shape(rule_name):
+    rules, shape = SHAPES[rule_name]
+    for values in (make_plan(rules, random.Random(7)).generate_many(300), per_value(rules, 300, 7)):
+        assert len(values) == 300
+        assert all(shape.fullmatch(value) for value in values)
+
+
+def test_generate_many_matches_generate():
+    plan = make_plan(RULES['int'], random.Random(3))
+    expected = make_plan(RULES['int'], random.Random(3))
+    assert plan.generate_many(100) == [expected.generate() for _ in range(100)]
+
+
+def test_null_probability():
+    values = make_plan(RULES['int'], random.Random(4), null_probability=0.25).generate_many(20000)
+    assert 0.23 < values.count(None) / len(values) < 0.27
+
+
+def test_unique_plan_values_are_distinct():
+    values = make_plan({'type': 'decimal', 'min_value': 0, 'max_value': 100, 'precision': 2},
+                       random.Random(5), unique=True).generate_many(5000)
+    assert len(set(values)) == 5000
+
+
+def test_invalid_rule_raises_at_compile_time():
+    with pytest.raises(ValueError):
+        make_plan({'type': 'int', 'min_value': 10, 'max_value': 1}, random.Random())
+    with pytest.raises(ValueError):
+        make_plan({'type': 'date', 'start_date': 'not a date'}, random.Random())
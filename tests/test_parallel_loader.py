@@ -0,0 +1,112 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from parallel_loader import ParallelLoader
+from run_metrics import RunMetrics
+
+ROWS_PER_BATCH = 10
+
+
+class FakeConnection:
+    """Соединение с транзакцией: строки видны в таблице только после commit"""
+
+    def __init__(self, table):
+        self.table = table
+        self.pending = []
+
+    @contextmanager
+    def cursor(self):
+        yield self
+
+    def commit(self):
+        with self.table.lock:
+            self.table.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class FakeTable:
+    """pg_utils с одной таблицей; write_rows падает на пачке с номером fail_batch"""
+
+    def __init__(self, fail_batch=None):
+        self.fail_batch = fail_batch
+        self.committed = []
+        self.lock = threading.Lock()
+        self.metrics = RunMetrics({})
+
+    @contextmanager
+    def connection(self):
+        conn = FakeConnection(self)
+        yield conn
+        conn.commit()
+
+    def write_rows(self, cursor, table_name, columns, rows):
+        if rows[0][0] // ROWS_PER_BATCH == self.fail_batch:
+            raise RuntimeError(f"batch {self.fail_batch} failed")
+        cursor.pending.extend(rows)
+        return len(rows)
+
+
+def make_batches(count):
+    for batch in range(count):
+        yield [(batch * ROWS_PER_BATCH + offset,) for offset in range(ROWS_PER_BATCH)]
+
+
+@pytest.mark.parametrize('policy', ['abort', 'keep'])
+def test_all_batches_committed(policy):
+    table = FakeTable()
+    loader = ParallelLoader(table, 'events', ['id'], connections=3, failure_policy=policy)
+    assert loader.load(make_batches(40))
+    summary = loader.summary()
+    assert sorted(table.committed) == [(row,) for row in range(400)]
+    assert summary['rows'] == summary['committed_rows'] == 400
+    assert sum(worker['batches'] for worker in summary['workers']) == 40
+    assert all(worker['error'] is None for worker in summary['workers'])
+
+
+def test_abort_rolls_back_every_connection():
+    table = FakeTable(fail_batch=7)
+    loader = ParallelLoader(table, 'events', ['id'], connections=3, failure_policy='abort')
+    assert not loader.load(make_batches(40))
+    summary = loader.summary()
+    assert table.committed == []
+    assert summary['committed_rows'] == 0
+    assert summary['rows'] < 400
+    errors = [worker['error'] for worker in summary['workers'] if worker['error']]
+    assert errors == ['batch 7 failed']
+
+
+def test_keep_leaves_committed_batches():
+    table = FakeTable(fail_batch=7)
+    loader = ParallelLoader(table, 'events', ['id'], connections=3, failure_policy='keep')
+    assert not loader.load(make_batches(40))
+    summary = loader.summary()
+    committed = {row for (row,) in table.committed}
+    assert summary['committed_rows'] == summary['rows'] == len(table.committed)
+    assert len(committed) < 400
+    # Пачки фиксируются целиком, упавшая пачка не фиксируется
+    assert not committed & set(range(70, 80))
+    assert all(row - row % ROWS_PER_BATCH in committed for row in committed)
+    assert [worker['error'] for worker in summary['workers'] if worker['error']] == ['batch 7 failed']
+    assert sum(worker['committed_rows'] for worker in summary['workers']) == len(committed)
+
+
+def test_producer_error_rolls_back_and_is_raised():
+    def batches():
+        yield from make_batches(5)
+        raise ValueError('bad rule')
+
+    table = FakeTable()
+    loader = ParallelLoader(table, 'events', ['id'], connections=2, failure_policy='abort')
+    with pytest.raises(ValueError, match='bad rule'):
+        loader.load(batches())
+    assert table.committed == []
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ParallelLoader(FakeTable(), 'events', ['id'], connections=2, failure_policy='retry')
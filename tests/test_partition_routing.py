@@ -0,0 +1,142 @@
+from datetime import date
+
+import pytest
+
+from partition_routing import (MINVALUE, MAXVALUE, PartitionBatch, build_partition_router,
+                               parse_partition_bound, partition_spread_rule)
+from schema_catalog import SchemaCatalog
+
+
+def make_table(columns, partitioning=None, partition_of=None):
+    return {
+        'kind': 'p' if partitioning else 'r',
+        'columns': [{'name': name, 'data_type': data_type, 'nullable': True} for name, data_type in columns],
+        'primary_key': [],
+        'unique_constraints': [],
+        'foreign_keys': [],
+        'partitioning': partitioning,
+        'partition_of': partition_of
+    }
+
+
+def make_catalog(strategy, key, bounds, columns):
+    """Снимок схемы с таблицей events, секционированной по bounds {секция: граница}"""
+    partitioning = {
+        'strategy': strategy,
+        'key': key,
+        'partitions': [{'schema': 'public', 'name': name, 'bound': bound} for name, bound in bounds.items()]
+    }
+    tables = {'events': make_table(columns, partitioning)}
+    for name in bounds:
+        tables[name] = make_table(columns, partition_of='events')
+    return SchemaCatalog('public', tables)
+
+
+LIST_BOUNDS = {
+    'events_ru': "FOR VALUES IN ('ru', 'by')",
+    'events_us': "FOR VALUES IN ('us')",
+    'events_null': "FOR VALUES IN (NULL)",
+    'events_other': "DEFAULT"
+}
+
+RANGE_BOUNDS = {
+    'events_old': "FOR VALUES FROM (MINVALUE) TO ('2024-01-01')",
+    'events_2024_01': "FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')",
+    'events_2024_02': "FOR VALUES FROM ('2024-02-01') TO ('2024-03-01')",
+    'events_other': "DEFAULT"
+}
+
+
+def test_parse_range_bound():
+    bound = parse_partition_bound("FOR VALUES FROM (MINVALUE, 10) TO ('2024-01-01', MAXVALUE)")
+    assert bound == {'kind': 'range', 'from': [MINVALUE, '10'], 'to': ['2024-01-01', MAXVALUE]}
+
+
+def test_parse_list_bound_with_null_and_quotes():
+    bound = parse_partition_bound("FOR VALUES IN ('it''s', NULL, 'a,b')")
+    assert bound == {'kind': 'list', 'values': ["it's", None, 'a,b']}
+
+
+def test_parse_default_and_hash_bounds():
+    assert parse_partition_bound("DEFAULT") == {'kind': 'default'}
+    assert parse_partition_bound("FOR VALUES WITH (modulus 4, remainder 1)") == {'kind': 'hash'}
+
+
+def test_parse_unknown_bound():
+    with pytest.raises(ValueError):
+        parse_partition_bound("FOR SOMETHING ELSE")
+
+
+def test_route_list_with_default_and_null():
+    catalog = make_catalog('list', ['country'], LIST_BOUNDS, [('id', 'integer'), ('country', 'text')])
+    router, warnings = build_partition_router(catalog, 'events', ['id', 'country'])
+    assert warnings == []
+    groups = router.route([(1, 'ru'), (2, 'us'), (3, None), (4, 'de'), (5, 'by')])
+    assert groups == {
+        ('public', 'events_ru'): [(1, 'ru'), (5, 'by')],
+        ('public', 'events_us'): [(2, 'us')],
+        ('public', 'events_null'): [(3, None)],
+        ('public', 'events_other'): [(4, 'de')]
+    }
+
+
+def test_route_range_with_minvalue_and_default():
+    catalog = make_catalog('range', ['created'], RANGE_BOUNDS, [('id', 'integer'), ('created', 'date')])
+    router, _ = build_partition_router(catalog, 'events', ['id', 'created'])
+    rows = [(1, date(2023, 5, 1)), (2, date(2024, 1, 1)), (3, date(2024, 2, 29)), (4, date(2024, 3, 1)), (5, None)]
+    groups = router.route(rows)
+    assert groups[('public', 'events_old')] == [rows[0]]
+    assert groups[('public', 'events_2024_01')] == [rows[1]]
+    assert groups[('public', 'events_2024_02')] == [rows[2]]
+    assert groups[('public', 'events_other')] == [rows[3], rows[4]]
+
+
+def test_route_without_matching_partition():
+    bounds = {'events_ru': "FOR VALUES IN ('ru')"}
+    catalog = make_catalog('list', ['country'], bounds, [('id', 'integer'), ('country', 'text')])
+    router, _ = build_partition_router(catalog, 'events', ['id', 'country'])
+    with pytest.raises(ValueError):
+        router.route([(1, 'us')])
+
+
+def test_route_batches_keeps_all_rows():
+    catalog = make_catalog('list', ['country'], LIST_BOUNDS, [('id', 'integer'), ('country', 'text')])
+    router, _ = build_partition_router(catalog, 'events', ['id', 'country'])
+    countries = ['ru', 'us', None, 'de']
+    batches = [[(number, countries[number % 4]) for number in range(start, start + 10)] for start in range(0, 50, 10)]
+    routed = list(router.route_batches(batches, 4))
+    assert all(isinstance(batch, PartitionBatch) for batch in routed)
+    assert sorted(row for batch in routed for row in batch) == sorted(row for batch in batches for row in batch)
+    for batch in routed:
+        assert {router.route([row]).popitem()[0] for row in batch} == {batch.relation}
+
+
+def test_hash_partitions_are_left_to_server():
+    bounds = {'events_0': "FOR VALUES WITH (modulus 2, remainder 0)",
+              'events_1': "FOR VALUES WITH (modulus 2, remainder 1)"}
+    catalog = make_catalog('hash', ['id'], bounds, [('id', 'integer')])
+    router, warnings = build_partition_router(catalog, 'events', ['id'])
+    assert router is None
+    assert len(warnings) == 1
+
+
+def test_spread_list_with_default_and_null_partitions():
+    catalog = make_catalog('list', ['country'], LIST_BOUNDS, [('id', 'integer'), ('country', 'text')])
+    column_name, rule = partition_spread_rule(catalog, 'events', {'country': {'null_probability': 0.1}})
+    assert column_name == 'country'
+    assert rule == {'null_probability': 0.1, 'type': 'enum', 'values': ['ru', 'by', 'us'],
+                    'weights': [0.5, 0.5, 1.0]}
+
+
+def test_spread_range_skips_unbounded_partitions():
+    catalog = make_catalog('range', ['created'], RANGE_BOUNDS, [('id', 'integer'), ('created', 'date')])
+    column_name, rule = partition_spread_rule(catalog, 'events')
+    assert column_name == 'created'
+    assert rule == {'type': 'date', 'ranges': [['2024-01-01', '2024-02-01'], ['2024-02-01', '2024-03-01']]}
+
+
+def test_spread_without_listed_values():
+    bounds = {'events_null': "FOR VALUES IN (NULL)", 'events_other': "DEFAULT"}
+    catalog = make_catalog('list', ['country'], bounds, [('id', 'integer'), ('country', 'text')])
+    with pytest.raises(ValueError):
+        partition_spread_rule(catalog, 'events')
@@ -0,0 +1,95 @@
+import json
+
+from database_config import DatabaseConfig
+from plan_cache import PLAN_CACHE_VERSION, PlanCache, plan_cache_key
+from postgres_utils import PostgresUtils
+from unique_values import check_unique_capacity, unique_space_sizes
+
+CONFIG = {
+    'global_settings': {'batch_size': 100},
+    'tables': [{
+        'table_name': 'users',
+        'rows_to_generate': 1000,
+        'unique_columns': ['code', 'status'],
+        'column_rules': {
+            'code': {'type': 'pattern', 'pattern': 'AA##'},
+            'status': {'type': 'enum', 'values': ['a', 'b', 'c']}
+        }
+    }]
+}
+
+
+def test_key_depends_on_config_and_fingerprint():
+    key = plan_cache_key(CONFIG, 'abc')
+    assert key == plan_cache_key(json.loads(json.dumps(CONFIG, sort_keys=True)), 'abc')
+    assert key != plan_cache_key(CONFIG, 'abd')
+    changed = json.loads(json.dumps(CONFIG))
+    changed['tables'][0]['column_rules']['code']['pattern'] = 'AA###'
+    assert key != plan_cache_key(changed, 'abc')
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'cache' / 'plan.json')
+    cache = PlanCache(path, 'key1')
+    assert not cache.load()
+    cache.put('schedule', {'order': ['users']})
+    cache.put_table('users', 'capacity:10:1', [])
+    assert cache.save()
+    assert not list(tmp_path.glob('cache/*.tmp'))
+
+    loaded = PlanCache(path, 'key1')
+    assert loaded.load() and loaded.hit
+    assert loaded.get('schedule') == {'order': ['users']}
+    assert loaded.get_table('users', 'capacity:10:1') == []
+    assert loaded.get_table('orders', 'capacity:10:1') is None
+    assert not loaded.dirty
+
+
+def test_changed_key_invalidates(tmp_path, capsys):
+    path = str(tmp_path / 'plan.json')
+    cache = PlanCache(path, plan_cache_key(CONFIG, 'fingerprint1'))
+    cache.put('catalog', {'schema': 'public', 'tables': {}})
+    cache.save()
+
+    assert PlanCache(path, plan_cache_key(CONFIG, 'fingerprint1')).load()
+    stale = PlanCache(path, plan_cache_key(CONFIG, 'fingerprint2'))
+    assert not stale.load()
+    assert stale.get('catalog') is None and not stale.hit
+    assert 'устарел' in capsys.readouterr().out
+
+
+def test_other_version_and_broken_file_are_ignored(tmp_path):
+    path = tmp_path / 'plan.json'
+    path.write_text(json.dumps({'version': PLAN_CACHE_VERSION - 1, 'key': 'key1', 'plan': {'tables': {}}}))
+    assert not PlanCache(str(path), 'key1').load()
+    path.write_text('{"version":')
+    assert not PlanCache(str(path), 'key1').load()
+
+
+def test_unique_space_sizes_give_same_checks():
+    table_config = CONFIG['tables'][0]
+    sizes = unique_space_sizes(table_config)
+    assert sizes == {'code': 26 * 26 * 100, 'status': 3}
+    for rows, shards in [(3, 1), (4, 1), (3, 3), (3, 4), (67600, 2), (67601, 2)]:
+        assert check_unique_capacity(table_config, rows, shards, sizes) == \
+            check_unique_capacity(table_config, rows, shards)
+    assert unique_space_sizes({'unique_columns': ['n'], 'column_rules': {'n': {'type': 'int', 'min_value': 5,
+                                                                               'max_value': 1}}})['n'] \
+        == "min_value 5 больше max_value 1"
+
+
+def test_capacity_check_uses_cached_sizes(tmp_path):
+    path = str(tmp_path / 'plan.json')
+    pg_utils = PostgresUtils(DatabaseConfig(), CONFIG)
+    pg_utils._plan_cache = PlanCache(path, 'key1')
+    assert pg_utils.check_unique_capacity('users', 2) == []
+    assert pg_utils._plan_cache.get_table('users', 'unique_spaces') == {'code': 67600, 'status': 3}
+    pg_utils._plan_cache.save()
+
+    repeat = PostgresUtils(DatabaseConfig(), CONFIG)
+    repeat._plan_cache = PlanCache(path, 'key1')
+    repeat._plan_cache.load()
+    # Проверка для нового числа строк считается по размерам из кэша
+    repeat._plan_cache.put_table('users', 'unique_spaces', {'status': 2})
+    errors = repeat.check_unique_capacity('users', 3)
+    assert len(errors) == 1 and '2 возможных' in errors[0]
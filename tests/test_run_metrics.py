@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from run_metrics import RunMetrics
+
+
+def test_tracker_stats_reach_json_report(tmp_path):
+    path = tmp_path / 'report.json'
+    metrics = RunMetrics({'metrics_report': str(path), 'log_level': 'ERROR'})
+    metrics.add_trackers('users', {'columns': 2, 'values': 1000, 'memory_bytes': 4096})
+    metrics.add_trackers('orders', {'columns': 1, 'values': 10, 'memory_bytes': 100})
+    metrics.finish()
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert report['tables']['users']['unique_trackers'] == {'columns': 2, 'values': 1000, 'memory_bytes': 4096}
+    assert report['unique_tracker_bytes'] == 4196
+
+
+def test_tracker_stats_of_shards_are_summed():
+    shard = RunMetrics({})
+    shard.add_trackers('users', {'columns': 2, 'values': 500, 'memory_bytes': 2048})
+    metrics = RunMetrics({})
+    metrics.add_trackers('users', {'columns': 2, 'values': 500, 'memory_bytes': 2048})
+    metrics.merge_table('users', shard.table_report('users'))
+    assert metrics.table_report('users')['unique_trackers'] == {'columns': 2, 'values': 1000, 'memory_bytes': 4096}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def progress_events(monkeypatch, settings):
+    clock = FakeClock()
+    monkeypatch.setattr('run_metrics.time.perf_counter', clock)
+    metrics = RunMetrics(settings)
+    events = []
+    metrics.add_hook(events.append)
+    return clock, metrics.progress('users', 1000), events
+
+
+def test_progress_is_reported_once_per_interval(monkeypatch, capsys):
+    clock, tracker, events = progress_events(monkeypatch, {'progress_interval': 5})
+    for _ in range(9):
+        clock.now += 1
+        tracker.update(100)
+    # Отчет на 5-й секунде, следующий не раньше 10-й
+    assert [event['rows'] for event in events] == [500]
+    clock.now += 1
+    tracker.update(50)
+    assert [event['rows'] for event in events] == [500, 950]
+    assert events[0]['rows_per_second'] == pytest.approx(100.0)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == ['⏳ users: 500/1000 строк (50%), 100 строк/с', '⏳ users: 950/1000 строк (95%), 95 строк/с']
+
+
+def test_progress_is_silent_after_last_rows(monkeypatch):
+    clock, tracker, events = progress_events(monkeypatch, {'progress_interval': 1})
+    clock.now += 10
+    tracker.update(1000)
+    assert events == []
+
+
+def test_progress_quiet_levels_still_emit_events(monkeypatch, capsys):
+    clock, tracker, events = progress_events(monkeypatch, {'progress_interval': 1, 'log_level': 'WARNING'})
+    clock.now += 2
+    tracker.update(10)
+    assert len(events) == 1 and capsys.readouterr().out == ''
+
+
+def test_progress_debug_prints_every_batch(monkeypatch, capsys):
+    clock, tracker, events = progress_events(monkeypatch, {'progress_interval': 60, 'log_level': 'DEBUG'})
+    for _ in range(3):
+        tracker.update(10)
+    assert capsys.readouterr().out.count('✅ users: сгенерировано') == 3
+    assert events == []
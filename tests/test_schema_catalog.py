@@ -0,0 +1,93 @@
+import json
+
+from schema_catalog import SchemaCatalog
+
+
+class FakeCursor:
+    """Курсор, который отвечает на запросы SchemaCatalog заранее заданными строками"""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+        self._rows = []
+
+    def execute(self, query, params):
+        self.queries.append((query, params))
+        self._rows = self.results.get(query, [])
+
+    def fetchall(self):
+        return self._rows
+
+
+RESULTS = {
+    SchemaCatalog.COLUMNS_QUERY: [
+        ('users', 'r', 'id', 'integer', 'integer', None, False, "nextval('users_id_seq'::regclass)", 'NEVER', None, None),
+        ('users', 'r', 'email', 'character varying', 'character varying(100)', 100, False, None, 'NEVER', None, None),
+        ('orders', 'p', 'id', 'bigint', 'bigint', None, False, None, 'NEVER', None, 'ALWAYS'),
+        ('orders', 'p', 'user_id', 'integer', 'integer', None, True, None, 'NEVER', None, None),
+        ('orders', 'p', 'created_on', 'date', 'date', None, False, None, 'NEVER', None, None),
+        ('orders_2024', 'r', 'id', 'bigint', 'bigint', None, False, None, 'NEVER', None, 'ALWAYS'),
+    ],
+    SchemaCatalog.UNIQUE_QUERY: [
+        ('users', True, ['id']),
+        ('users', False, ['email']),
+        ('users', False, ['email']),
+        ('orders', True, ['id', 'created_on']),
+        ('missing', True, ['id']),
+    ],
+    SchemaCatalog.FOREIGN_KEYS_QUERY: [
+        ('orders', 'orders_user_id_fkey', 'user_id', 'public', 'users', 'id', False),
+    ],
+    SchemaCatalog.PARTITIONED_QUERY: [
+        ('orders', 'r', False, ['created_on']),
+    ],
+    SchemaCatalog.PARTITIONS_QUERY: [
+        ('orders', 'public', 'orders_2024', "FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')"),
+    ],
+}
+
+
+def load_catalog():
+    cursor = FakeCursor(RESULTS)
+    return SchemaCatalog.load(cursor, 'public'), cursor
+
+
+def test_load_runs_five_queries_for_the_schema():
+    _, cursor = load_catalog()
+    assert len(cursor.queries) == 5
+    assert all(params == ('public',) for _, params in cursor.queries)
+
+
+def test_loaded_structure():
+    catalog, _ = load_catalog()
+    assert catalog.table_names() == ['orders', 'users']
+    assert [column['name'] for column in catalog.get_columns('orders')] == ['id', 'user_id', 'created_on']
+    assert catalog.get_columns('users')[1]['max_length'] == 100
+    assert catalog.get_primary_key('users') == ['id']
+    assert catalog.get_unique_constraints('users') == [['email']]
+    assert catalog.get_referenced_columns('users') == ['id']
+    assert catalog.get_foreign_keys('orders')[0]['foreign_table_name'] == 'users'
+    assert catalog.get_partitioning('orders')['strategy'] == 'range'
+    assert catalog.get_partition_parent('orders_2024') == 'orders'
+    assert not catalog.has_table('missing') and catalog.get_columns('missing') == []
+
+
+def test_json_round_trip():
+    catalog, _ = load_catalog()
+    restored = SchemaCatalog.from_dict(json.loads(json.dumps(catalog.to_dict())))
+    assert restored.schema == 'public'
+    assert restored.tables == catalog.tables
+    for table_name in catalog.tables:
+        assert restored.get_columns(table_name) == catalog.get_columns(table_name)
+        assert restored.get_foreign_keys(table_name) == catalog.get_foreign_keys(table_name)
+        assert restored.get_unique_constraints(table_name) == catalog.get_unique_constraints(table_name)
+        assert restored.get_partitioning(table_name) == catalog.get_partitioning(table_name)
+    assert restored.table_names() == catalog.table_names()
+
+
+def test_accessors_return_copies():
+    catalog, _ = load_catalog()
+    catalog.get_columns('users')[0]['name'] = 'changed'
+    catalog.get_foreign_keys('orders')[0]['column_name'] = 'changed'
+    assert catalog.get_columns('users')[0]['name'] == 'id'
+    assert catalog.get_foreign_keys('orders')[0]['column_name'] == 'user_id'
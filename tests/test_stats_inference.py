@@ -0,0 +1,56 @@
+from generation_plan import pattern_slots, pattern_space_size
+from stats_inference import infer_column_rule, infer_pattern, widen_pattern
+
+
+def make_stats(histogram, common_values=(), common_freqs=(), n_distinct=-1.0):
+    return {'null_frac': 0.0, 'n_distinct': n_distinct, 'avg_width': 8, 'common_values': list(common_values),
+            'common_freqs': list(common_freqs), 'histogram': list(histogram)}
+
+
+def column(data_type, max_length=None, full_type=None):
+    return {'name': 'value', 'data_type': data_type, 'full_type': full_type or data_type,
+            'max_length': max_length, 'nullable': False}
+
+
+def test_infer_pattern():
+    assert infer_pattern(['AB-12', 'CD-34', 'XY-99']) == 'AA-##'
+    assert infer_pattern(['ab', 'abc']) is None
+
+
+def test_unique_pattern_is_widened_to_row_count():
+    rule = infer_column_rule(column('character varying', 10), make_stats(['AB-12', 'CD-34', 'XY-99']), True, 100000)
+    assert rule == {'type': 'pattern', 'pattern': 'AA-###'}
+    assert pattern_space_size(pattern_slots(rule['pattern'])) >= 100000
+
+
+def test_unique_pattern_that_cannot_grow_falls_back_to_text():
+    assert widen_pattern('AA-##', 100000, 5) is None
+    rule = infer_column_rule(column('character varying', 5), make_stats(['AB-12', 'CD-34', 'XY-99']), True, 100000)
+    assert rule['type'] == 'text'
+
+
+def test_non_unique_pattern_is_kept():
+    rule = infer_column_rule(column('text'), make_stats(['AB-12', 'CD-34', 'XY-99']), False, 100000)
+    assert rule == {'type': 'pattern', 'pattern': 'AA-##'}
+
+
+def test_unique_int_range_is_widened():
+    rule = infer_column_rule(column('integer'), make_stats(['1', '50', '100']), True, 1000)
+    assert rule == {'type': 'int', 'min_value': 1, 'max_value': 1000}
+
+
+def test_unique_decimal_range_is_widened():
+    rule = infer_column_rule(column('numeric', full_type='numeric(10,2)'), make_stats(['1.00', '5.50', '10.00']),
+                             True, 100000)
+    assert rule['min_value'] == 1.0 and rule['precision'] == 2
+    assert round((rule['max_value'] - rule['min_value']) * 100) + 1 >= 100000
+
+
+def test_unique_date_range_is_widened():
+    rule = infer_column_rule(column('date'), make_stats(['2024-01-01', '2024-01-10']), True, 366)
+    assert rule == {'type': 'date', 'start_date': '2024-01-01', 'end_date': '2024-12-31'}
+
+
+def test_non_unique_date_keeps_histogram():
+    rule = infer_column_rule(column('date'), make_stats(['2024-01-01', '2024-01-10']), False, 366)
+    assert rule['end_date'] == '2024-01-10' and rule['histogram'] == ['2024-01-01', '2024-01-10']
@@ -0,0 +1,70 @@
+from schema_catalog import SchemaCatalog
+from table_scheduler import TableSchedule, build_schedule, run_schedule
+
+
+def make_catalog(tables):
+    """Снимок схемы по {таблица: [(колонка, nullable, ссылка на таблицу или None)]}"""
+    snapshot = {}
+    for table_name, columns in tables.items():
+        snapshot[table_name] = {
+            'kind': 'r',
+            'columns': [{'name': name, 'data_type': 'integer', 'nullable': nullable}
+                        for name, nullable, _ in columns],
+            'primary_key': ['id'],
+            'unique_constraints': [],
+            'foreign_keys': [{'constraint_name': f"{table_name}_{name}_fkey", 'column_name': name,
+                              'foreign_table_schema': 'public', 'foreign_table_name': parent,
+                              'foreign_column_name': 'id'}
+                             for name, _, parent in columns if parent],
+            'partitioning': None,
+            'partition_of': None
+        }
+    return SchemaCatalog('public', snapshot)
+
+
+def test_levels_follow_foreign_keys():
+    catalog = make_catalog({
+        'orders': [('id', False, None), ('user_id', False, 'users')],
+        'users': [('id', False, None)],
+        'items': [('id', False, None), ('order_id', False, 'orders')]
+    })
+    schedule = build_schedule(catalog, ['items', 'orders', 'users'])
+    assert schedule.levels == [['users'], ['orders'], ['items']]
+    assert schedule.deferred == [] and schedule.unresolved == []
+
+
+def test_nullable_self_reference_is_deferred():
+    catalog = make_catalog({'employees': [('id', False, None), ('manager_id', True, 'employees')]})
+    schedule = build_schedule(catalog, ['employees'])
+    assert [repr(fk) for fk in schedule.deferred] == ['employees(manager_id) -> employees(id)']
+    assert schedule.unresolved == []
+
+
+def test_not_null_self_reference_is_unresolved():
+    catalog = make_catalog({'employees': [('id', False, None), ('boss_id', False, 'employees')]})
+    schedule = build_schedule(catalog, ['employees'])
+    assert schedule.levels == [['employees']]
+    assert schedule.deferred == []
+    assert schedule.unresolved == [['employees']]
+
+
+def test_cycle_is_broken_at_nullable_edge():
+    catalog = make_catalog({
+        'x': [('id', False, None), ('y_id', True, 'y')],
+        'y': [('id', False, None), ('x_id', False, 'x')]
+    })
+    schedule = build_schedule(catalog, ['x', 'y'])
+    assert schedule.levels == [['x'], ['y']]
+    assert [repr(fk) for fk in schedule.deferred] == ['x(y_id) -> y(id)']
+    assert schedule.unresolved == []
+
+
+def test_run_schedule_isolates_table_errors():
+    def process_table(table_name):
+        if table_name == 'bad':
+            raise TypeError("bad rule")
+        return True
+
+    schedule = TableSchedule([['bad', 'good'], ['child']], [], [])
+    assert run_schedule(schedule, process_table, 1) == {'bad': False, 'good': True, 'child': True}
+    assert run_schedule(schedule, process_table, 2) == {'bad': False, 'good': True, 'child': True}
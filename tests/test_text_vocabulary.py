@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from text_vocabulary import BUILTIN_WORDS, compile_random_text, compile_text, truncate_words
+
+
+def test_truncate_words_cuts_at_word_boundary():
+    assert truncate_words('alpha beta gamma', 12) == 'alpha beta'
+    assert truncate_words('alpha', 3) == 'alp'
+    assert truncate_words('alpha beta', 20) == 'alpha beta'
+
+
+def test_compile_text_uses_vocabulary_and_include_words():
+    generate = compile_text({'min_words': 3, 'max_words': 3, 'include_words': ['zebra']}, random.Random(1))
+    for _ in range(50):
+        words = generate().split(' ')
+        assert len(words) == 3 and 'zebra' in words
+        assert all(word in BUILTIN_WORDS for word in words if word != 'zebra')
+
+
+def test_compile_text_respects_max_length():
+    generate = compile_text({'min_words': 10, 'max_words': 20}, random.Random(2), max_length=30)
+    assert all(len(generate()) <= 30 for _ in range(100))
+
+
+def test_random_text_gives_many_distinct_single_words():
+    generate = compile_random_text({'min_words': 1, 'max_words': 1}, random.Random(3))
+    values = [generate() for _ in range(10000)]
+    assert len(set(values)) > 9900
+    assert len(set(compile_text({'min_words': 1, 'max_words': 1}, random.Random(3))() for _ in range(10000))) \
+        <= len(BUILTIN_WORDS)
+
+
+def test_min_words_greater_than_max_words():
+    with pytest.raises(ValueError):
+        compile_random_text({'min_words': 3, 'max_words': 2}, random.Random())
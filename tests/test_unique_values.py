@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from unique_values import KeyedPermutation, check_unique_capacity, compile_unique_rule
+
+PATTERN_CLASSES = {'#': str.isdigit, 'A': str.isupper, 'a': str.islower}
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100, 1000, 4097])
+def test_permutation_is_bijection(size):
+    permute = KeyedPermutation(size, key=12345)
+    assert sorted(permute(index) for index in range(size)) == list(range(size))
+
+
+def test_permutation_depends_on_key():
+    first = [KeyedPermutation(1000, key=1)(index) for index in range(1000)]
+    second = [KeyedPermutation(1000, key=2)(index) for index in range(1000)]
+    assert first != second
+
+
+def test_unique_pattern_values_are_distinct_and_match_slots():
+    pattern = 'ID-Aa##'
+    generate = compile_unique_rule({'type': 'pattern', 'pattern': pattern}, random.Random(1))
+    rows = 26 * 26 * 100
+    values = [generate() for _ in range(rows)]
+    assert len(set(values)) == rows
+    for value in values:
+        assert len(value) == len(pattern) and value.startswith('ID-')
+        assert all(PATTERN_CLASSES[slot](char) for slot, char in zip(pattern[3:], value[3:]))
+    with pytest.raises(ValueError):
+        generate()
+
+
+def test_unique_int_values_cover_range():
+    generate = compile_unique_rule({'type': 'int', 'min_value': -50, 'max_value': 949}, random.Random(2))
+    assert sorted(generate() for _ in range(1000)) == list(range(-50, 950))
+    with pytest.raises(ValueError):
+        generate()
+
+
+def test_unique_int_partitions_do_not_overlap():
+    rules = {'type': 'int', 'min_value': 1, 'max_value': 1000}
+    shards = [compile_unique_rule(rules, random.Random(shard), (shard, 3)) for shard in range(3)]
+    values = [generate() for generate in shards for _ in range(300)]
+    assert len(set(values)) == len(values)
+
+
+def test_capacity_check_rejects_rows_beyond_space():
+    table_config = {
+        'unique_columns': ['code', 'number'],
+        'column_rules': {
+            'code': {'type': 'pattern', 'pattern': 'A#'},
+            'number': {'type': 'int', 'min_value': 1, 'max_value': 1000}
+        }
+    }
+    assert check_unique_capacity(table_config, 260) == []
+    errors = check_unique_capacity(table_config, 261)
+    assert len(errors) == 1 and "'code'" in errors[0]
+    # В шардах проверяется часть пространства каждого шарда
+    assert check_unique_capacity(table_config, 260, shards=2) == []
+    assert len(check_unique_capacity(table_config, 1001)) == 2
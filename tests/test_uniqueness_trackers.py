@@ -0,0 +1,43 @@
+import pytest
+
+from uniqueness_trackers import FingerprintTracker, IntBitmapTracker, create_tracker
+
+
+@pytest.mark.parametrize('bloom', [False, True])
+def test_fingerprint_tracker_detects_repeats(bloom):
+    tracker = FingerprintTracker(bloom=bloom)
+    values = [f"user{number}@example.com" for number in range(5000)]
+    assert all(tracker.add_new(value) for value in values)
+    assert not any(tracker.add_new(value) for value in values)
+    assert len(tracker) == len(values)
+    assert all(value in tracker for value in values)
+    assert "other@example.com" not in tracker
+
+
+def test_bloom_filter_is_consulted_on_insert():
+    tracker = FingerprintTracker(bloom=True)
+    tracker.add_new('a')
+    calls = []
+    may_contain = tracker._bloom.may_contain
+    tracker._bloom.may_contain = lambda fingerprint: calls.append(fingerprint) or may_contain(fingerprint)
+    assert tracker.add_new('b')
+    assert not tracker.add_new('a')
+    assert len(calls) == 2
+
+
+def test_bitmap_tracker_starts_at_min_value():
+    tracker = create_tracker('compact', integers=True, min_value=-1000)
+    assert isinstance(tracker, IntBitmapTracker)
+    assert tracker.min_value == -1000
+    assert tracker.add_new(-1000) and tracker.add_new(-1) and tracker.add_new(5)
+    assert not tracker.add_new(-1)
+    assert -1000 in tracker and 4 not in tracker
+    # Значения от min_value занимают биты, а не переполнение
+    assert len(tracker._overflow) == 0
+
+
+def test_bitmap_tracker_keeps_values_outside_bitmap():
+    tracker = IntBitmapTracker(min_value=100)
+    assert tracker.add_new(99) and tracker.add_new('100')
+    assert not tracker.add_new(99)
+    assert len(tracker) == 2
@@ -0,0 +1,133 @@
+import itertools
+import os
+import string
+from functools import lru_cache
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Встроенный словарь: частые английские слова в порядке убывания частоты
+# (ранг слова в списке задает его вес в распределении Ципфа)
+BUILTIN_WORDS = tuple("""
+the of and to in is for that on with as was by at from it be this are an or have not
+which but all has were their more will one can new other about there also its been
+would when than after some time only first two into most over these may any such many
+data year people service order system state work use where team between world through
+because information under public each both part city support during market products
+company report number while well high business account price page group user before
+quality payment customer delivery value access results process review local free since
+management research project development program health network design store support
+community school policy level family home back last day life online based email best
+contact services history within list right including office national same small large
+across build total event need while however without provide general media against
+country best experience power area water point social care open full single version
+shipping return address search model product content following detail special current
+start note travel rate code plan period control client private member security office
+energy video food music book game room card bank credit cost sale offer share light
+green street model range field check issue status action form image type source region
+test server table index query record field client update request change release
+feature option setting profile balance transfer invoice discount receipt refund
+warehouse supplier stock item category brand package tracking carrier route schedule
+contract agreement partner vendor budget revenue profit margin forecast quarter annual
+monthly weekly daily morning evening summer winter spring autumn north south east west
+central river mountain garden house building floor window door table chair kitchen
+bedroom station airport hotel museum theatre library hospital clinic pharmacy doctor
+teacher student course lesson exam grade science history language culture sport
+football tennis hockey match season player coach league final record winner
+""".split())
+
+# Показатель распределения Ципфа: вес слова ранга r пропорционален 1 / r^s
+DEFAULT_ZIPF_EXPONENT = 1.0
+
+# Длина слов из случайных букв в тексте уникальных колонок
+RANDOM_WORD_LENGTH = (3, 10)
+
+
+@lru_cache(maxsize=None)
+def load_vocabulary(source: str = 'builtin') -> Tuple[str, ...]:
+    """Слова словаря: встроенного ('builtin') или из файла (слова через пробелы или по строкам).
+
+    Порядок слов в файле - порядок частоты; повторы удаляются.
+    Файл читается один раз за процесс.
+    """
+    if source == 'builtin':
+        words = BUILTIN_WORDS
+    else:
+        if not os.path.exists(source):
+            raise ValueError(f"файл словаря '{source}' не найден")
+        with open(source, 'r', encoding='utf-8') as f:
+            words = f.read().split()
+    words = tuple(dict.fromkeys(words))
+    if not words:
+        raise ValueError(f"словарь '{source}' пуст")
+    return words
+
+
+@lru_cache(maxsize=None)
+def zipf_cum_weights(size: int, exponent: float = DEFAULT_ZIPF_EXPONENT) -> Tuple[float, ...]:
+    """Накопленные веса Ципфа для size слов (для random.choices(cum_weights=...))"""
+    return tuple(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def truncate_words(text: str, max_length: int) -> str:
+    """Обрезает текст до max_length символов по границе слова"""
+    if len(text) <= max_length:
+        return text
+    cut = text.rfind(' ', 0, max_length + 1)
+    return text[:cut] if cut > 0 else text[:max_length]
+
+
+def compile_text(rules: Dict[str, Any], rng, max_length: Optional[int] = None) -> Callable[[], str]:
+    """Генератор правила text: от min_words до max_words слов словаря с частотами по Ципфу.
+
+    Слова include_words (не больше числа слов значения) входят в каждое
+    значение на случайных местах; max_length - длина колонки, текст
+    обрезается по границе слова, и при обрезке include_words сохраняются
+    в первую очередь.
+    """
+    words = list(load_vocabulary(rules.get('vocabulary', 'builtin')))
+    cum_weights = zipf_cum_weights(len(words), float(rules.get('zipf_exponent', DEFAULT_ZIPF_EXPONENT)))
+    choices = rng.choices
+    return _compile_words(rules, rng, max_length, lambda count: choices(words, cum_weights=cum_weights, k=count))
+
+
+def compile_random_text(rules: Dict[str, Any], rng, max_length: Optional[int] = None) -> Callable[[], str]:
+    """Генератор правила text для уникальных колонок: слова из случайных латинских букв.
+
+    Различных текстов из слов словаря мало, поэтому уникальный текст без
+    явного vocabulary строится, как до появления словаря; include_words и
+    max_length работают так же, как в compile_text.
+    """
+    letters = string.ascii_letters
+    shortest, longest = RANDOM_WORD_LENGTH
+    choices = rng.choices
+    randint = rng.randint
+    return _compile_words(rules, rng, max_length,
+                          lambda count: [''.join(choices(letters, k=randint(shortest, longest))) for _ in range(count)])
+
+
+def _compile_words(rules: Dict[str, Any], rng, max_length: Optional[int],
+                   draw_words: Callable[[int], list]) -> Callable[[], str]:
+    min_words = rules.get('min_words', 5)
+    max_words = rules.get('max_words', 20)
+    if min_words > max_words:
+        raise ValueError(f"min_words {min_words} больше max_words {max_words}")
+    include_words = list(rules.get('include_words', []))
+
+    randint = rng.randint
+    shuffle = rng.shuffle
+
+    def generate_text() -> str:
+        num_words = randint(min_words, max_words)
+        if not include_words:
+            text = ' '.join(draw_words(num_words))
+            return truncate_words(text, max_length) if max_length is not None else text
+
+        sample = include_words[:num_words]
+        sample += draw_words(num_words - len(sample))
+        if max_length is not None and len(' '.join(sample)) > max_length:
+            # include_words стоят первыми, поэтому обрезка отбрасывает слова словаря
+            sample = truncate_words(' '.join(sample), max_length).split(' ')
+        shuffle(sample)
+        return ' '.join(sample)
+
+    return generate_text
+
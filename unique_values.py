@@ -0,0 +1,211 @@
+import itertools
+import random
+import string
+from datetime import timedelta
+from typing import List, Dict, Any, Callable, Optional
+
+import counter_rng
+import rule_primitives
+from counter_rng import mix64
+
+# Типы правил, уникальные значения которых строятся перестановкой номеров строк
+CONSTRUCTIVE_TYPES = ('int', 'date', 'timestamp', 'pattern', 'enum')
+
+# Типы правил, уникальные значения которых с seed выводятся из номера строки
+SEEDED_TYPES = CONSTRUCTIVE_TYPES + ('email',)
+
+
+class KeyedPermutation:
+    """Псевдослучайная взаимно однозначная перестановка чисел [0, size) по ключу.
+
+    Сеть Фейстеля над наименьшим четным числом бит, вмещающим size;
+    значения за пределами size пропускаются повторным применением сети
+    (cycle walking), поэтому в среднем требуется меньше четырех проходов.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, size: int, key: int):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half_bits) - 1
+        self.round_keys = [mix64(key + round_number) for round_number in range(self.ROUNDS)]
+
+    def _encrypt(self, value: int) -> int:
+        half_bits = self.half_bits
+        mask = self.mask
+        left, right = value >> half_bits, value & mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ (mix64(right ^ round_key) & mask)
+        return (left << half_bits) | right
+
+    def __call__(self, index: int) -> int:
+        if self.size <= 1:
+            return index
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+def indexed_space(rules: Dict[str, Any], partition: tuple = None) -> Optional[tuple]:
+    """Перечислимое пространство значений правила: (размер, функция номер -> значение).
+
+    partition = (номер шарда, всего шардов) ограничивает пространство
+    непересекающейся частью. Для типов вне CONSTRUCTIVE_TYPES возвращает None.
+    """
+    value_type = rules.get('type', 'text')
+    partition_range = rule_primitives.partition_range
+
+    if value_type == 'int':
+        min_val = rules.get('min_value', 1)
+        max_val = rules.get('max_value', 100)
+        if min_val > max_val:
+            raise ValueError(f"min_value {min_val} больше max_value {max_val}")
+        first, last = partition_range(min_val, max_val, partition)
+        return last - first + 1, lambda index: first + index
+
+    if value_type == 'date':
+        start_date, end_date = rule_primitives.validate_date_range(rules.get('start_date', '2020-01-01'),
+                                                                   rules.get('end_date', '2024-12-31'))
+        start_day = start_date.date()
+        first, last = partition_range(0, (end_date - start_date).days, partition)
+        return last - first + 1, lambda index: start_day + timedelta(days=first + index)
+
+    if value_type == 'timestamp':
+        start_date, end_date = rule_primitives.validate_date_range(rules.get('start_date', '2020-01-01 00:00:00'),
+                                                                   rules.get('end_date', '2024-12-31 23:59:59'))
+        start_date = start_date.replace(microsecond=0)
+        first, last = partition_range(0, int((end_date - start_date).total_seconds()), partition)
+        return last - first + 1, lambda index: start_date + timedelta(seconds=first + index)
+
+    if value_type == 'pattern':
+        slots = rule_primitives.pattern_slots(rules.get('pattern', '#####'))
+        decode = rule_primitives.compile_pattern_decoder(slots)
+        first, last = partition_range(0, rule_primitives.pattern_space_size(slots) - 1, partition)
+        return last - first + 1, lambda index: decode(first + index)
+
+    if value_type == 'enum':
+        values = list(dict.fromkeys(rules.get('values', ['value1', 'value2'])))
+        if not values:
+            raise ValueError("Пустой список values")
+        first, last = partition_range(0, len(values) - 1, partition)
+        return last - first + 1, lambda index: values[first + index]
+
+    return None
+
+
+def _compile_seeded_email(rules: Dict[str, Any], rng) -> Callable[[], Any]:
+    """Уникальный email для счетчикового rng: первые буквы имени и число - перестановка номера строки.
+
+    Имя состоит только из букв, поэтому адреса с разными префиксами или
+    разными числами различны; остальные буквы и домен случайны.
+    """
+    domains = list(rules.get('domains', rule_primitives.DEFAULT_EMAIL_DOMAINS))
+    if not domains:
+        raise ValueError("Пустой список domains")
+    letters = string.ascii_lowercase
+    min_length, max_length = rule_primitives.EMAIL_NAME_LENGTH
+    first_number, last_number = rule_primitives.EMAIL_NUMBER_RANGE
+    numbers = last_number - first_number + 1
+    size = len(letters) ** min_length * numbers
+    permute = KeyedPermutation(size, mix64(rng.key))
+    choices = rng.choices
+    randint = rng.randint
+    choice = rng.choice
+
+    def generate_email():
+        if rng.row >= size:
+            raise ValueError(f"исчерпано пространство из {size} уникальных значений правила 'email'")
+        prefix_index, number = divmod(permute(rng.row), numbers)
+        prefix = []
+        for _ in range(min_length):
+            prefix_index, letter = divmod(prefix_index, len(letters))
+            prefix.append(letters[letter])
+        tail = ''.join(choices(letters, k=randint(0, max_length - min_length)))
+        return f"{''.join(prefix)}{tail}{first_number + number}@{choice(domains)}"
+
+    return generate_email
+
+
+def compile_unique_rule(rules: Dict[str, Any], rng=random, partition: tuple = None) -> Optional[Callable[[], Any]]:
+    """Генератор уникальных значений без повторных попыток и проверки по множеству.
+
+    n-я строка получает значение с номером permutation(n), поэтому значения
+    различны по построению. Когда пространство исчерпано, следующий вызов
+    приводит к ValueError. Для неперечислимых типов возвращает None.
+    Со счетчиковым rng номер берется из текущей строки генератора, а не из
+    счетчика вызовов: тогда шарды делят строки, а не пространство значений;
+    в этом режиме строится и email (см. SEEDED_TYPES).
+    """
+    counter_based = isinstance(rng, counter_rng.CounterRandom)
+    if counter_based and rules.get('type', 'text') == 'email':
+        return _compile_seeded_email(rules, rng)
+    space = indexed_space(rules, None if counter_based else partition)
+    if space is None:
+        return None
+
+    size, decode = space
+    if counter_based:
+        permute = KeyedPermutation(size, mix64(rng.key))
+        row_numbers = None
+    else:
+        permute = KeyedPermutation(size, rng.getrandbits(64))
+        row_numbers = itertools.count()
+
+    def generate_unique():
+        index = rng.row if row_numbers is None else next(row_numbers)
+        if index >= size:
+            raise ValueError(f"исчерпано пространство из {size} уникальных значений "
+                             f"правила '{rules.get('type', 'text')}'")
+        return decode(permute(index))
+
+    return generate_unique
+
+
+def unique_space_sizes(table_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Размеры пространств уникальных колонок с перечислимыми правилами.
+
+    Возвращает {колонка: размер}; для ошибочного правила вместо размера - текст ошибки.
+    """
+    sizes = {}
+    column_rules = table_config.get('column_rules', {})
+    for column_name in table_config.get('unique_columns', []):
+        rules = column_rules.get(column_name)
+        if not rules or rules.get('type', 'text') not in CONSTRUCTIVE_TYPES:
+            continue
+        try:
+            sizes[column_name] = indexed_space(rules)[0]
+        except (ValueError, TypeError) as e:
+            sizes[column_name] = str(e)
+    return sizes
+
+
+def check_unique_capacity(table_config: Dict[str, Any], num_rows: int, shards: int = 1,
+                          sizes: Dict[str, Any] = None) -> List[str]:
+    """Проверяет до генерации, что пространства уникальных колонок хватит на num_rows строк.
+
+    При shards > 1 проверяется часть пространства и часть строк каждого шарда
+    (части делятся так же, как в partition_range). sizes - готовый результат
+    unique_space_sizes. Возвращает список описаний проблем (пустой, если все в порядке).
+    """
+    errors = []
+    if sizes is None:
+        sizes = unique_space_sizes(table_config)
+    for column_name, space_size in sizes.items():
+        if isinstance(space_size, str):
+            errors.append(f"колонка '{column_name}': {space_size}")
+            continue
+        if space_size < shards:
+            errors.append(f"колонка '{column_name}': диапазон из {space_size} значений "
+                          f"нельзя разбить на {shards} шардов")
+            continue
+        for shard in range(shards):
+            rows = num_rows * (shard + 1) // shards - num_rows * shard // shards
+            size = space_size * (shard + 1) // shards - space_size * shard // shards
+            if rows > size:
+                where = f" в шарде {shard + 1}/{shards}" if shards > 1 else ""
+                errors.append(f"колонка '{column_name}': {rows} строк{where} больше, "
+                              f"чем {size} возможных уникальных значений")
+                break
+    return errors
@@ -0,0 +1,268 @@
+import sys
+from array import array
+from typing import Any, Callable
+
+from counter_rng import mix64, MASK64
+
+# Способы отслеживания уже выданных уникальных значений (global_settings.unique_tracker)
+TRACKER_MODES = ('auto', 'set', 'compact')
+
+# В режиме 'auto' множество Python заменяется компактным трекером после стольких значений
+AUTO_COMPACT_THRESHOLD = 1_000_000
+
+# Наибольший размер битовой карты целых чисел (бит), дальше - хеш-массив
+MAX_BITMAP_BITS = 2 ** 31
+
+
+class SetTracker:
+    """Обычное множество Python: быстрое, но десятки байт на значение"""
+
+    def __init__(self):
+        self._values = set()
+        self._value_bytes = 0
+
+    def __contains__(self, value) -> bool:
+        return value in self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def add(self, value):
+        self.add_new(value)
+
+    def add_new(self, value) -> bool:
+        """Добавляет значение; возвращает False, если оно уже было"""
+        if value in self._values:
+            return False
+        self._values.add(value)
+        self._value_bytes += sys.getsizeof(value)
+        return True
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._values) + self._value_bytes
+
+
+class BloomFilter:
+    """Фильтр Блума над 64-битными отпечатками: 'точно нет' или 'возможно есть'"""
+
+    HASHES = 3
+    BITS_PER_VALUE = 10
+
+    def __init__(self, capacity: int):
+        self.size = max(64, capacity * self.BITS_PER_VALUE)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, fingerprint: int):
+        # Двойное хеширование: позиции h1 + i * h2 из двух половин отпечатка
+        h1, h2 = fingerprint & 0xFFFFFFFF, (fingerprint >> 32) | 1
+        return [(h1 + i * h2) % self.size for i in range(self.HASHES)]
+
+    def add(self, fingerprint: int):
+        bits = self.bits
+        for position in self._positions(fingerprint):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def may_contain(self, fingerprint: int) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class FingerprintTracker:
+    """Хеш-таблица 64-битных отпечатков значений с открытой адресацией в array('Q').
+
+    Хранит 8 байт на слот (заполнение до 70%) вместо объекта Python на
+    значение. Совпадение отпечатков разных значений только заставляет
+    генератор взять другое значение, поэтому дубликатов не бывает.
+    С bloom=True перед таблицей стоит фильтр Блума: заведомо новые значения
+    при проверке вхождения не ищутся в таблице, а при добавлении кладутся
+    в первый свободный слот без сравнения отпечатков.
+    """
+
+    def __init__(self, capacity: int = 1024, bloom: bool = False):
+        size = 1024
+        while size * 7 < capacity * 10:
+            size *= 2
+        self._slots = array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+        self._use_bloom = bloom
+        self._bloom = BloomFilter(size) if bloom else None
+
+    @staticmethod
+    def fingerprint(value) -> int:
+        # 0 обозначает пустой слот
+        return mix64(hash(value) & MASK64) or 1
+
+    def _find(self, fingerprint: int) -> int:
+        slots = self._slots
+        mask = self._mask
+        index = fingerprint & mask
+        while slots[index] and slots[index] != fingerprint:
+            index = (index + 1) & mask
+        return index
+
+    def __contains__(self, value) -> bool:
+        fingerprint = self.fingerprint(value)
+        if self._bloom is not None and not self._bloom.may_contain(fingerprint):
+            return False
+        return self._slots[self._find(fingerprint)] == fingerprint
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, value):
+        self.add_new(value)
+
+    def add_new(self, value) -> bool:
+        """Добавляет значение; возвращает False, если его отпечаток уже был"""
+        return self._insert(self.fingerprint(value))
+
+    def _free_slot(self, fingerprint: int) -> int:
+        slots = self._slots
+        mask = self._mask
+        index = fingerprint & mask
+        while slots[index]:
+            index = (index + 1) & mask
+        return index
+
+    def _insert(self, fingerprint: int) -> bool:
+        bloom = self._bloom
+        if bloom is not None and not bloom.may_contain(fingerprint):
+            index = self._free_slot(fingerprint)
+        else:
+            index = self._find(fingerprint)
+            if self._slots[index] == fingerprint:
+                return False
+        self._place(index, fingerprint)
+        return True
+
+    def _place(self, index: int, fingerprint: int):
+        self._slots[index] = fingerprint
+        if self._bloom is not None:
+            self._bloom.add(fingerprint)
+        self._count += 1
+        if self._count * 10 > len(self._slots) * 7:
+            self._grow()
+
+    def _grow(self):
+        """Удваивает таблицу (и фильтр Блума) и переносит отпечатки"""
+        old_slots = self._slots
+        size = len(old_slots) * 2
+        self._slots = array('Q', bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+        self._bloom = BloomFilter(size) if self._use_bloom else None
+        # Отпечатки в старой таблице различны, сравнивать их не нужно
+        for fingerprint in old_slots:
+            if fingerprint:
+                self._place(self._free_slot(fingerprint), fingerprint)
+
+    def memory_bytes(self) -> int:
+        bloom_bytes = len(self._bloom.bits) if self._bloom is not None else 0
+        return self._slots.itemsize * len(self._slots) + bloom_bytes
+
+
+class IntBitmapTracker:
+    """Битовая карта целых чисел от min_value: один бит на возможное значение.
+
+    Карта растет по мере появления больших чисел (до MAX_BITMAP_BITS);
+    числа вне карты и нецелые значения хранятся в FingerprintTracker.
+    """
+
+    def __init__(self, min_value: int = 0, bloom: bool = False):
+        self.min_value = min_value
+        self._bits = bytearray(1024)
+        self._count = 0
+        self._overflow = FingerprintTracker(bloom=bloom)
+
+    def _offset(self, value) -> int:
+        if type(value) is not int:
+            return -1
+        offset = value - self.min_value
+        return offset if 0 <= offset < MAX_BITMAP_BITS else -1
+
+    def __contains__(self, value) -> bool:
+        offset = self._offset(value)
+        if offset < 0:
+            return value in self._overflow
+        byte = offset >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (offset & 7)))
+
+    def __len__(self) -> int:
+        return self._count + len(self._overflow)
+
+    def add(self, value):
+        self.add_new(value)
+
+    def add_new(self, value) -> bool:
+        """Добавляет значение; возвращает False, если оно уже было"""
+        offset = self._offset(value)
+        if offset < 0:
+            return self._overflow.add_new(value)
+        byte = offset >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(max(byte + 1, 2 * len(self._bits)) - len(self._bits)))
+        mask = 1 << (offset & 7)
+        if self._bits[byte] & mask:
+            return False
+        self._bits[byte] |= mask
+        self._count += 1
+        return True
+
+    def memory_bytes(self) -> int:
+        return len(self._bits) + self._overflow.memory_bytes()
+
+
+class AdaptiveTracker:
+    """Множество Python, которое после threshold значений заменяется компактным трекером"""
+
+    def __init__(self, create_compact: Callable[[], Any], threshold: int = AUTO_COMPACT_THRESHOLD):
+        self._tracker = SetTracker()
+        self._create_compact = create_compact
+        self._threshold = threshold
+
+    def __contains__(self, value) -> bool:
+        return value in self._tracker
+
+    def __len__(self) -> int:
+        return len(self._tracker)
+
+    def add(self, value):
+        self.add_new(value)
+
+    def add_new(self, value) -> bool:
+        added = self._tracker.add_new(value)
+        if added and self._create_compact is not None and len(self._tracker) >= self._threshold:
+            compact = self._create_compact()
+            for known in self._tracker:
+                compact.add(known)
+            self._tracker = compact
+            self._create_compact = None
+        return added
+
+    def memory_bytes(self) -> int:
+        return self._tracker.memory_bytes()
+
+
+def create_tracker(mode: str = 'auto', integers: bool = False, bloom: bool = False, min_value: int = 0):
+    """Создает трекер уникальности.
+
+    mode: 'set' - множество Python, 'compact' - битовая карта для целых
+    (integers=True) или хеш-массив отпечатков, 'auto' - множество, которое
+    на больших объемах становится компактным трекером. min_value - нижняя
+    граница целых значений, с которой начинается битовая карта.
+    """
+    if mode not in TRACKER_MODES:
+        raise ValueError(f"неизвестный unique_tracker '{mode}', ожидается один из {TRACKER_MODES}")
+    if mode == 'set':
+        return SetTracker()
+
+    def create_compact():
+        return IntBitmapTracker(min_value, bloom) if integers else FingerprintTracker(bloom=bloom)
+
+    if mode == 'compact':
+        return create_compact()
+    return AdaptiveTracker(create_compact)